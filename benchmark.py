@@ -0,0 +1,392 @@
+"""
+Benchmark: The Step 3 CRUD Flow at Scale
+
+This script runs the production access pattern from step 3
+(add -> query -> upsert -> delete) against synthetic corpora and reports:
+- Throughput (items/sec) for each operation
+- p50/p95/p99 latency per call
+- Results for both chromadb.Client() and PersistentClient
+
+Results are written as JSON so two runs can be compared; any operation
+that got slower than the allowed tolerance is flagged as a regression.
+Everything runs offline with a deterministic local embedding function.
+
+With --startup it instead measures how long cli.py takes to start, on top
+of the bare interpreter's own start-up, and fails if that is over budget.
+
+With --exact it compares single-query latency of HNSW and the in-memory
+brute-force engine (exact_search.py) across collection sizes, and writes
+the largest size where brute force is still faster to exact_threshold.json,
+which ExactSearchCollection reads as its switch-over point.
+
+Usage:
+    python benchmark.py --sizes 10000 100000 --output bench.json
+    python benchmark.py --sizes 10000 --baseline bench.json --tolerance 0.15
+    python benchmark.py --startup
+    python benchmark.py --exact --sizes 100 1000 5000 20000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_SIZES = [10_000]
+DEFAULT_QUERIES = 200
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_TOLERANCE = 0.10
+DEFAULT_STARTUP_RUNS = 10
+DEFAULT_STARTUP_BUDGET_MS = 50
+DEFAULT_EXACT_SIZES = [100, 1000, 2500, 5000, 10_000, 20_000]
+DEFAULT_EXACT_DIMENSION = 384
+
+# cli.py invocations that must not import chromadb/NumPy/OpenAI
+STARTUP_COMMANDS = [
+    ["--help"],
+    ["query", "--help"],
+    ["embed", "--help"],
+]
+
+POLICY_TOPICS = ["flight", "hotel", "rental car", "train", "meal", "expense", "booking", "visa"]
+POLICY_WORDS = [
+    "employees", "must", "book", "economy", "business", "class", "maximum", "per", "night",
+    "approval", "manager", "portal", "receipts", "days", "advance", "international",
+    "domestic", "allowance", "insurance", "upgrade", "preferred", "partners", "submit",
+    "reimbursement", "travel", "policy", "budget", "limit", "report", "trip",
+]
+
+
+# ============================================================
+# Synthetic corpus
+# ============================================================
+
+def synthetic_document(rng):
+    topic = rng.choice(POLICY_TOPICS)
+    words = " ".join(rng.choice(POLICY_WORDS) for _ in range(rng.randint(12, 30)))
+    return topic, f"{topic.capitalize()} policy: {words}."
+
+
+def synthetic_records(size, seed=0):
+    """Yield (id, document, metadata) for a reproducible corpus of `size` docs."""
+    rng = random.Random(seed)
+    for i in range(size):
+        topic, document = synthetic_document(rng)
+        yield f"policy_{i:07d}", document, {"policy_type": topic.replace(" ", "_"), "version": 1}
+
+
+def synthetic_queries(count, seed=1):
+    rng = random.Random(seed)
+    return [f"What is the {rng.choice(POLICY_TOPICS)} policy for {rng.choice(POLICY_WORDS)}?"
+            for _ in range(count)]
+
+
+# ============================================================
+# Measurement
+# ============================================================
+
+def summarize(operation, latencies, items):
+    latencies_ms = np.asarray(latencies) * 1000
+    total = float(np.sum(latencies))
+    return {
+        "operation": operation,
+        "calls": len(latencies),
+        "items": items,
+        "throughput": items / total if total else 0.0,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def run_crud(collection, size, queries, batch_size, seed):
+    """Time add, query, upsert and delete on one collection."""
+    results = []
+    rng = random.Random(seed)
+
+    latencies = []
+    batch = []
+    for record in synthetic_records(size, seed):
+        batch.append(record)
+        if len(batch) == batch_size:
+            ids, documents, metadatas = zip(*batch)
+            latencies.append(timed(collection.add, ids=list(ids), documents=list(documents),
+                                   metadatas=list(metadatas)))
+            batch = []
+    if batch:
+        ids, documents, metadatas = zip(*batch)
+        latencies.append(timed(collection.add, ids=list(ids), documents=list(documents),
+                               metadatas=list(metadatas)))
+    results.append(summarize("add", latencies, size))
+
+    latencies = [timed(collection.query, query_texts=[query], n_results=5) for query in queries]
+    results.append(summarize("query", latencies, len(queries)))
+
+    # Like step 3's hotel_policy_01 update: rewrite small groups of existing docs
+    upsert_batch = min(100, size)
+    latencies = []
+    for _ in range(max(1, len(queries) // 10)):
+        picked = rng.sample(range(size), upsert_batch)
+        ids = [f"policy_{i:07d}" for i in picked]
+        documents = [synthetic_document(rng)[1] for _ in picked]
+        metadatas = [{"policy_type": "updated", "version": 2} for _ in picked]
+        latencies.append(timed(collection.upsert, ids=ids, documents=documents, metadatas=metadatas))
+    results.append(summarize("upsert", latencies, upsert_batch * len(latencies)))
+
+    delete_batch = min(100, size)
+    deletable = list(range(size))
+    rng.shuffle(deletable)
+    latencies = []
+    deleted = 0
+    for start in range(0, min(len(deletable), delete_batch * 10), delete_batch):
+        ids = [f"policy_{i:07d}" for i in deletable[start:start + delete_batch]]
+        latencies.append(timed(collection.delete, ids=ids))
+        deleted += len(ids)
+    results.append(summarize("delete", latencies, deleted))
+
+    return results
+
+
+def run_benchmarks(sizes, client_kinds, query_count, batch_size, seed):
+    import chromadb
+    from local_embeddings import HashingEmbeddingFunction
+
+    embedding_function = HashingEmbeddingFunction()
+    queries = synthetic_queries(query_count, seed + 1)
+    results = []
+    for kind in client_kinds:
+        for size in sizes:
+            workdir = tempfile.mkdtemp(prefix="chroma_bench_")
+            try:
+                if kind == "persistent":
+                    client = chromadb.PersistentClient(path=workdir)
+                else:
+                    client = chromadb.EphemeralClient()
+                name = f"bench_{kind}_{size}"
+                try:
+                    client.delete_collection(name=name)
+                except Exception:
+                    pass
+                collection = client.create_collection(name=name, embedding_function=embedding_function)
+                print(f"\n  {kind} client, {size} documents...")
+                for result in run_crud(collection, size, queries,
+                                       min(batch_size, client.get_max_batch_size()), seed):
+                    result.update({"client": kind, "size": size})
+                    results.append(result)
+                    print(f"    {result['operation']:<7} {result['throughput']:>10.0f} items/s"
+                          f"   p50 {result['p50_ms']:.2f} ms   p95 {result['p95_ms']:.2f} ms"
+                          f"   p99 {result['p99_ms']:.2f} ms")
+                client.delete_collection(name=name)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def measure_exact_crossover(sizes, dimension=DEFAULT_EXACT_DIMENSION, query_count=DEFAULT_QUERIES,
+                            n_results=10, seed=0):
+    """p50 single-query latency of HNSW vs exact_search.ExactSearchCollection per size.
+
+    The exact side goes through the wrapper's query(), as callers would, so
+    its bookkeeping (count checks, result building) is part of the timing.
+
+    Returns (rows, threshold): the threshold is the largest size at which,
+    like every smaller size measured, the exact engine was at least as fast.
+    """
+    import chromadb
+    from exact_search import ExactSearchCollection
+
+    rng = np.random.default_rng(seed)
+    queries = rng.normal(size=(query_count, dimension)).astype(np.float32)
+    client = chromadb.EphemeralClient()
+    rows = []
+    for size in sorted(sizes):
+        vectors = rng.normal(size=(size, dimension)).astype(np.float32)
+        ids = [f"vec_{i:07d}" for i in range(size)]
+        name = f"bench_exact_{size}"
+        collection = client.create_collection(name=name, metadata={"hnsw:space": "cosine"})
+        batch_size = client.get_max_batch_size()
+        for first in range(0, size, batch_size):
+            collection.add(ids=ids[first:first + batch_size],
+                           embeddings=vectors[first:first + batch_size])
+        exact_collection = ExactSearchCollection(collection, threshold=size)
+
+        hnsw = [timed(collection.query, query_embeddings=[query], n_results=n_results,
+                      include=["distances"]) for query in queries]
+        exact_collection.query(query_embeddings=[queries[0]], n_results=n_results)  # loads it
+        exact = [timed(exact_collection.query, query_embeddings=[query], n_results=n_results,
+                       include=["distances"]) for query in queries]
+        rows.append({"size": size, "hnsw_p50_ms": float(np.percentile(hnsw, 50)) * 1000,
+                     "exact_p50_ms": float(np.percentile(exact, 50)) * 1000})
+        client.delete_collection(name=name)
+
+    threshold = 0
+    for row in rows:
+        if row["exact_p50_ms"] > row["hnsw_p50_ms"]:
+            break
+        threshold = row["size"]
+    return rows, threshold
+
+
+# ============================================================
+# Comparing runs
+# ============================================================
+
+def measure_startup(commands=STARTUP_COMMANDS, runs=DEFAULT_STARTUP_RUNS):
+    """Median wall time in ms of `python cli.py <args>` per command.
+
+    The bare interpreter start-up time is measured too, under "python".
+    """
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    invocations = {"python": [sys.executable, "-c", "pass"]}
+    for arguments in commands:
+        invocations[" ".join(["cli.py"] + arguments)] = [sys.executable, cli] + arguments
+    results = {}
+    for label, command in invocations.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           check=True)
+            times.append((time.perf_counter() - start) * 1000)
+        results[label] = float(np.median(times))
+    return results
+
+
+def find_regressions(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """List metrics that got worse than `tolerance` (a fraction) vs the baseline."""
+    previous = {(r["client"], r["size"], r["operation"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["client"], result["size"], result["operation"]))
+        if old is None:
+            continue
+        checks = [
+            ("throughput", old["throughput"], result["throughput"], old["throughput"] * (1 - tolerance)),
+            ("p95_ms", old["p95_ms"], result["p95_ms"], old["p95_ms"] * (1 + tolerance)),
+        ]
+        for metric, before, after, limit in checks:
+            worse = after < limit if metric == "throughput" else after > limit
+            if worse:
+                regressions.append({
+                    "client": result["client"], "size": result["size"],
+                    "operation": result["operation"], "metric": metric,
+                    "baseline": before, "current": after,
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark add/query/upsert/delete at scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--clients", nargs="+", choices=["memory", "persistent"],
+                        default=["memory", "persistent"])
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before flagging, as a fraction (default 0.10)")
+    parser.add_argument("--startup", action="store_true",
+                        help="measure cli.py start-up time instead of the CRUD flow")
+    parser.add_argument("--exact", action="store_true",
+                        help="find the size below which exact brute-force search is faster")
+    parser.add_argument("--dimension", type=int, default=DEFAULT_EXACT_DIMENSION,
+                        help="vector dimension for --exact (default 384)")
+    parser.add_argument("--startup-budget-ms", type=float, default=DEFAULT_STARTUP_BUDGET_MS,
+                        help="allowed start-up time on top of bare python (default 50)")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        print("="*60)
+        print("BENCHMARK: cli.py start-up time")
+        print("="*60 + "\n")
+        results = measure_startup()
+        interpreter_ms = results.pop("python")
+        print(f"  {'python -c pass':<24} {interpreter_ms:>8.1f} ms")
+        over = []
+        for label, median_ms in results.items():
+            overhead = median_ms - interpreter_ms
+            flag = ""
+            if overhead > args.startup_budget_ms:
+                over.append(label)
+                flag = f"  ✗ over {args.startup_budget_ms:.0f} ms budget"
+            print(f"  {label:<24} {median_ms:>8.1f} ms (+{overhead:.1f} ms){flag}")
+        if over:
+            sys.exit(1)
+        print(f"\n✓ All commands start within {args.startup_budget_ms:.0f} ms of bare python")
+        return
+
+    if args.exact:
+        from exact_search import THRESHOLD_FILE
+
+        print("="*60)
+        print("BENCHMARK: exact brute force vs HNSW")
+        print("="*60 + "\n")
+        sizes = args.sizes if args.sizes != DEFAULT_SIZES else DEFAULT_EXACT_SIZES
+        rows, threshold = measure_exact_crossover(sizes, args.dimension, args.queries,
+                                                  seed=args.seed)
+        print(f"  {'size':>8} {'HNSW p50':>10} {'exact p50':>10}")
+        for row in rows:
+            mark = "✓" if row["exact_p50_ms"] <= row["hnsw_p50_ms"] else " "
+            print(f"  {row['size']:>8} {row['hnsw_p50_ms']:>8.3f}ms {row['exact_p50_ms']:>8.3f}ms"
+                  f"  {mark}")
+        output = args.output or THRESHOLD_FILE
+        with open(output, "w") as f:
+            json.dump({"threshold": threshold, "dimension": args.dimension, "rows": rows},
+                      f, indent=2)
+        print(f"\n✓ Exact search is faster up to {threshold} records; written to {output}")
+        return
+
+    print("="*60)
+    print("BENCHMARK: add -> query -> upsert -> delete")
+    print("="*60)
+
+    import chromadb
+    report = {
+        "meta": {
+            "chromadb": chromadb.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+        },
+        "results": run_benchmarks(args.sizes, args.clients, args.queries,
+                                  args.batch_size, args.seed),
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(baseline, report, args.tolerance)
+        print("\n" + "-"*60)
+        if regressions:
+            print(f"✗ {len(regressions)} REGRESSION(S) vs {args.baseline}:")
+            for r in regressions:
+                print(f"  - {r['client']}/{r['size']}/{r['operation']} {r['metric']}: "
+                      f"{r['baseline']:.2f} -> {r['current']:.2f}")
+            sys.exit(1)
+        print(f"✓ No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
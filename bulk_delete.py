@@ -0,0 +1,185 @@
+"""
+Bulk Delete: Retention Jobs by Metadata Filter, Then Compaction
+
+Step 3 deletes one document by id. Retention jobs drop thousands or
+millions at once by metadata (policy_type, last_updated, ...). This
+script demonstrates:
+- Deleting everything that matches a where / where_document filter in
+  bounded batches: fetch up to N matching ids, delete them, repeat
+- Compaction afterwards:
+    * the HNSW index only marks deleted vectors, so the collection is
+      rebuilt from its stored embeddings into a fresh index (nothing is
+      re-embedded) and swapped in under the same name
+    * SQLite VACUUM returns freed pages in chroma.sqlite3 to the disk
+- Reporting bytes reclaimed under the database directory and how long
+  the collection was unavailable (the name swap plus VACUUM)
+
+Writes to the collection should be paused while it is rebuilt: anything
+written to the old copy after it was read is not carried over.
+
+Usage:
+    python bulk_delete.py --collection saved_policies --where '{"policy_type": "trains"}' --dry-run
+    python bulk_delete.py --collection saved_policies --where '{"last_updated": {"$lt": 2023}}' --compact
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from catalog import directory_size
+from snapshot import copy_configuration
+from streaming_reader import CollectionReader, copy_records
+
+DEFAULT_BATCH_SIZE = 1000
+REBUILD_SUFFIX = "_compacting"
+OLD_SUFFIX = "_compacted_old"
+
+
+def count_matches(collection, where=None, where_document=None, page_size=DEFAULT_BATCH_SIZE):
+    """Number of records a filter matches, read as ids only."""
+    reader = CollectionReader(collection, include=(), page_size=page_size, where=where,
+                              where_document=where_document)
+    return sum(len(page["ids"]) for page in reader.pages())
+
+
+def delete_where(collection, where=None, where_document=None, batch_size=DEFAULT_BATCH_SIZE,
+                 progress=print, report_every=10.0):
+    """Delete every record matching the filter, at most `batch_size` at a time.
+
+    Returns the number of records deleted.
+    """
+    if where is None and where_document is None:
+        raise ValueError("Refusing to delete without a filter; pass where or where_document")
+    start = time.perf_counter()
+    last_report = start
+    deleted = 0
+    while True:
+        # Matches already deleted drop out, so the next batch always starts at offset 0
+        ids = collection.get(where=where, where_document=where_document, limit=batch_size,
+                             include=[])["ids"]
+        if not ids:
+            return deleted
+        collection.delete(ids=ids)
+        deleted += len(ids)
+
+        now = time.perf_counter()
+        if progress and now - last_report >= report_every:
+            progress(f"  {deleted} deleted ({deleted / (now - start):.0f}/sec)")
+            last_report = now
+
+
+def rebuild_collection(client, name, page_size=DEFAULT_BATCH_SIZE):
+    """Copy `name` into a fresh index and swap it in. Returns timings in seconds.
+
+    The new collection has a different id from the one it replaces.
+    """
+    source = client.get_collection(name=name)
+    # Legacy "hnsw:*" metadata keys take precedence over the configuration
+    staging = client.create_collection(name=f"{name}{REBUILD_SUFFIX}",
+                                       metadata=source.metadata or None,
+                                       configuration=copy_configuration(source) or None)
+
+    start = time.perf_counter()
+    copy_records(source, staging, page_size=min(page_size, client.get_max_batch_size()))
+    copy_seconds = time.perf_counter() - start
+
+    # The name is unassigned from here until the second rename
+    start = time.perf_counter()
+    source.modify(name=f"{name}{OLD_SUFFIX}")
+    staging.modify(name=name)
+    swap_seconds = time.perf_counter() - start
+    client.delete_collection(name=f"{name}{OLD_SUFFIX}")
+    return {"copy_seconds": copy_seconds, "swap_seconds": swap_seconds}
+
+
+def vacuum(path):
+    """Run SQLite VACUUM on a PersistentClient directory. Returns seconds taken."""
+    start = time.perf_counter()
+    connection = sqlite3.connect(os.path.join(path, "chroma.sqlite3"), timeout=60)
+    try:
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return time.perf_counter() - start
+
+
+def delete_and_compact(client, path, name, where=None, where_document=None,
+                       batch_size=DEFAULT_BATCH_SIZE, compact=True, progress=print):
+    """Filtered delete, then (optionally) index rebuild and VACUUM; returns a report."""
+    collection = client.get_collection(name=name)
+    size_before = directory_size(path)
+    count_before = collection.count()
+
+    start = time.perf_counter()
+    deleted = delete_where(collection, where, where_document, batch_size, progress)
+    report = {
+        "collection": name,
+        "deleted": deleted,
+        "count_before": count_before,
+        "count_after": collection.count(),
+        "delete_seconds": time.perf_counter() - start,
+        "bytes_before": size_before,
+        "bytes_after_delete": directory_size(path),
+    }
+    if compact:
+        timings = rebuild_collection(client, name, batch_size)
+        report.update(timings)
+        report["vacuum_seconds"] = vacuum(path)
+        report["unavailable_seconds"] = timings["swap_seconds"] + report["vacuum_seconds"]
+    report["bytes_after"] = directory_size(path)
+    report["bytes_reclaimed"] = size_before - report["bytes_after"]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete by metadata filter and compact.")
+    parser.add_argument("--db", default="./chroma_db", help="PersistentClient path")
+    parser.add_argument("--collection", default="saved_policies")
+    parser.add_argument("--where", help='metadata filter as JSON, e.g. \'{"policy_type": "trains"}\'')
+    parser.add_argument("--where-document", help='document filter as JSON, e.g. \'{"$contains": "draft"}\'')
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--compact", action="store_true",
+                        help="rebuild the index and VACUUM SQLite afterwards")
+    parser.add_argument("--dry-run", action="store_true", help="only count the matches")
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    where = json.loads(args.where) if args.where else None
+    where_document = json.loads(args.where_document) if args.where_document else None
+
+    print("="*60)
+    print("BULK DELETE BY FILTER")
+    print("="*60)
+
+    client = chromadb.PersistentClient(path=args.db)
+    collection = client.get_collection(name=args.collection)
+    print(f"  Collection: {collection.name} ({collection.count()} documents)")
+    print(f"  Filter:     where={where} where_document={where_document}\n")
+
+    if args.dry_run:
+        matches = count_matches(collection, where, where_document, args.batch_size)
+        print(f"✓ Dry run: {matches} documents would be deleted")
+        return
+
+    report = delete_and_compact(client, args.db, args.collection, where, where_document,
+                                args.batch_size, compact=args.compact)
+    mb = 1024 * 1024
+    print(f"✓ Deleted {report['deleted']} documents in {report['delete_seconds']:.1f}s "
+          f"({report['count_before']} -> {report['count_after']})")
+    print(f"  Size: {report['bytes_before'] / mb:.1f} MB before, "
+          f"{report['bytes_after_delete'] / mb:.1f} MB after delete, "
+          f"{report['bytes_after'] / mb:.1f} MB now")
+    print(f"  Reclaimed: {report['bytes_reclaimed'] / mb:.1f} MB")
+    if args.compact:
+        print(f"  Rebuild copy: {report['copy_seconds']:.1f}s (collection still readable)")
+        print(f"  Unavailable:  {report['unavailable_seconds']:.2f}s "
+              f"(rename {report['swap_seconds']:.2f}s + VACUUM {report['vacuum_seconds']:.2f}s)")
+    else:
+        print("  Run again with --compact to rebuild the index and reclaim disk space")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Bulk Ingestion: Streaming Large Policy Corpora into a PersistentClient
+
+This script demonstrates:
+- Streaming (id, document, metadata) records from JSONL or CSV files
+  with generators, so memory stays flat however big the input is
+- Embedding batches in a worker pool while the main thread writes
+- Writing to a PersistentClient in tuned batch sizes
+- Reporting docs/sec and the memory high-water mark
+- Optionally splitting long documents into token-bounded chunks first
+- Optionally dropping, merging or linking near-duplicate documents first
+
+Input formats:
+- JSONL: one object per line: {"id": ..., "document": ..., "metadata": {...}}
+- CSV:   columns "id" and "document"; every other non-empty column
+         becomes a metadata field
+
+Usage:
+    python bulk_ingest.py policies.jsonl --collection saved_policies
+    python bulk_ingest.py policies.csv --batch-size 2000 --workers 8
+    python bulk_ingest.py handbook.jsonl --chunk-tokens 512 --chunk-overlap 64
+    python bulk_ingest.py policies.jsonl --dedup skip --dedup-threshold 0.8
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import csv
+import itertools
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+
+# ============================================================
+# Streaming readers
+# ============================================================
+
+def iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "id" not in record or "document" not in record:
+                raise ValueError(f"{path}:{line_number}: record needs 'id' and 'document'")
+            yield str(record["id"]), record["document"], record.get("metadata") or None
+
+
+def iter_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            doc_id = row.pop("id")
+            document = row.pop("document")
+            metadata = {key: value for key, value in row.items() if value not in (None, "")}
+            yield doc_id, document, metadata or None
+
+
+def iter_records(path):
+    """Yield (id, document, metadata) tuples from a JSONL or CSV file."""
+    if path.endswith(".csv"):
+        return iter_csv(path)
+    return iter_jsonl(path)
+
+
+def iter_batches(records, batch_size):
+    """Group a record stream into lists of at most `batch_size` records."""
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def peak_memory_mb():
+    """Process memory high-water mark in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ============================================================
+# Pipeline
+# ============================================================
+
+def _embed_batch(batch, embedding_function):
+    ids = [record[0] for record in batch]
+    documents = [record[1] for record in batch]
+    metadatas = [record[2] for record in batch]
+    # Records may arrive already embedded, e.g. from dedup.Deduplicator.filter()
+    embeddings = [record[3] if len(record) > 3 else None for record in batch]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        computed = embedding_function([documents[i] for i in missing])
+        for i, embedding in zip(missing, computed):
+            embeddings[i] = embedding
+    return ids, documents, metadatas, embeddings
+
+
+def _write_batch(collection, ids, documents, metadatas, embeddings):
+    collection.upsert(
+        ids=ids,
+        documents=documents,
+        metadatas=metadatas if any(metadatas) else None,
+        embeddings=embeddings,
+    )
+
+
+def ingest(records, collection, embedding_function, batch_size=DEFAULT_BATCH_SIZE,
+           workers=DEFAULT_WORKERS, report_every=10.0, progress=print):
+    """Embed and upsert a record stream; returns throughput statistics.
+
+    Records are (id, document, metadata) or, when already embedded,
+    (id, document, metadata, embedding); those are written as they are.
+
+    At most `2 * workers` batches are held in memory at once: the reader
+    pauses until the oldest batch has been written.
+    """
+    start = time.perf_counter()
+    last_report = start
+    written = 0
+    dimension = None
+    pending = collections.deque()
+
+    def write_oldest():
+        nonlocal written, dimension
+        ids, documents, metadatas, embeddings = pending.popleft().result()
+        _write_batch(collection, ids, documents, metadatas, embeddings)
+        written += len(ids)
+        dimension = len(embeddings[0]) if len(embeddings) else dimension
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in iter_batches(records, batch_size):
+            pending.append(pool.submit(_embed_batch, batch, embedding_function))
+            while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                write_oldest()
+
+            now = time.perf_counter()
+            if progress and now - last_report >= report_every:
+                progress(f"  {written} docs written ({written / (now - start):.0f} docs/sec)")
+                last_report = now
+
+        while pending:
+            write_oldest()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": written,
+        "dimension": dimension,
+        "seconds": elapsed,
+        "docs_per_sec": written / elapsed if elapsed else 0.0,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+def register_embedding_functions():
+    """Import this repo's embedding functions so ChromaDB can rebuild them.
+
+    A collection created with one stores its name and settings, and
+    get_collection() fails with "Embedding function ... not found" unless
+    that class has been imported (which registers it) first.
+    """
+    import embedding_batcher  # noqa: F401
+    import embedding_cache  # noqa: F401
+    import local_embeddings  # noqa: F401
+
+
+def get_embedding_function(name):
+    if name == "local":
+        from local_embeddings import HashingEmbeddingFunction
+        return HashingEmbeddingFunction()
+    if name == "openai":
+        from embedding_batcher import BatchedOpenAIEmbeddingFunction
+        from embedding_cache import CachingEmbeddingFunction
+        return CachingEmbeddingFunction(BatchedOpenAIEmbeddingFunction("text-embedding-3-small"),
+                                        model_name="text-embedding-3-small")
+    from chromadb.utils import embedding_functions
+    return embedding_functions.DefaultEmbeddingFunction()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a JSONL/CSV corpus into ChromaDB.")
+    parser.add_argument("input", help="path to a .jsonl or .csv file")
+    parser.add_argument("--db", default="./chroma_db", help="PersistentClient path")
+    parser.add_argument("--collection", default="saved_policies")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--embedder", choices=["default", "openai", "local"], default="default")
+    parser.add_argument("--chunk-tokens", type=int,
+                        help="split documents into chunks of at most this many tokens")
+    parser.add_argument("--chunk-overlap", type=int, default=64)
+    parser.add_argument("--dedup", choices=["skip", "merge", "link"],
+                        help="what to do with near-duplicate documents")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="MinHash Jaccard similarity that counts as a near-duplicate")
+    parser.add_argument("--dedup-embedding-threshold", type=float,
+                        help="also require this cosine similarity between embeddings")
+    parser.add_argument("--dedup-existing", action="store_true",
+                        help="also apply --dedup to documents already in the collection")
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    print("="*60)
+    print("BULK INGESTION")
+    print("="*60)
+
+    register_embedding_functions()
+    client = chromadb.PersistentClient(path=args.db)
+    embedding_function = get_embedding_function(args.embedder)
+    collection = client.get_or_create_collection(name=args.collection,
+                                                 embedding_function=embedding_function)
+    # Never exceed what the client accepts in a single write
+    batch_size = min(args.batch_size, client.get_max_batch_size())
+
+    print(f"  Input:      {args.input}")
+    print(f"  Collection: {collection.name} ({collection.count()} documents before)")
+    print(f"  Batch size: {batch_size}, workers: {args.workers}\n")
+
+    records = iter_records(args.input)
+    deduplicator = None
+    if args.dedup:
+        from dedup import Deduplicator
+        check_embeddings = args.dedup_embedding_threshold is not None
+        deduplicator = Deduplicator(
+            threshold=args.dedup_threshold, policy=args.dedup,
+            embedding_function=embedding_function if check_embeddings else None,
+            embedding_threshold=args.dedup_embedding_threshold if check_embeddings else 0.0)
+        if args.dedup_existing:
+            scanned = deduplicator.scan_collection(collection)
+            print(f"  Dedup: {scanned['duplicates']} near-duplicates among "
+                  f"{scanned['scanned']} stored documents\n")
+        # Chunks need their own embeddings, so only reuse the dedup ones without chunking
+        records = deduplicator.filter(records, keep_embeddings=not args.chunk_tokens)
+    chunker = None
+    if args.chunk_tokens:
+        import tiktoken
+        from chunking import Chunker
+        chunker = Chunker(tiktoken.get_encoding("cl100k_base"),
+                          max_tokens=args.chunk_tokens, overlap=args.chunk_overlap)
+        # Drops each document's previous chunks, which may outnumber the new ones
+        records = chunker.chunk(records, collection=collection)
+
+    stats = ingest(records, collection, embedding_function,
+                   batch_size=batch_size, workers=args.workers)
+    if deduplicator is not None:
+        deduplicator.apply_merges(collection)
+
+    peak = stats["peak_memory_mb"]
+    print(f"\n✓ Ingested {stats['documents']} documents in {stats['seconds']:.1f}s")
+    print(f"  Throughput: {stats['docs_per_sec']:.0f} docs/sec")
+    print(f"  Peak memory: {f'{peak:.0f} MB' if peak is not None else 'n/a'}")
+    print(f"  Collection now holds {collection.count()} documents")
+
+    if deduplicator is not None:
+        dedup_stats = deduplicator.stats(dimension=stats["dimension"])
+        print(f"\n  Dedup ({dedup_stats['policy']}): {dedup_stats['duplicates']} near-duplicates"
+              f" in {dedup_stats['seen']} documents")
+        print(f"    index shrank by {dedup_stats['dropped']} vectors ({dedup_stats['shrink']:.1%})")
+        if "estimated_bytes_saved" in dedup_stats:
+            print(f"    about {dedup_stats['estimated_bytes_saved'] / (1024 * 1024):.1f} MB"
+                  f" of vectors and graph links saved")
+
+    if chunker is not None:
+        chunk_stats = chunker.stats.summary()
+        print(f"\n  Chunking: {chunk_stats['documents']} documents -> {chunk_stats['chunks']} chunks"
+              f" ({chunk_stats['chunks_per_document']:.1f} per document)")
+        print(f"    {chunk_stats['tokens_per_sec']:.0f} tokens/sec tokenized")
+        print(f"    chunk tokens: min {chunk_stats['chunk_tokens_min']},"
+              f" p50 {chunk_stats['chunk_tokens_p50']}, p95 {chunk_stats['chunk_tokens_p95']},"
+              f" max {chunk_stats['chunk_tokens_max']}")
+
+
+if __name__ == "__main__":
+    main()
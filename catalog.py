@@ -0,0 +1,151 @@
+"""
+Collection Catalog: Listing Every Collection Without N+1 Calls
+
+This module provides:
+- One call that returns name, metadata, document count and on-disk index
+  size for every collection
+- For a PersistentClient, all counts come from a single read-only SQL
+  query against ./chroma_db/chroma.sqlite3
+- For other clients, counts are fetched concurrently on a thread pool
+- A cached snapshot that is refreshed after create/modify/delete calls
+  made through the catalog (or when it gets older than max_age_seconds)
+
+Usage:
+    catalog = CollectionCatalog(client, path="./chroma_db")
+    for entry in catalog.entries():
+        print(entry["name"], entry["count"], entry["index_bytes"])
+"""
+
+import concurrent.futures
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_WORKERS = 8
+
+_COUNTS_SQL = """
+    SELECT s.collection, COUNT(e.id)
+    FROM segments s LEFT JOIN embeddings e ON e.segment_id = s.id
+    WHERE s.scope = 'METADATA'
+    GROUP BY s.collection
+"""
+_VECTOR_SEGMENTS_SQL = "SELECT collection, id FROM segments WHERE scope = 'VECTOR'"
+
+
+def directory_size(path):
+    """Total size in bytes of all files under `path` (0 if it doesn't exist)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def read_sqlite_stats(path):
+    """Counts and vector-index sizes for every collection, keyed by collection id.
+
+    Returns None when `path` is not a readable ChromaDB persistent directory.
+    """
+    database = os.path.join(path, "chroma.sqlite3")
+    if not os.path.exists(database):
+        return None
+    try:
+        connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+        try:
+            counts = dict(connection.execute(_COUNTS_SQL).fetchall())
+            segments = connection.execute(_VECTOR_SEGMENTS_SQL).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+
+    index_bytes = {}
+    for collection_id, segment_id in segments:
+        index_bytes[collection_id] = (index_bytes.get(collection_id, 0)
+                                      + directory_size(os.path.join(path, segment_id)))
+    return {"counts": counts, "index_bytes": index_bytes}
+
+
+class CollectionCatalog:
+    """Cached catalog of all collections in one client."""
+
+    def __init__(self, client, path=None, max_age_seconds=None, workers=DEFAULT_WORKERS):
+        self.client = client
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.workers = workers
+        self._snapshot = None
+        self._taken_at = 0.0
+        self._lock = threading.Lock()
+
+    def entries(self):
+        """Catalog entries, refreshed only if the snapshot is stale."""
+        with self._lock:
+            expired = (self.max_age_seconds is not None
+                       and time.monotonic() - self._taken_at > self.max_age_seconds)
+            if self._snapshot is None or expired:
+                self._snapshot = self._build()
+                self._taken_at = time.monotonic()
+            return list(self._snapshot)
+
+    def refresh(self):
+        self.invalidate()
+        return self.entries()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def _build(self):
+        collections = self.client.list_collections()
+        stats = read_sqlite_stats(self.path) if self.path else None
+
+        if stats is not None:
+            counts = {c.id: stats["counts"].get(str(c.id), 0) for c in collections}
+            index_bytes = {c.id: stats["index_bytes"].get(str(c.id)) for c in collections}
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+                counts = dict(zip([c.id for c in collections],
+                                  pool.map(lambda c: c.count(), collections)))
+            index_bytes = {c.id: None for c in collections}
+
+        return [
+            {
+                "name": c.name,
+                "id": str(c.id),
+                "metadata": c.metadata,
+                "count": counts[c.id],
+                "index_bytes": index_bytes[c.id],
+            }
+            for c in collections
+        ]
+
+    # Collection management that keeps the snapshot current
+
+    def create_collection(self, *args, **kwargs):
+        try:
+            return self.client.create_collection(*args, **kwargs)
+        finally:
+            self.invalidate()
+
+    def get_or_create_collection(self, *args, **kwargs):
+        try:
+            return self.client.get_or_create_collection(*args, **kwargs)
+        finally:
+            self.invalidate()
+
+    def modify_collection(self, collection, name=None, metadata=None):
+        try:
+            return collection.modify(name=name, metadata=metadata)
+        finally:
+            self.invalidate()
+
+    def delete_collection(self, name):
+        try:
+            return self.client.delete_collection(name=name)
+        finally:
+            self.invalidate()
@@ -0,0 +1,173 @@
+"""
+Chunking: Splitting Long Policy Documents into Token-Bounded Pieces
+
+This module provides:
+- Splitting documents into overlapping chunks of at most N tokens, using
+  tiktoken's batch encoder across threads
+- Chunk ids like "flight_policy_01#3" that inherit the parent's metadata
+  (plus parent_id, chunk_index and chunk_tokens)
+- Replacing a re-ingested document's chunks: its old chunks are deleted
+  (by parent_id) before the new ones are written, so none are left over
+  when it now has fewer
+- Regrouping query results by parent document
+- Throughput and chunk-size distribution statistics
+
+Usage:
+    encoding = tiktoken.get_encoding("cl100k_base")
+    chunker = Chunker(encoding, max_tokens=512, overlap=64)
+    for chunk_id, text, metadata in chunker.chunk(records, collection=collection):
+        ...
+    print(chunker.stats.summary())
+
+    results = collection.query(query_texts=["hotel budget"], n_results=20)
+    for hit in group_by_parent(results):
+        print(hit["parent_id"], hit["distance"], len(hit["chunks"]))
+"""
+
+import time
+
+import numpy as np
+
+from bulk_ingest import iter_batches
+
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP = 64
+DEFAULT_THREADS = 8
+DEFAULT_BATCH_SIZE = 256
+
+
+def chunk_id(parent_id, index):
+    return f"{parent_id}#{index}"
+
+
+def parent_of(chunk_id_or_id):
+    """Parent id of a chunk id; plain ids are their own parent."""
+    return chunk_id_or_id.rsplit("#", 1)[0]
+
+
+def token_windows(token_count, max_tokens, overlap):
+    """(start, end) token offsets of each chunk of a document."""
+    if token_count <= max_tokens:
+        return [(0, token_count)]
+    step = max_tokens - overlap
+    windows = []
+    for start in range(0, token_count, step):
+        end = min(start + max_tokens, token_count)
+        windows.append((start, end))
+        if end == token_count:
+            break
+    return windows
+
+
+class ChunkStats:
+    """Running throughput and chunk-size counters in constant memory."""
+
+    def __init__(self, max_tokens):
+        self.documents = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.seconds = 0.0
+        self._sizes = np.zeros(max_tokens + 1, dtype=np.int64)
+
+    def record(self, sizes):
+        self.chunks += len(sizes)
+        self._sizes += np.bincount(sizes, minlength=len(self._sizes))
+
+    def percentile(self, q):
+        if self.chunks == 0:
+            return 0
+        cumulative = np.cumsum(self._sizes)
+        return int(np.searchsorted(cumulative, q / 100 * self.chunks))
+
+    def summary(self):
+        nonzero = np.flatnonzero(self._sizes)
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "chunks_per_document": self.chunks / self.documents if self.documents else 0.0,
+            "documents_per_sec": self.documents / self.seconds if self.seconds else 0.0,
+            "tokens_per_sec": self.tokens / self.seconds if self.seconds else 0.0,
+            "chunk_tokens_min": int(nonzero[0]) if len(nonzero) else 0,
+            "chunk_tokens_p50": self.percentile(50),
+            "chunk_tokens_p95": self.percentile(95),
+            "chunk_tokens_max": int(nonzero[-1]) if len(nonzero) else 0,
+        }
+
+
+class Chunker:
+    """Turns (id, document, metadata) records into token-bounded chunks."""
+
+    def __init__(self, encoding, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP,
+                 num_threads=DEFAULT_THREADS, batch_size=DEFAULT_BATCH_SIZE):
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be at least 0 and smaller than max_tokens")
+        self.encoding = encoding
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.stats = ChunkStats(max_tokens)
+
+    def chunk(self, records, collection=None):
+        """Yield (chunk_id, text, metadata) for every chunk of every record.
+
+        With `collection`, each batch's existing chunks (matched on
+        parent_id) are deleted from it before the batch is yielded.
+        """
+        for batch in iter_batches(records, self.batch_size):
+            if collection is not None:
+                parent_ids = list(dict.fromkeys(record[0] for record in batch))
+                collection.delete(where={"parent_id": {"$in": parent_ids}})
+            start = time.perf_counter()
+            encoded = self.encoding.encode_ordinary_batch(
+                [document for _, document, _ in batch], num_threads=self.num_threads)
+            chunks = []
+            sizes = []
+            for (parent_id, document, metadata), tokens in zip(batch, encoded):
+                windows = token_windows(len(tokens), self.max_tokens, self.overlap)
+                for index, (first, last) in enumerate(windows):
+                    text = document if len(windows) == 1 else self.encoding.decode(tokens[first:last])
+                    chunk_metadata = dict(metadata or {})
+                    chunk_metadata.update({
+                        "parent_id": parent_id,
+                        "chunk_index": index,
+                        "chunk_tokens": last - first,
+                    })
+                    chunks.append((chunk_id(parent_id, index), text, chunk_metadata))
+                    sizes.append(last - first)
+                self.stats.tokens += len(tokens)
+            self.stats.documents += len(batch)
+            self.stats.record(sizes)
+            self.stats.seconds += time.perf_counter() - start
+            yield from chunks
+
+
+def group_by_parent(results, query_index=0):
+    """Regroup one query's chunk hits by parent document, best match first.
+
+    Each group has parent_id, distance (of its best chunk) and its chunks
+    in rank order as dicts with id, document, metadata and distance.
+    """
+    def column(field):
+        values = results.get(field)
+        return values[query_index] if values else None
+
+    documents = column("documents")
+    metadatas = column("metadatas")
+    distances = column("distances")
+    groups = {}
+    for rank, hit_id in enumerate(results["ids"][query_index]):
+        metadata = metadatas[rank] if metadatas else None
+        parent_id = (metadata or {}).get("parent_id") or parent_of(hit_id)
+        distance = distances[rank] if distances else None
+        group = groups.setdefault(parent_id, {"parent_id": parent_id, "distance": distance,
+                                              "chunks": []})
+        group["chunks"].append({
+            "id": hit_id,
+            "document": documents[rank] if documents else None,
+            "metadata": metadata,
+            "distance": distance,
+        })
+    # Hits arrive sorted by distance, so insertion order is best-first
+    return list(groups.values())
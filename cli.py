@@ -0,0 +1,290 @@
+"""
+ChromaDB Demo CLI: The Step Scripts' Operations as Subcommands
+
+The step scripts are tutorials: they run top to bottom at import time.
+This CLI exposes the same operations as reusable functions and
+subcommands against a PersistentClient:
+
+    python cli.py ingest policies.jsonl --collection saved_policies
+    python cli.py query "What is the hotel budget?" --collection saved_policies
+    python cli.py inspect saved_policies
+    python cli.py collections
+    python cli.py verify saved_policies
+    python cli.py embed "Hotel budget is $300 per night." --embedder local
+
+Only the standard library is imported up front. chromadb, NumPy, tiktoken
+and OpenAI are imported inside the subcommand that needs them, so
+`python cli.py --help` starts in tens of milliseconds
+(measure it with `python benchmark.py --startup`).
+"""
+
+import argparse
+import importlib
+import json
+import sys
+
+DEFAULT_DB = "./chroma_db"
+DEFAULT_COLLECTION = "saved_policies"
+EMBEDDERS = ["default", "openai", "local"]
+
+# Subcommands handled entirely by an existing script's main(argv)
+DELEGATED = {
+    "ingest": "bulk_ingest",
+}
+
+
+# ============================================================
+# Reusable operations
+# ============================================================
+
+def open_client(path=DEFAULT_DB):
+    import chromadb
+
+    from bulk_ingest import register_embedding_functions
+
+    # Collections created with this repo's embedding functions reopen with them
+    register_embedding_functions()
+    return chromadb.PersistentClient(path=path)
+
+
+def open_collection(client, name, embedder=None, exact=False):
+    """Get an existing collection, optionally with a specific embedding function.
+
+    With exact=True it is wrapped in exact_search.ExactSearchCollection, so a
+    collection under the measured size threshold is searched exactly.
+    """
+    embedding_function = None
+    if embedder is None:
+        collection = client.get_collection(name=name)
+    else:
+        from bulk_ingest import get_embedding_function
+        embedding_function = get_embedding_function(embedder)
+        collection = client.get_collection(name=name, embedding_function=embedding_function)
+    if not exact:
+        return collection
+    from exact_search import ExactSearchCollection
+    return ExactSearchCollection(collection, embedding_function=embedding_function)
+
+
+def query_collection(collection, texts, n_results=5, where=None, where_document=None):
+    return collection.query(query_texts=texts, n_results=n_results, where=where,
+                            where_document=where_document,
+                            include=["documents", "metadatas", "distances"])
+
+
+def inspect_collection(collection, sample=3):
+    """Name, id, count, metadata, index settings, dimension and a few records."""
+    from streaming_reader import CollectionReader
+
+    records = []
+    dimension = None
+    reader = CollectionReader(collection, include=["documents", "metadatas", "embeddings"],
+                              page_size=max(sample, 1))
+    for record in reader:
+        if record["embedding"] is not None:
+            dimension = len(record["embedding"])
+        if len(records) == sample:
+            break
+        records.append({"id": record["id"], "document": record["document"],
+                        "metadata": record["metadata"]})
+    configuration = getattr(collection, "configuration_json", None) or {}
+    return {
+        "name": collection.name,
+        "id": str(collection.id),
+        "count": collection.count(),
+        "metadata": collection.metadata,
+        "hnsw": configuration.get("hnsw"),
+        "dimension": dimension,
+        "sample": records,
+    }
+
+
+def list_collections(client, path=None):
+    from catalog import CollectionCatalog
+    return CollectionCatalog(client, path=path).entries()
+
+
+def verify_store(client, names=None, manifest=None, write_manifest=None, sample=20, workers=4):
+    """Integrity-check collections in parallel (see integrity.py). Returns the report."""
+    from integrity import check_client
+    return check_client(client, names, manifest_path=manifest, write_manifest_path=write_manifest,
+                        sample=sample, workers=workers)
+
+
+def embed_texts(texts, embedder="local"):
+    """Embed `texts` with the named embedding function into a float32 matrix."""
+    import numpy as np
+    from bulk_ingest import get_embedding_function
+    return np.asarray(get_embedding_function(embedder)(texts), dtype=np.float32)
+
+
+# ============================================================
+# Subcommands
+# ============================================================
+
+def _print_json(value):
+    print(json.dumps(value, indent=2, default=str))
+
+
+def cmd_query(args):
+    collection = open_collection(open_client(args.db), args.collection, args.embedder,
+                                 exact=not args.hnsw)
+    where = json.loads(args.where) if args.where else None
+    results = query_collection(collection, args.texts, args.n_results, where=where)
+    if args.json:
+        _print_json(results)
+        return 0
+    for text, ids, documents, distances in zip(args.texts, results["ids"],
+                                               results["documents"], results["distances"]):
+        print(f"\nQuery: '{text}'")
+        for doc_id, document, distance in zip(ids, documents, distances):
+            print(f"  {distance:.4f}  [{doc_id}] {document}")
+    return 0
+
+
+def cmd_inspect(args):
+    collection = open_collection(open_client(args.db), args.collection)
+    info = inspect_collection(collection, args.sample)
+    if args.json:
+        _print_json(info)
+        return 0
+    print(f"Collection: {info['name']} ({info['id']})")
+    print(f"  Documents: {info['count']}")
+    print(f"  Dimension: {info['dimension']}")
+    print(f"  Metadata:  {info['metadata']}")
+    print(f"  HNSW:      {info['hnsw']}")
+    for record in info["sample"]:
+        print(f"  - [{record['id']}] {record['document']}")
+    return 0
+
+
+def cmd_collections(args):
+    entries = list_collections(open_client(args.db), args.db)
+    if args.json:
+        _print_json(entries)
+        return 0
+    print(f"{len(entries)} collections in {args.db}:")
+    for entry in entries:
+        size = entry.get("index_bytes")
+        suffix = f", {size / (1024 * 1024):.1f} MB index" if size else ""
+        print(f"  - {entry['name']} ({entry['count']} documents{suffix})")
+    return 0
+
+
+def cmd_verify(args):
+    from integrity import format_report, write_report
+
+    report = verify_store(open_client(args.db), args.collections or None, args.manifest,
+                          args.write_manifest, args.sample, args.workers)
+    if args.output:
+        write_report(report, args.output)
+    if args.json:
+        _print_json(report)
+    else:
+        print(format_report(report))
+        if args.write_manifest:
+            print(f"  Content hashes written to {args.write_manifest}")
+        if args.output:
+            print(f"  Report written to {args.output}")
+    return 0 if report["ok"] else 1
+
+
+def cmd_embed(args):
+    texts = list(args.texts)
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            texts.extend(line.rstrip("\n") for line in f if line.strip())
+    if not texts:
+        print("Nothing to embed: pass texts or --input", file=sys.stderr)
+        return 2
+    matrix = embed_texts(texts, args.embedder)
+    if args.output:
+        import numpy as np
+        np.save(args.output, matrix)
+        print(f"✓ Saved {matrix.shape[0]} x {matrix.shape[1]} embeddings to {args.output}")
+        return 0
+    for text, vector in zip(texts, matrix):
+        preview = ", ".join(f"{value:.4f}" for value in vector[:5])
+        print(f"  {text[:50]!r}: {len(vector)} dims [{preview}, ...]")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--db", default=DEFAULT_DB, help="PersistentClient path")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    commands.add_parser("ingest", add_help=False,
+                        help="bulk-load JSONL/CSV (see: cli.py ingest --help)")
+
+    query = commands.add_parser("query", help="semantic search in a collection")
+    query.add_argument("texts", nargs="+", help="one or more query texts")
+    query.add_argument("--collection", default=DEFAULT_COLLECTION)
+    query.add_argument("-n", "--n-results", type=int, default=3)
+    query.add_argument("--where", help='metadata filter as JSON, e.g. \'{"policy_type": "hotels"}\'')
+    query.add_argument("--embedder", choices=EMBEDDERS,
+                       help="embedding function (default: the collection's own)")
+    query.add_argument("--hnsw", action="store_true",
+                       help="always use the HNSW index, even below the exact-search threshold")
+    query.add_argument("--json", action="store_true")
+    query.set_defaults(handler=cmd_query)
+
+    inspect = commands.add_parser("inspect", help="show one collection's settings and a sample")
+    inspect.add_argument("collection", nargs="?", default=DEFAULT_COLLECTION)
+    inspect.add_argument("--sample", type=int, default=3)
+    inspect.add_argument("--json", action="store_true")
+    inspect.set_defaults(handler=cmd_inspect)
+
+    listing = commands.add_parser("collections", help="list collections with counts and sizes")
+    listing.add_argument("--json", action="store_true")
+    listing.set_defaults(handler=cmd_collections)
+
+    verify = commands.add_parser("verify", help="integrity-check stored data (see integrity.py)")
+    verify.add_argument("collections", nargs="*", help="default: all collections")
+    verify.add_argument("--manifest", help="compare content hashes with this manifest")
+    verify.add_argument("--write-manifest", metavar="PATH",
+                        help="record content hashes for later runs")
+    verify.add_argument("--sample", type=int, default=20,
+                        help="records per collection to self-query (0 to skip)")
+    verify.add_argument("--workers", type=int, default=4, help="collections checked at once")
+    verify.add_argument("--output", help="write the JSON report to this file")
+    verify.add_argument("--json", action="store_true")
+    verify.set_defaults(handler=cmd_verify)
+
+    embed = commands.add_parser("embed", help="embed texts without storing them")
+    embed.add_argument("texts", nargs="*")
+    embed.add_argument("--input", help="text file, one text per line")
+    embed.add_argument("--embedder", choices=EMBEDDERS, default="local")
+    embed.add_argument("--output", help="save the matrix to this .npy file")
+    embed.set_defaults(handler=cmd_embed)
+    return parser
+
+
+def _split_global_options(argv):
+    """(global options, subcommand, rest) for `cli.py [--db PATH] command ...`."""
+    position = 0
+    while position < len(argv):
+        if argv[position] == "--db":
+            position += 2
+        elif argv[position].startswith("--db="):
+            position += 1
+        else:
+            break
+    if position >= len(argv):
+        return argv, None, []
+    return argv[:position], argv[position], argv[position + 1:]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    options, command, rest = _split_global_options(argv)
+    # Delegated subcommands parse their own options; a global --db is passed on
+    # first, so a --db given after the subcommand still wins
+    if command in DELEGATED:
+        return importlib.import_module(DELEGATED[command]).main(options + rest) or 0
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
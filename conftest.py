@@ -0,0 +1,50 @@
+"""Makes the top-level modules importable from tests/ and provides an offline embedder."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chromadb.api.types import EmbeddingFunction  # noqa: E402
+from chromadb.utils.embedding_functions import register_embedding_function  # noqa: E402
+
+
+@register_embedding_function
+class LetterEmbeddingFunction(EmbeddingFunction):
+    """Normalized letter counts: offline, instant, and similar texts stay close.
+
+    Tests use it instead of the default model, which needs a download.
+    """
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(26, dtype=np.float32)
+            for character in text.lower():
+                if "a" <= character <= "z":
+                    vector[ord(character) - ord("a")] += 1
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name():
+        return "test_letters"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return LetterEmbeddingFunction()
+
+
+@pytest.fixture
+def letter_ef():
+    return LetterEmbeddingFunction()
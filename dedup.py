@@ -0,0 +1,297 @@
+"""
+Near-Duplicate Detection: Keeping Policy Revisions Out of the Index
+
+Corpora often hold near-identical texts (flight_policy_01 vs
+flight_policy_02 in step 3, or a hotel-budget policy before and after an
+edit). Each one adds a vector to the HNSW index and crowds the top-k with
+copies. This module provides:
+- MinHash signatures over word shingles, computed with NumPy
+- LSH banding, so each new record is only compared with the few earlier
+  records that share a band (streaming and sub-quadratic)
+- An optional embedding check: a candidate only counts as a duplicate if
+  its embedding is also close enough to the kept record's. Records are
+  embedded a page at a time in one call, and the vectors are passed on
+  with the records so the ingest does not embed them again. Only the most
+  recent kept records' vectors are cached; a candidate whose vector was
+  evicted is judged by MinHash alone
+- A bound on the LSH index: past max_records kept records, the least
+  recently matched ones are forgotten, so memory stays flat on long
+  streams (a later copy of a forgotten record is no longer caught)
+- scan_collection(), which applies the policy to duplicates already stored
+  by earlier runs and remembers the stored records, so the next stream is
+  also compared with them
+- Three policies for a duplicate:
+    skip   drop it
+    merge  drop it and list its id in the kept record's "duplicate_ids"
+    link   keep it, with "duplicate_of" pointing at the kept record
+- Counts of what was dropped and an estimate of the index bytes saved
+
+Without scan_collection(), only records in the same stream are compared,
+not ones already stored.
+
+Usage:
+    dedup = Deduplicator(threshold=0.8, policy="skip")
+    dedup.scan_collection(collection)  # optional: stored records too
+    records = dedup.filter(iter_records("policies.jsonl"))
+    ingest(records, collection, embedding_function)
+    dedup.apply_merges(collection)     # only does something for policy="merge"
+    print(dedup.stats())
+
+    python bulk_ingest.py policies.jsonl --dedup skip --dedup-threshold 0.8
+    python bulk_ingest.py policies.jsonl --dedup merge --dedup-existing
+"""
+
+import collections
+import re
+import zlib
+
+import numpy as np
+
+from streaming_reader import CollectionReader
+
+POLICIES = ("skip", "merge", "link")
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_PAGE_SIZE = 256
+DEFAULT_MAX_CACHED_EMBEDDINGS = 50_000
+DEFAULT_MAX_RECORDS = 1_000_000
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=DEFAULT_SHINGLE_SIZE):
+    """Set of word n-grams; short texts give one shingle of all their words."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures from hash functions (a*x + b) mod p."""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set)) % _MERSENNE_PRIME
+        # a and x are both < 2**31, so a * x + b fits in uint64
+        values = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME
+        return values.min(axis=1).astype(np.uint32)
+
+
+def _cosine(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return float(a @ b / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12))
+
+
+class Deduplicator:
+    """Streaming near-duplicate filter for (id, document, metadata) records."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, policy="skip", num_perm=DEFAULT_NUM_PERM,
+                 bands=DEFAULT_BANDS, shingle_size=DEFAULT_SHINGLE_SIZE,
+                 embedding_function=None, embedding_threshold=0.95,
+                 max_cached_embeddings=DEFAULT_MAX_CACHED_EMBEDDINGS,
+                 max_records=DEFAULT_MAX_RECORDS):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.policy = policy
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.embedding_function = embedding_function
+        self.embedding_threshold = embedding_threshold
+        self.max_cached_embeddings = max_cached_embeddings
+        self.max_records = max_records
+        self.hasher = MinHasher(num_perm)
+        self.merges = {}
+        self._buckets = {}  # (band, band hash) -> set of kept ids
+        self._signatures = collections.OrderedDict()  # kept id -> signature, LRU
+        self._embeddings = collections.OrderedDict()  # kept id -> vector, LRU
+        self._seen = 0
+        self._duplicates = 0
+
+    def _remember_embedding(self, doc_id, embedding):
+        self._embeddings[doc_id] = embedding
+        self._embeddings.move_to_end(doc_id)
+        while len(self._embeddings) > self.max_cached_embeddings:
+            self._embeddings.popitem(last=False)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _remember(self, doc_id, keys, signature):
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(doc_id)
+        self._signatures[doc_id] = signature
+        self._signatures.move_to_end(doc_id)
+        while len(self._signatures) > self.max_records:
+            evicted, evicted_signature = self._signatures.popitem(last=False)
+            for key in self._band_keys(evicted_signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(evicted)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def find_duplicate(self, doc_id, document, embedding=None):
+        """Id of an earlier kept record this one nearly duplicates, or None.
+
+        Records that are not duplicates are remembered as kept. With an
+        embedding function, pass the record's `embedding` if you have it;
+        otherwise it is embedded here.
+        """
+        signature = self.hasher.signature(shingles(document, self.shingle_size))
+        keys = self._band_keys(signature)
+        candidates = set()
+        for key in keys:
+            candidates.update(self._buckets.get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if self.embedding_function is not None and embedding is None:
+            embedding = self.embedding_function([document])[0]
+        if best is not None and embedding is not None and best in self._embeddings:
+            self._embeddings.move_to_end(best)
+            if _cosine(self._embeddings[best], embedding) < self.embedding_threshold:
+                best = None
+        if best is not None:
+            self._signatures.move_to_end(best)
+            return best
+
+        self._remember(doc_id, keys, signature)
+        if embedding is not None:
+            self._remember_embedding(doc_id, embedding)
+        return None
+
+    def _pages(self, records, page_size):
+        """(record, embedding) pairs, embedding each page in one call."""
+        page = []
+        for record in records:
+            page.append(record)
+            if len(page) == page_size:
+                yield from zip(page, self.embedding_function([r[1] for r in page]))
+                page = []
+        if page:
+            yield from zip(page, self.embedding_function([r[1] for r in page]))
+
+    def filter(self, records, page_size=DEFAULT_PAGE_SIZE, keep_embeddings=True):
+        """Apply the policy to a record stream, yielding the records to write.
+
+        With an embedding function, records are embedded `page_size` at a
+        time and yielded as (id, document, metadata, embedding) so that
+        bulk_ingest.ingest() writes those vectors instead of embedding
+        again; pass keep_embeddings=False for plain 3-tuples (e.g. when the
+        records are chunked afterwards).
+        """
+        if self.embedding_function is None:
+            pairs = ((record, None) for record in records)
+        else:
+            pairs = self._pages(records, page_size)
+        for (doc_id, document, metadata), embedding in pairs:
+            self._seen += 1
+            original = self.find_duplicate(doc_id, document, embedding)
+            extra = (embedding,) if embedding is not None and keep_embeddings else ()
+            # The same id again is an update, not a duplicate
+            if original is None or original == doc_id:
+                yield (doc_id, document, metadata) + extra
+                continue
+            self._duplicates += 1
+            if self.policy == "merge":
+                self.merges.setdefault(original, []).append(doc_id)
+            elif self.policy == "link":
+                linked = dict(metadata or {})
+                linked["duplicate_of"] = original
+                yield (doc_id, document, linked) + extra
+
+    def scan_collection(self, collection, page_size=DEFAULT_PAGE_SIZE, batch_size=500):
+        """Apply the policy to near-duplicates already stored in `collection`.
+
+        Every stored record with a document goes through find_duplicate(),
+        using its stored embedding for the embedding check, so later
+        filter() calls also compare new records with it. Duplicates are
+        deleted ("skip", "merge") or given "duplicate_of" ("link") once the
+        scan is done, so deletions do not shift the pages being read; call
+        apply_merges() afterwards for "merge". Returns counts.
+        """
+        include = ["documents", "metadatas"]
+        if self.embedding_function is not None:
+            include.append("embeddings")
+        duplicates = {}  # stored duplicate id -> (original id, metadata)
+        scanned = 0
+        for record in CollectionReader(collection, include=include, page_size=page_size):
+            if record["document"] is None:
+                continue
+            scanned += 1
+            original = self.find_duplicate(record["id"], record["document"],
+                                           record.get("embedding"))
+            if original is not None and original != record["id"]:
+                duplicates[record["id"]] = (original, record["metadata"])
+
+        ids = list(duplicates)
+        for first in range(0, len(ids), batch_size):
+            batch = ids[first:first + batch_size]
+            if self.policy == "link":
+                linked = [dict(duplicates[doc_id][1] or {}, duplicate_of=duplicates[doc_id][0])
+                          for doc_id in batch]
+                collection.update(ids=batch, metadatas=linked)
+            else:
+                collection.delete(ids=batch)
+        if self.policy == "merge":
+            for doc_id in ids:
+                self.merges.setdefault(duplicates[doc_id][0], []).append(doc_id)
+        return {"scanned": scanned, "duplicates": len(ids)}
+
+    def apply_merges(self, collection, batch_size=500):
+        """Record merged duplicates' ids on the kept records (policy="merge").
+
+        Ids merged by earlier runs stay in "duplicate_ids".
+        """
+        originals = list(self.merges)
+        for first in range(0, len(originals), batch_size):
+            ids = originals[first:first + batch_size]
+            stored = collection.get(ids=ids, include=["metadatas"])
+            metadatas = []
+            for doc_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                metadata = dict(metadata or {})
+                earlier = [i for i in str(metadata.get("duplicate_ids") or "").split(",") if i]
+                merged = list(dict.fromkeys(earlier + self.merges[doc_id]))
+                metadata["duplicate_ids"] = ",".join(merged)
+                metadata["duplicate_count"] = len(merged)
+                metadatas.append(metadata)
+            if stored["ids"]:
+                collection.update(ids=stored["ids"], metadatas=metadatas)
+
+    def stats(self, dimension=None, m=16):
+        """Counts, plus estimated bytes saved if `dimension` is given.
+
+        The estimate counts float32 vector storage plus about 2*M graph
+        links of 4 bytes per HNSW node.
+        """
+        dropped = 0 if self.policy == "link" else self._duplicates
+        result = {
+            "policy": self.policy,
+            "seen": self._seen,
+            "duplicates": self._duplicates,
+            "written": self._seen - dropped,
+            "dropped": dropped,
+            "shrink": dropped / self._seen if self._seen else 0.0,
+        }
+        if dimension:
+            result["estimated_bytes_saved"] = dropped * (dimension * 4 + 2 * m * 4)
+        return result
@@ -0,0 +1,261 @@
+"""
+Embedding Batcher: Token-Budgeted, Concurrent OpenAI Embedding Requests
+
+This module provides:
+- Token counting with tiktoken's cl100k_base encoding (the one step 6 loads)
+- Packing texts into requests that sit just under the API's per-request
+  token and input limits
+- Sending those requests concurrently with asyncio, with a bounded
+  number of requests in flight
+- Exponential backoff with jitter when the API answers with a rate limit
+- Results returned in the same order as the input texts
+- BatchedOpenAIEmbeddingFunction, which runs every call on one event loop
+  kept in a background thread, so the AsyncOpenAI client and its
+  connection pool stay on the loop they were created for; registered with
+  ChromaDB as "openai_batched" so collections reopen with it
+
+Usage:
+    encoding = tiktoken.get_encoding("cl100k_base")
+    embed_request = openai_embed_request("text-embedding-3-small")
+    vectors = asyncio.run(embed_texts(texts, embed_request, encoding))
+
+Or, as a ChromaDB embedding function:
+    batched_ef = BatchedOpenAIEmbeddingFunction(model_name="text-embedding-3-small")
+"""
+
+import asyncio
+import random
+import threading
+
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions import register_embedding_function
+
+# Limits for OpenAI's /v1/embeddings endpoint (text-embedding-3-*)
+MAX_TOKENS_PER_INPUT = 8191
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+
+def count_tokens(texts, encoding):
+    """Token count per text, encoded in one batch call."""
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+
+
+def pack_batches(token_counts, max_tokens=MAX_TOKENS_PER_REQUEST,
+                 max_inputs=MAX_INPUTS_PER_REQUEST,
+                 max_tokens_per_input=MAX_TOKENS_PER_INPUT):
+    """Group text indices into requests that respect the API limits.
+
+    Texts are packed in input order, so each batch is a contiguous run of
+    indices. Returns a list of index lists.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, tokens in enumerate(token_counts):
+        if tokens > max_tokens_per_input:
+            raise ValueError(
+                f"Text {index} has {tokens} tokens; the model accepts at most "
+                f"{max_tokens_per_input}. Split it into chunks before embedding."
+            )
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_rate_limit_error(error):
+    """True for OpenAI's RateLimitError or anything carrying HTTP 429."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+async def _send_with_backoff(embed_request, texts, semaphore, max_retries,
+                             base_delay, max_delay):
+    attempt = 0
+    while True:
+        async with semaphore:
+            try:
+                return await embed_request(texts)
+            except Exception as error:
+                if not is_rate_limit_error(error) or attempt >= max_retries:
+                    raise
+        # Sleep outside the semaphore so other batches can use the slot
+        delay = min(max_delay, base_delay * (2 ** attempt))
+        await asyncio.sleep(random.uniform(0, delay))
+        attempt += 1
+
+
+async def embed_texts(texts, embed_request, encoding,
+                      max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                      max_tokens=MAX_TOKENS_PER_REQUEST,
+                      max_inputs=MAX_INPUTS_PER_REQUEST,
+                      max_retries=DEFAULT_MAX_RETRIES,
+                      base_delay=DEFAULT_BASE_DELAY,
+                      max_delay=DEFAULT_MAX_DELAY):
+    """Embed `texts` in packed, concurrent requests.
+
+    `embed_request` is an async callable taking a list of strings and
+    returning one vector per string, in order. The returned list lines up
+    with `texts` regardless of which request finishes first.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    batches = pack_batches(count_tokens(texts, encoding),
+                           max_tokens=max_tokens, max_inputs=max_inputs)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    results = await asyncio.gather(*[
+        _send_with_backoff(embed_request, [texts[i] for i in batch], semaphore,
+                           max_retries, base_delay, max_delay)
+        for batch in batches
+    ])
+
+    vectors = [None] * len(texts)
+    for batch, batch_vectors in zip(batches, results):
+        for index, vector in zip(batch, batch_vectors):
+            vectors[index] = vector
+    return vectors
+
+
+def openai_embed_request(model_name, client=None, dimensions=None):
+    """Build an async request function backed by openai.AsyncOpenAI."""
+    if client is None:
+        import openai
+        client = openai.AsyncOpenAI()
+
+    async def embed_request(texts):
+        kwargs = {"model": model_name, "input": texts}
+        if dimensions is not None:
+            kwargs["dimensions"] = dimensions
+        response = await client.embeddings.create(**kwargs)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    return embed_request
+
+
+@register_embedding_function
+class BatchedOpenAIEmbeddingFunction(EmbeddingFunction):
+    """ChromaDB embedding function that sends token-packed concurrent requests.
+
+    Pass `embed_request` to use something other than the OpenAI API, such
+    as a local fake server in tests; such a function cannot be stored in a
+    collection's configuration, so ChromaDB then treats it as legacy.
+    """
+
+    def __init__(self, model_name="text-embedding-3-small", embed_request=None,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, dimensions=None,
+                 encoding_name="cl100k_base"):
+        import tiktoken
+        self.model_name = model_name
+        self.dimensions = dimensions
+        self.encoding_name = encoding_name
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.custom_request = embed_request is not None
+        self.embed_request = embed_request or openai_embed_request(model_name, dimensions=dimensions)
+        self.max_in_flight = max_in_flight
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._closed = False
+
+    def _event_loop(self):
+        # One loop for the lifetime of this object: a fresh asyncio.run() per
+        # call would close the loop the client's connections belong to
+        with self._loop_lock:
+            if self._closed:
+                raise RuntimeError("BatchedOpenAIEmbeddingFunction is closed")
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._run_loop, args=(self._loop,),
+                                 name="embedding-batcher", daemon=True).start()
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def __call__(self, input):
+        loop = self._event_loop()
+        coroutine = embed_texts(input, self.embed_request, self.encoding,
+                                max_in_flight=self.max_in_flight)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def close(self):
+        """Stop the background event loop; later calls raise RuntimeError."""
+        with self._loop_lock:
+            self._closed = True
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+    @staticmethod
+    def name():
+        return "openai_batched"
+
+    def get_config(self):
+        if self.custom_request:
+            return NotImplemented
+        return {"model_name": self.model_name, "max_in_flight": self.max_in_flight,
+                "dimensions": self.dimensions, "encoding_name": self.encoding_name}
+
+    @staticmethod
+    def build_from_config(config):
+        return BatchedOpenAIEmbeddingFunction(model_name=config["model_name"],
+                                              max_in_flight=config["max_in_flight"],
+                                              dimensions=config["dimensions"],
+                                              encoding_name=config["encoding_name"])
+
+
+if __name__ == "__main__":
+    import time
+    import tiktoken
+
+    print("="*60)
+    print("EMBEDDING BATCHER: Offline demo with a fake embedding API")
+    print("="*60)
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    policies = [
+        f"Policy {i}: employees may claim up to ${50 + i % 200} per day for meals while travelling."
+        for i in range(5000)
+    ]
+
+    requests_sent = []
+
+    async def fake_embed_request(texts):
+        # Simulates network latency and an occasional rate limit
+        requests_sent.append(len(texts))
+        await asyncio.sleep(0.05)
+        if len(requests_sent) == 2:
+            error = RuntimeError("rate limited")
+            error.status_code = 429
+            raise error
+        return [[float(len(text))] for text in texts]
+
+    token_counts = count_tokens(policies, encoding)
+    batches = pack_batches(token_counts, max_tokens=20_000)
+    print(f"\n{len(policies)} texts, {sum(token_counts)} tokens -> {len(batches)} requests")
+
+    start = time.perf_counter()
+    vectors = asyncio.run(embed_texts(policies, fake_embed_request, encoding,
+                                      max_tokens=20_000, base_delay=0.1))
+    elapsed = time.perf_counter() - start
+    in_order = all(vector[0] == len(text) for vector, text in zip(vectors, policies))
+    print(f"Embedded {len(vectors)} texts in {elapsed:.2f}s "
+          f"({len(requests_sent)} requests incl. retries)")
+    print(f"Output order matches input: {in_order}")
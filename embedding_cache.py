@@ -0,0 +1,219 @@
+"""
+Embedding Cache: Reusing Embeddings Between Runs
+
+This module provides:
+- A caching wrapper around any ChromaDB embedding function
+- Content-addressed keys (model name + SHA-256 of the normalized text)
+- A SQLite store saved next to ./chroma_db, so cached vectors survive restarts
+- LRU eviction bounded by entry count, with hit/miss counters
+- Registered with ChromaDB as "embedding_cache": when the wrapped function
+  can itself be stored (OpenAI's, local_embeddings'), a collection created
+  with the cache reopens with the cache and the same model in a later run
+
+Only the texts that miss the cache are sent to the wrapped model, so
+re-running step 6 does not pay for the same OpenAI embeddings twice.
+
+Usage:
+    openai_ef = embedding_functions.OpenAIEmbeddingFunction(model_name="text-embedding-3-small")
+    cached_ef = CachingEmbeddingFunction(openai_ef, model_name="text-embedding-3-small")
+    collection = client.get_or_create_collection(name="...", embedding_function=cached_ef)
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions import (config_to_embedding_function,
+                                                register_embedding_function)
+
+# Stored alongside the persistent database folder (./chroma_db)
+DEFAULT_CACHE_PATH = "./embedding_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def normalize_text(text):
+    """Collapse runs of whitespace so trivially different copies share a key."""
+    return " ".join(text.split())
+
+
+def cache_key(model_name, text):
+    """Content address for one text embedded by one model."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+@register_embedding_function
+class CachingEmbeddingFunction(EmbeddingFunction):
+    """Wraps an embedding function and caches its vectors on disk.
+
+    `embedding_function` can be any callable that takes a list of strings and
+    returns one vector per string (a ChromaDB embedding function, or a local
+    fake in tests). Entries are evicted least-recently-used first once the
+    cache holds more than `max_entries` vectors.
+
+    The configuration ChromaDB stores includes the wrapped function's; if
+    that one cannot be stored (a plain callable or a legacy embedding
+    function), neither can the cache, and ChromaDB treats it as legacy.
+    """
+
+    def __init__(self, embedding_function, model_name,
+                 path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __call__(self, input):
+        keys = [cache_key(self.model_name, text) for text in input]
+        with self._lock:
+            found = self._lookup(set(keys))
+
+        # Embed each distinct missing text once, even if repeated in the batch
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            fresh = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing, vectors)
+            }
+            with self._lock:
+                self._store(fresh)
+            found.update(fresh)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        return [found[key] for key in keys]
+
+    @staticmethod
+    def name():
+        return "embedding_cache"
+
+    def get_config(self):
+        wrapped = self.embedding_function
+        if not isinstance(wrapped, EmbeddingFunction) or wrapped.is_legacy():
+            return NotImplemented
+        return {
+            "embedding_function": {"name": wrapped.name(), "config": wrapped.get_config()},
+            "model_name": self.model_name,
+            "path": self.path,
+            "max_entries": self.max_entries,
+        }
+
+    @staticmethod
+    def build_from_config(config):
+        return CachingEmbeddingFunction(config_to_embedding_function(config["embedding_function"]),
+                                        model_name=config["model_name"], path=config["path"],
+                                        max_entries=config["max_entries"])
+
+    def _lookup(self, keys):
+        found = {}
+        key_list = list(keys)
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._conn.commit()
+        return found
+
+    def _store(self, vectors):
+        now = time.time()
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, vector.tobytes(), now) for key, vector in vectors.items()],
+        )
+        self._entries += self._conn.total_changes - before
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self._entries -= overflow
+        self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self):
+        """Drop every cached vector and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._entries = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    print("="*60)
+    print("EMBEDDING CACHE: Offline demo with a fake embedding model")
+    print("="*60)
+
+    calls = []
+
+    def fake_embedding_model(texts):
+        # Stands in for the OpenAI API: records every text it is asked to embed
+        calls.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 97)] for text in texts]
+
+    demo_path = os.path.join(tempfile.mkdtemp(), "embedding_cache.sqlite3")
+    cached_ef = CachingEmbeddingFunction(fake_embedding_model, model_name="fake-model",
+                                         path=demo_path, max_entries=3)
+
+    cached_ef(["hotel budget", "meal allowance"])
+    print(f"\nFirst call:  model embedded {len(calls)} texts")
+    cached_ef(["hotel  budget", "meal allowance", "flight class"])
+    print(f"Second call: model embedded {len(calls)} texts in total")
+    print(f"\nCache stats: {cached_ef.stats()}")
+    cached_ef.close()
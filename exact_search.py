@@ -0,0 +1,355 @@
+"""
+Exact Search: Brute Force for Small Collections
+
+Collections like travel_policies and saved_policies hold a handful of
+documents. For them an HNSW search (plus its per-call overhead) is slower
+than one vectorized matrix product, and still only approximate. This
+module provides:
+- ExactIndex: a collection's embeddings in one contiguous float32 matrix
+  with precomputed norms; a batch of queries is answered with a single
+  matmul plus argpartition, with the same distances ChromaDB reports for
+  the collection's space (l2, cosine or ip)
+- Metadata pre-filtering: the where filter picks the candidate rows before
+  the matmul, so filtered queries still return n_results matches
+- ExactSearchCollection: a Collection wrapper that uses the exact index
+  while the collection is at or below a size threshold and the normal HNSW
+  query above it. query_texts are embedded once, with embedding_function=
+  or else the one stored in the collection's configuration, and both paths
+  search with those vectors; `python cli.py query` goes through it
+
+The threshold comes from `python benchmark.py --exact`, which measures
+where brute force stops being faster and writes exact_threshold.json;
+without that file DEFAULT_THRESHOLD is used.
+
+The index is a snapshot: writes through the wrapper rebuild it. count() is
+re-read at most every recheck_seconds (not on every query) and a change
+in it, from writes made elsewhere, rebuilds the index too; an update()
+made by another client is not seen until refresh() is called.
+
+Usage:
+    collection = ExactSearchCollection(client.get_collection(name="saved_policies"))
+    collection.query(query_texts=["What is the hotel budget?"], n_results=3,
+                     where={"policy_type": "hotels"})
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from query_cache import _freeze
+from snapshot import hnsw_settings
+from streaming_reader import CollectionReader
+
+DEFAULT_THRESHOLD = 5000
+DEFAULT_RECHECK_SECONDS = 5.0
+THRESHOLD_FILE = "exact_threshold.json"
+
+_MISSING = object()
+
+
+def _kind(value):
+    """ChromaDB's comparison classes: bool, number (int and float) and str."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    return type(value).__name__
+
+
+def _target_for(value, target):
+    # ChromaDB compares an int value with a float operand truncated to int
+    if isinstance(value, int) and isinstance(target, float) and np.isfinite(target):
+        return int(target)
+    return target
+
+
+def _equal(value, target):
+    # True == 1 in Python, but not in ChromaDB
+    return (value is not _MISSING and _kind(value) == _kind(target)
+            and value == _target_for(value, target))
+
+
+def _ordered(compare):
+    def check(value, target):
+        if _kind(target) != "number":
+            raise ValueError(f"Ordering operators need a number, got {target!r}")
+        return _kind(value) == "number" and compare(value, _target_for(value, target))
+    return check
+
+
+# A record without the key passes $ne and $nin, and fails everything else
+_COMPARISONS = {
+    "$eq": _equal,
+    "$ne": lambda value, target: not _equal(value, target),
+    "$gt": _ordered(lambda value, target: value > target),
+    "$gte": _ordered(lambda value, target: value >= target),
+    "$lt": _ordered(lambda value, target: value < target),
+    "$lte": _ordered(lambda value, target: value <= target),
+    "$in": lambda value, target: any(_equal(value, item) for item in target),
+    "$nin": lambda value, target: not any(_equal(value, item) for item in target),
+}
+
+
+def load_threshold(path=THRESHOLD_FILE):
+    """Size threshold measured by benchmark.py --exact, or DEFAULT_THRESHOLD."""
+    if not os.path.exists(path):
+        return DEFAULT_THRESHOLD
+    with open(path) as f:
+        return int(json.load(f)["threshold"])
+
+
+def matches(metadata, where):
+    """Whether one metadata dict passes a ChromaDB where filter.
+
+    Supports $and, $or and the comparison operators $eq, $ne, $gt, $gte,
+    $lt, $lte, $in and $nin, with ChromaDB's rules: a record without the
+    key only passes $ne and $nin, and values only equal values of the same
+    kind (True is not 1, but 1 is 1.0; an int value is compared with a
+    float operand truncated to int). Raises ValueError for anything else.
+    """
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, part) for part in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported where operator: {key}")
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key, _MISSING)
+            for operator, target in condition.items():
+                if operator not in _COMPARISONS:
+                    raise ValueError(f"Unsupported where operator: {operator}")
+                if not _COMPARISONS[operator](value, target):
+                    return False
+    return True
+
+
+class ExactIndex:
+    """In-memory brute-force index over stored embeddings."""
+
+    def __init__(self, ids, embeddings, documents=None, metadatas=None, space="l2"):
+        if space not in ("l2", "cosine", "ip"):
+            raise ValueError(f"Unknown space: {space}")
+        self.ids = list(ids)
+        self.documents = list(documents) if documents is not None else [None] * len(self.ids)
+        self.metadatas = list(metadatas) if metadatas is not None else [None] * len(self.ids)
+        self.space = space
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(self.ids), -1)
+        self.embeddings = matrix
+        norms = np.linalg.norm(matrix, axis=1)
+        if space == "cosine":
+            # Unit rows, so cosine similarity is a plain dot product
+            self.matrix = np.ascontiguousarray(matrix / np.maximum(norms, 1e-12)[:, None])
+        else:
+            self.matrix = matrix
+        self.squared_norms = norms * norms
+        self._masks = {}
+
+    @classmethod
+    def from_collection(cls, collection, page_size=1000):
+        """Load every record of a collection, page by page."""
+        ids, documents, metadatas, embeddings = [], [], [], []
+        reader = CollectionReader(collection, include=["documents", "metadatas", "embeddings"],
+                                  page_size=page_size)
+        for page in reader.pages():
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+            embeddings.extend(page["embeddings"])
+        space = hnsw_settings(collection).get("space", "l2")
+        dimension = len(embeddings[0]) if embeddings else 0
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), dimension)
+        return cls(ids, matrix, documents, metadatas, space)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def candidates(self, where):
+        """Row numbers passing the filter (None means all rows); cached per filter."""
+        if not where:
+            return None
+        key = _freeze(where)
+        if key not in self._masks:
+            self._masks[key] = np.flatnonzero(
+                [matches(metadata, where) for metadata in self.metadatas])
+        return self._masks[key]
+
+    def search(self, query_embeddings, n_results=10, where=None,
+               include=("metadatas", "documents", "distances")):
+        """Exact top-n_results per query, shaped like collection.query() results."""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        rows = self.candidates(where)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        squared_norms = self.squared_norms if rows is None else self.squared_norms[rows]
+
+        if self.space == "cosine":
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        if matrix.shape[0] == 0:
+            # No candidates (an empty collection has no dimension to multiply with)
+            distances = np.empty((len(queries), 0), dtype=np.float32)
+        elif self.space == "l2":
+            scores = queries @ matrix.T
+            # ChromaDB reports squared L2
+            distances = (queries * queries).sum(axis=1)[:, None] + squared_norms[None, :] \
+                - 2 * scores
+            np.maximum(distances, 0, out=distances)
+        else:
+            distances = 1 - queries @ matrix.T
+
+        k = min(n_results, distances.shape[1])
+        if k == 0:
+            top = np.empty((len(queries), 0), dtype=np.intp)
+        elif k < distances.shape[1]:
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), (len(queries), k))
+        order = np.take_along_axis(distances, top, axis=1).argsort(axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        positions = top if rows is None else rows[top]
+
+        result = {"ids": [[self.ids[i] for i in row] for row in positions],
+                  "embeddings": None, "documents": None, "uris": None, "data": None,
+                  "metadatas": None, "distances": None, "included": list(include)}
+        if "distances" in include:
+            result["distances"] = np.take_along_axis(distances, top, axis=1).tolist()
+        if "documents" in include:
+            result["documents"] = [[self.documents[i] for i in row] for row in positions]
+        if "metadatas" in include:
+            result["metadatas"] = [[self.metadatas[i] for i in row] for row in positions]
+        if "embeddings" in include:
+            result["embeddings"] = [self.embeddings[row] for row in positions]
+        return result
+
+
+class ExactSearchCollection:
+    """Wraps a Collection so small collections are searched exactly in memory.
+
+    Every other attribute is forwarded to the wrapped collection.
+    """
+
+    def __init__(self, collection, threshold=None, embedding_function=None,
+                 recheck_seconds=DEFAULT_RECHECK_SECONDS):
+        self._collection = collection
+        self.threshold = load_threshold() if threshold is None else threshold
+        self.embedding_function = embedding_function
+        self.recheck_seconds = recheck_seconds
+        self._stored_embedding_function = _MISSING
+        self._index = None
+        self._count = None
+        self._count_checked = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def __repr__(self):
+        return f"ExactSearchCollection({self._collection!r})"
+
+    @property
+    def collection(self):
+        return self._collection
+
+    def refresh(self):
+        """Drop the in-memory index; the next query reloads it."""
+        self._index = None
+        self._count = None
+
+    def _current_count(self):
+        now = time.monotonic()
+        if self._count is None or now - self._count_checked >= self.recheck_seconds:
+            self._count = self._collection.count()
+            self._count_checked = now
+        return self._count
+
+    def _exact_index(self):
+        """The loaded index, or None when the collection is over the threshold."""
+        count = self._current_count()
+        if count > self.threshold:
+            self._index = None
+            return None
+        if self._index is None or len(self._index) != count:
+            self._index = ExactIndex.from_collection(self._collection)
+        return self._index
+
+    def _query_embedding_function(self):
+        """embedding_function=, else the stored one (None for legacy ones)."""
+        if self.embedding_function is not None:
+            return self.embedding_function
+        if self._stored_embedding_function is _MISSING:
+            # configuration builds a new instance on every access, so keep this one
+            self._stored_embedding_function = \
+                self._collection.configuration.get("embedding_function")
+        return self._stored_embedding_function
+
+    def _embed_queries(self, texts):
+        embedding_function = self._query_embedding_function()
+        if hasattr(embedding_function, "embed_query"):
+            return embedding_function.embed_query(input=texts)
+        return embedding_function(texts)
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None,
+              where_document=None, include=("metadatas", "documents", "distances"), **kwargs):
+        if query_embeddings is None and self._query_embedding_function() is not None:
+            if isinstance(query_texts, str):
+                query_texts = [query_texts]
+            # One embedding, used by whichever path answers
+            query_embeddings = self._embed_queries(query_texts)
+            query_texts = None
+        # Without either, only the collection itself can embed query_texts
+        exact = query_embeddings is not None and not where_document and not kwargs
+        index = self._exact_index() if exact else None
+        if index is not None:
+            try:
+                index.candidates(where)
+            except ValueError:
+                index = None  # a filter the exact engine cannot evaluate
+        if index is None:
+            return self._collection.query(query_texts=query_texts,
+                                          query_embeddings=query_embeddings,
+                                          n_results=n_results, where=where,
+                                          where_document=where_document,
+                                          include=list(include), **kwargs)
+        return index.search(query_embeddings, n_results, where, include)
+
+    # Writes through the wrapper drop the index so the next query reloads it
+
+    def add(self, *args, **kwargs):
+        try:
+            return self._collection.add(*args, **kwargs)
+        finally:
+            self.refresh()
+
+    def upsert(self, *args, **kwargs):
+        try:
+            return self._collection.upsert(*args, **kwargs)
+        finally:
+            self.refresh()
+
+    def update(self, *args, **kwargs):
+        try:
+            return self._collection.update(*args, **kwargs)
+        finally:
+            self.refresh()
+
+    def delete(self, *args, **kwargs):
+        try:
+            return self._collection.delete(*args, **kwargs)
+        finally:
+            self.refresh()
+
+    def modify(self, *args, **kwargs):
+        try:
+            return self._collection.modify(*args, **kwargs)
+        finally:
+            self._stored_embedding_function = _MISSING
+            self.refresh()
@@ -0,0 +1,162 @@
+"""
+Fan-Out Search: One Query Across Many Collections
+
+Step 5 keeps travel_policies, hr_policies and it_policies as separate
+collections. This module provides:
+- Querying any number of collections (or the same collection in several
+  sharded PersistentClient directories) concurrently on a thread pool
+- A global top-k per query, merged by distance
+- A source tag on every hit
+- A per-query timeout: shards that have not answered in time are left out
+  and reported, instead of holding up the whole response. A shard whose
+  previous call is still running is skipped (and reported the same way)
+  rather than given another worker, so one slow shard cannot fill the pool
+
+Distances are only comparable when every shard uses the same embedding
+model and distance space. Pass embedding_function= to embed each query
+once and send the same vector to every shard.
+
+Usage:
+    search = FanOutSearch([travel, hr, it], timeout=2.0)
+    results = search.query(query_texts=["remote work policy"], n_results=5)
+    for doc_id, source, distance in zip(results["ids"][0], results["sources"][0],
+                                        results["distances"][0]):
+        print(source, doc_id, distance)
+
+    search = FanOutSearch(open_shards(["./shard0", "./shard1"], "travel_policies"))
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+
+from query_cache import merge_rows
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_WORKERS = 8
+DEFAULT_INCLUDE = ("documents", "metadatas", "distances")
+
+_RESULT_FIELDS = ("ids", "embeddings", "documents", "uris", "data", "metadatas", "distances")
+
+
+def open_shards(paths, collection_name, embedding_function=None):
+    """(label, collection) for `collection_name` in each PersistentClient path."""
+    import chromadb
+
+    shards = []
+    for path in paths:
+        client = chromadb.PersistentClient(path=path)
+        kwargs = {"embedding_function": embedding_function} if embedding_function else {}
+        collection = client.get_collection(name=collection_name, **kwargs)
+        shards.append((f"{os.path.basename(os.path.normpath(path))}/{collection_name}", collection))
+    return shards
+
+
+def merge_top_k(shard_results, n_results, query_count):
+    """Merge per-shard query results into one result with a global top-k.
+
+    `shard_results` is a list of (label, result). Every result must include
+    distances. The merged result has the usual fields plus "sources".
+    """
+    rows = []
+    for query_index in range(query_count):
+        hits = []
+        for label, result in shard_results:
+            for rank, distance in enumerate(result["distances"][query_index]):
+                hits.append((distance, label, result, rank))
+        hits.sort(key=lambda hit: hit[0])
+        hits = hits[:n_results]
+
+        row = {"sources": [label for _, label, _, _ in hits]}
+        for field in _RESULT_FIELDS:
+            if field == "ids" or any(result.get(field) is not None for _, result in shard_results):
+                row[field] = [result[field][query_index][rank] for _, _, result, rank in hits]
+            else:
+                row[field] = None
+        row["included"] = shard_results[0][1].get("included") if shard_results else []
+        rows.append(row)
+
+    merged = merge_rows(rows)
+    merged["sources"] = [row["sources"] for row in rows]
+    return merged
+
+
+class FanOutSearch:
+    """Queries several collections in parallel and merges the hits."""
+
+    def __init__(self, shards, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS,
+                 embedding_function=None):
+        # Accept bare collections (labelled by name) or (label, collection) pairs
+        self.shards = [shard if isinstance(shard, tuple) else (shard.name, shard)
+                       for shard in shards]
+        labels = [label for label, _ in self.shards]
+        duplicates = sorted({label for label in labels if labels.count(label) > 1})
+        if duplicates:
+            raise ValueError(f"duplicate shard labels: {duplicates}; pass (label, collection) "
+                             "pairs with unique labels")
+        self.timeout = timeout
+        self.embedding_function = embedding_function
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        # label -> the shard's latest call, which may outlive a timed-out query
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None,
+              where_document=None, include=DEFAULT_INCLUDE, timeout=None):
+        """Top `n_results` over all shards, in collection.query()'s result format.
+
+        Extra keys: "sources" (the shard label of each hit), "timed_out"
+        and "failed" (labels of shards left out of this answer). A shard
+        still busy with an earlier timed-out call counts as timed out.
+        """
+        if query_embeddings is None and self.embedding_function is not None:
+            query_embeddings = self.embedding_function(query_texts)
+        query_count = len(query_embeddings if query_embeddings is not None else query_texts)
+        include = list(include)
+        if "distances" not in include:
+            include.append("distances")
+        kwargs = {"n_results": n_results, "where": where, "where_document": where_document,
+                  "include": include}
+        if query_embeddings is not None:
+            kwargs["query_embeddings"] = query_embeddings
+        else:
+            kwargs["query_texts"] = query_texts
+
+        start = time.perf_counter()
+        futures = {}
+        busy = []
+        with self._lock:
+            for label, collection in self.shards:
+                previous = self._running.get(label)
+                if previous is not None and not previous.done():
+                    busy.append(label)
+                    continue
+                future = self._pool.submit(collection.query, **kwargs)
+                self._running[label] = future
+                futures[future] = label
+        done, pending = concurrent.futures.wait(
+            futures, timeout=self.timeout if timeout is None else timeout)
+
+        answered = []
+        failed = []
+        for future in done:
+            try:
+                answered.append((futures[future], future.result()))
+            except Exception:
+                failed.append(futures[future])
+        for future in pending:
+            # The thread finishes in the background; its answer is dropped
+            future.cancel()
+        # Keep shard order stable so equal distances always merge the same way
+        order = {label: i for i, (label, _) in enumerate(self.shards)}
+        answered.sort(key=lambda item: order[item[0]])
+
+        merged = merge_top_k(answered, n_results, query_count)
+        merged["timed_out"] = sorted([futures[future] for future in pending] + busy)
+        merged["failed"] = sorted(failed)
+        merged["seconds"] = time.perf_counter() - start
+        return merged
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,240 @@
+"""
+HNSW Tuner: Choosing Index Settings from Measured Recall and Latency
+
+Every collection in the step scripts uses ChromaDB's default HNSW settings.
+This script takes a sample of a real collection (or synthetic vectors)
+and a query set, then:
+- Builds a trial collection for each combination of hnsw:space,
+  hnsw:construction_ef, hnsw:M and hnsw:search_ef (search_ef could be
+  changed with modify(), but an index that is already loaded keeps the
+  old value until it is reloaded, so each value gets its own trial)
+- Measures recall@k against exact brute-force results in the same space,
+  p50/p95 query latency, build time and on-disk index size
+- Recommends the fastest configuration that reaches the target recall,
+  and can apply it to the source collection
+
+Applying only a different search_ef is done in place with modify() and
+takes effect the next time the collection is loaded (e.g. the next run);
+any other change needs a new index, so the collection is copied (with its
+stored embeddings, nothing is re-embedded) into a new one and the names
+are swapped. The copy keeps the collection's metadata and embedding-function
+configuration but gets a new collection id; the original is kept as
+"<name>_pre_tuning".
+
+Usage:
+    python hnsw_tuner.py --collection saved_policies --sample 20000
+    python hnsw_tuner.py --synthetic 20000 --m 8 16 32 --search-ef 10 50 100
+    python hnsw_tuner.py --collection saved_policies --apply
+"""
+
+import argparse
+import itertools
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from catalog import read_sqlite_stats
+from reduced_embeddings import load_vectors
+from snapshot import copy_configuration
+from streaming_reader import copy_records
+
+DEFAULT_K = 10
+DEFAULT_TARGET_RECALL = 0.95
+DEFAULT_CONSTRUCTION_EF = [100, 200]
+DEFAULT_SEARCH_EF = [10, 50, 100, 200]
+DEFAULT_M = [16, 32]
+PREVIOUS_SUFFIX = "_pre_tuning"
+
+
+def exact_neighbors(vectors, queries, k, space):
+    """Brute-force top-k row indices per query under ChromaDB's distance for `space`."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ vectors.T
+    if space == "l2":
+        # Squared L2 up to a per-query constant: |v|^2 - 2 q.v
+        distances = (vectors * vectors).sum(axis=1)[None, :] - 2 * scores
+    else:
+        distances = -scores
+    k = min(k, vectors.shape[0])
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def _build(client, name, vectors, space, construction_ef, m, search_ef, batch_size):
+    collection = client.create_collection(name=name, metadata={
+        "hnsw:space": space, "hnsw:construction_ef": construction_ef, "hnsw:M": m,
+        "hnsw:search_ef": search_ef})
+    ids = [str(i) for i in range(len(vectors))]
+    start = time.perf_counter()
+    for first in range(0, len(vectors), batch_size):
+        collection.add(ids=ids[first:first + batch_size],
+                       embeddings=vectors[first:first + batch_size])
+    return collection, time.perf_counter() - start
+
+
+def _measure(collection, queries, truth, k):
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found = {int(doc_id) for doc_id in result["ids"][0]}
+        recalls.append(len(found & expected) / len(expected))
+    latencies = np.asarray(latencies) * 1000
+    return float(np.mean(recalls)), float(np.percentile(latencies, 50)), \
+        float(np.percentile(latencies, 95))
+
+
+def tune(vectors, queries, spaces, construction_efs, search_efs, ms, k=DEFAULT_K):
+    """Evaluate every configuration; returns one row per (space, construction_ef, M, search_ef)."""
+    import chromadb
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    workdir = tempfile.mkdtemp(prefix="chroma_tuning_")
+    rows = []
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        batch_size = client.get_max_batch_size()
+        truth = {space: exact_neighbors(vectors, queries, k, space) for space in spaces}
+        for number, (space, construction_ef, m, search_ef) in enumerate(
+                itertools.product(spaces, construction_efs, ms, search_efs)):
+            collection, build_seconds = _build(client, f"trial_{number}", vectors, space,
+                                               construction_ef, m, search_ef, batch_size)
+            recall, p50, p95 = _measure(collection, queries, truth[space], k)
+            index_bytes = (read_sqlite_stats(workdir) or {}).get("index_bytes", {}) \
+                .get(str(collection.id))
+            rows.append({"space": space, "construction_ef": construction_ef, "M": m,
+                         "search_ef": search_ef, f"recall@{k}": recall, "p50_ms": p50,
+                         "p95_ms": p95, "build_seconds": build_seconds,
+                         "index_bytes": index_bytes})
+            client.delete_collection(name=collection.name)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def recommend(rows, target_recall=DEFAULT_TARGET_RECALL, k=DEFAULT_K):
+    """Fastest (p95) configuration meeting the target; otherwise the most accurate."""
+    recall_key = f"recall@{k}"
+    good = [row for row in rows if row[recall_key] >= target_recall]
+    if good:
+        return min(good, key=lambda row: (row["p95_ms"], row["build_seconds"]))
+    return max(rows, key=lambda row: (row[recall_key], -row["p95_ms"]))
+
+
+def current_settings(collection):
+    hnsw = (getattr(collection, "configuration_json", None) or {}).get("hnsw") or {}
+    return {"space": hnsw.get("space", "l2"), "construction_ef": hnsw.get("ef_construction"),
+            "M": hnsw.get("max_neighbors"), "search_ef": hnsw.get("ef_search")}
+
+
+def apply_settings(client, name, settings, page_size=1000):
+    """Give collection `name` the recommended settings. Returns "modified" or "rebuilt"."""
+    collection = client.get_collection(name=name)
+    current = current_settings(collection)
+    if all(current[key] == settings[key] for key in ("space", "construction_ef", "M")):
+        collection.modify(configuration={"hnsw": {"ef_search": settings["search_ef"]}})
+        return "modified"
+
+    metadata = {key: value for key, value in (collection.metadata or {}).items()
+                if not key.startswith("hnsw:")}
+    metadata.update({"hnsw:space": settings["space"],
+                     "hnsw:construction_ef": settings["construction_ef"],
+                     "hnsw:M": settings["M"], "hnsw:search_ef": settings["search_ef"]})
+    # The stored embedding function comes along, so query_texts keeps using it
+    configuration = copy_configuration(collection)
+    configuration["hnsw"] = {"space": settings["space"],
+                             "ef_construction": settings["construction_ef"],
+                             "max_neighbors": settings["M"], "ef_search": settings["search_ef"]}
+    staging = client.create_collection(name=f"{name}_tuning", metadata=metadata,
+                                       configuration=configuration)
+    copy_records(collection, staging, page_size=min(page_size, client.get_max_batch_size()))
+    # Same swap as migrate_embeddings.py: two renames
+    collection.modify(name=f"{name}{PREVIOUS_SUFFIX}")
+    staging.modify(name=name)
+    return "rebuilt"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune HNSW settings by measured recall/latency.")
+    parser.add_argument("--db", default="./chroma_db")
+    parser.add_argument("--collection", default="saved_policies")
+    parser.add_argument("--sample", type=int, default=20_000, help="max stored vectors to use")
+    parser.add_argument("--synthetic", type=int, help="use N synthetic local embeddings instead")
+    parser.add_argument("--synthetic-dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    parser.add_argument("--spaces", nargs="+", choices=["l2", "cosine", "ip"],
+                        help="default: the collection's current space")
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=DEFAULT_CONSTRUCTION_EF)
+    parser.add_argument("--search-ef", type=int, nargs="+", default=DEFAULT_SEARCH_EF)
+    parser.add_argument("--m", type=int, nargs="+", default=DEFAULT_M)
+    parser.add_argument("--target-recall", type=float, default=DEFAULT_TARGET_RECALL)
+    parser.add_argument("--output", help="write all measurements to this JSON file")
+    parser.add_argument("--apply", action="store_true",
+                        help="apply the recommendation to --collection")
+    args = parser.parse_args(argv)
+
+    print("="*60)
+    print("HNSW TUNER: recall vs latency")
+    print("="*60)
+
+    vectors, queries = load_vectors(args)
+    spaces = args.spaces
+    if spaces is None:
+        if args.synthetic:
+            spaces = ["cosine"]
+        else:
+            import chromadb
+            source = chromadb.PersistentClient(path=args.db).get_collection(name=args.collection)
+            spaces = [current_settings(source)["space"]]
+    print(f"\n  {len(vectors)} vectors ({vectors.shape[1]}d), {len(queries)} queries, k={args.k}")
+    print(f"  Spaces {spaces}, construction_ef {args.construction_ef}, M {args.m}, "
+          f"search_ef {args.search_ef}\n")
+
+    rows = tune(vectors, queries, spaces, args.construction_ef, args.search_ef, args.m, args.k)
+    recall_key = f"recall@{args.k}"
+    print(f"  {'space':<7} {'c_ef':>5} {'M':>4} {'s_ef':>5} {recall_key:>10} {'p50 ms':>7} "
+          f"{'p95 ms':>7} {'build s':>8} {'index MB':>9}")
+    for row in rows:
+        size = f"{row['index_bytes'] / (1024 * 1024):.1f}" if row["index_bytes"] else "-"
+        print(f"  {row['space']:<7} {row['construction_ef']:>5} {row['M']:>4} "
+              f"{row['search_ef']:>5} {row[recall_key]:>10.3f} {row['p50_ms']:>7.2f} "
+              f"{row['p95_ms']:>7.2f} {row['build_seconds']:>8.1f} {size:>9}")
+
+    best = recommend(rows, args.target_recall, args.k)
+    met = best[recall_key] >= args.target_recall
+    print(f"\n{'✓' if met else '✗'} Recommended: hnsw:space={best['space']}, "
+          f"hnsw:construction_ef={best['construction_ef']}, hnsw:M={best['M']}, "
+          f"hnsw:search_ef={best['search_ef']} ({recall_key} {best[recall_key]:.3f}, "
+          f"p95 {best['p95_ms']:.2f} ms)")
+    if not met:
+        print(f"  No configuration reached recall {args.target_recall}; showing the most accurate")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": rows, "recommended": best}, f, indent=2)
+        print(f"  Measurements written to {args.output}")
+
+    if args.apply and not met:
+        print("  Not applied: the target recall was not reached")
+    elif args.apply and not args.synthetic:
+        import chromadb
+        client = chromadb.PersistentClient(path=args.db)
+        how = apply_settings(client, args.collection, best)
+        print(f"  Applied to '{args.collection}' ({how})")
+        if how == "modified":
+            print("  The new search_ef takes effect when the collection is next loaded")
+
+
+if __name__ == "__main__":
+    main()
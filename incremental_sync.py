@@ -0,0 +1,99 @@
+"""
+Incremental Sync: Only Re-Embed What Changed
+
+This module provides:
+- A content hash per document, stored in its metadata under "content_hash"
+- Paged reads of the ids and hashes already in a collection
+- A sync that upserts only new or changed documents and deletes only
+  the ones that disappeared from the source
+
+Re-running ingestion over a mostly-unchanged corpus then costs embeddings
+proportional to the number of changes, not the size of the corpus.
+
+Usage:
+    records = [(id, document, metadata), ...]
+    stats = sync_collection(collection, records)
+"""
+
+import hashlib
+import json
+
+from streaming_reader import CollectionReader
+
+CONTENT_HASH_KEY = "content_hash"
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 500
+
+
+def content_hash(document, metadata=None):
+    """SHA-256 over the document text and its (hash-free) metadata."""
+    metadata = {key: value for key, value in (metadata or {}).items() if key != CONTENT_HASH_KEY}
+    payload = json.dumps([document, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def iter_stored_hashes(collection, page_size=DEFAULT_PAGE_SIZE):
+    """Yield (id, content_hash) for every stored document, one page at a time.
+
+    Documents and embeddings are never fetched. Documents stored without a
+    hash yield None, so the next sync rewrites them once.
+    """
+    reader = CollectionReader(collection, include=["metadatas"], page_size=page_size)
+    for record in reader:
+        yield record["id"], (record["metadata"] or {}).get(CONTENT_HASH_KEY)
+
+
+def plan_sync(collection, desired_hashes, page_size=DEFAULT_PAGE_SIZE):
+    """Compare {id: hash} with the collection.
+
+    Returns (new_ids, changed_ids, removed_ids).
+    """
+    seen = set()
+    changed_ids = []
+    removed_ids = []
+    for doc_id, stored_hash in iter_stored_hashes(collection, page_size):
+        if doc_id not in desired_hashes:
+            removed_ids.append(doc_id)
+            continue
+        seen.add(doc_id)
+        if stored_hash != desired_hashes[doc_id]:
+            changed_ids.append(doc_id)
+    new_ids = [doc_id for doc_id in desired_hashes if doc_id not in seen]
+    return new_ids, changed_ids, removed_ids
+
+
+def sync_collection(collection, records, page_size=DEFAULT_PAGE_SIZE,
+                    batch_size=DEFAULT_BATCH_SIZE, delete_missing=True):
+    """Make `collection` match `records`, touching only what differs.
+
+    `records` is a sequence of (id, document, metadata) tuples. Returns a
+    dict with the number of added, updated, unchanged and deleted documents.
+    """
+    by_id = {}
+    desired_hashes = {}
+    for doc_id, document, metadata in records:
+        digest = content_hash(document, metadata)
+        by_id[doc_id] = (document, dict(metadata or {}, **{CONTENT_HASH_KEY: digest}))
+        desired_hashes[doc_id] = digest
+
+    new_ids, changed_ids, removed_ids = plan_sync(collection, desired_hashes, page_size)
+
+    to_write = new_ids + changed_ids
+    for start in range(0, len(to_write), batch_size):
+        ids = to_write[start:start + batch_size]
+        collection.upsert(
+            ids=ids,
+            documents=[by_id[doc_id][0] for doc_id in ids],
+            metadatas=[by_id[doc_id][1] for doc_id in ids],
+        )
+
+    if delete_missing:
+        for start in range(0, len(removed_ids), batch_size):
+            collection.delete(ids=removed_ids[start:start + batch_size])
+
+    return {
+        "added": len(new_ids),
+        "updated": len(changed_ids),
+        "unchanged": len(desired_hashes) - len(to_write),
+        "deleted": len(removed_ids) if delete_missing else 0,
+    }
@@ -0,0 +1,337 @@
+"""
+Instrumentation: Where Does the Time Go?
+
+This module provides:
+- InstrumentedClient / InstrumentedCollection, drop-in wrappers that time
+  add, query, get, upsert, update, delete and count on every collection
+- Per-operation latency histograms and batch sizes
+- Embedding time split out from the rest of each call (index search,
+  metadata filtering and storage I/O)
+- Optional tracemalloc memory deltas per call
+- Export as JSON or in the Prometheus text format
+- profile_client(), which the step scripts use to switch all of this on
+  with a --profile command-line flag
+
+Usage:
+    metrics = Metrics()
+    client = InstrumentedClient(chromadb.Client(), metrics)
+    collection = client.get_or_create_collection(name="travel_policies")
+    ...
+    print(metrics.report())
+    open("metrics.prom", "w").write(metrics.to_prometheus())
+
+    python step3_crud_operations.py --profile
+
+Notes:
+- Embedding time is measured around the collection's internal embedding
+  step; if a ChromaDB version does not expose it, it is reported as 0 and
+  everything counts as search time.
+- tracemalloc only sees Python allocations, not memory allocated inside
+  ChromaDB's Rust core or ONNX Runtime.
+"""
+
+import atexit
+import bisect
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+# Latency bucket upper bounds in seconds (Prometheus convention)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+OPERATIONS = ("add", "query", "get", "upsert", "update", "delete", "count")
+PROFILE_FLAG = "--profile"
+
+
+class Histogram:
+    """Cumulative-bucket histogram plus sum and count."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class OperationStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.batch_size = Histogram(BATCH_BUCKETS)
+        self.embed_seconds = 0.0
+        self.errors = 0
+        self.memory_bytes = 0
+        self.memory_peak_bytes = 0
+
+
+class Metrics:
+    """Thread-safe registry of per (collection, operation) statistics."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self._stats = {}
+        self._lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def record(self, collection, operation, seconds, batch_size=None, embed_seconds=0.0,
+               error=False, memory_bytes=0, memory_peak_bytes=0):
+        with self._lock:
+            stats = self._stats.setdefault((collection, operation), OperationStats())
+            stats.latency.observe(seconds)
+            if batch_size is not None:
+                stats.batch_size.observe(batch_size)
+            stats.embed_seconds += embed_seconds
+            stats.errors += int(error)
+            stats.memory_bytes += memory_bytes
+            stats.memory_peak_bytes = max(stats.memory_peak_bytes, memory_peak_bytes)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """One dict per (collection, operation), suitable for JSON."""
+        with self._lock:
+            items = sorted(self._stats.items())
+        rows = []
+        for (collection, operation), stats in items:
+            total = stats.latency.sum
+            rows.append({
+                "collection": collection,
+                "operation": operation,
+                "calls": stats.latency.count,
+                "errors": stats.errors,
+                "total_seconds": total,
+                "embed_seconds": stats.embed_seconds,
+                "search_seconds": max(total - stats.embed_seconds, 0.0),
+                "p50_seconds": stats.latency.quantile(0.50),
+                "p95_seconds": stats.latency.quantile(0.95),
+                "p99_seconds": stats.latency.quantile(0.99),
+                "mean_batch_size": (stats.batch_size.sum / stats.batch_size.count
+                                    if stats.batch_size.count else None),
+                "memory_bytes": stats.memory_bytes if self.trace_memory else None,
+                "memory_peak_bytes": stats.memory_peak_bytes if self.trace_memory else None,
+                "latency_histogram": stats.latency.to_dict(),
+                "batch_size_histogram": stats.batch_size.to_dict(),
+            })
+        return rows
+
+    def to_json(self, indent=2):
+        return json.dumps({"generated_at": time.time(), "operations": self.snapshot()},
+                          indent=indent)
+
+    def to_prometheus(self, prefix="chromadb"):
+        """Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._stats.items())
+        lines = []
+
+        def histogram(name, help_text, pick):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for (collection, operation), stats in items:
+                hist = pick(stats)
+                labels = f'collection="{collection}",operation="{operation}"'
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_{name}_sum{{{labels}}} {hist.sum}")
+                lines.append(f"{prefix}_{name}_count{{{labels}}} {hist.count}")
+
+        def counter(name, help_text, pick):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for (collection, operation), stats in items:
+                labels = f'collection="{collection}",operation="{operation}"'
+                lines.append(f"{prefix}_{name}{{{labels}}} {pick(stats)}")
+
+        histogram("operation_duration_seconds", "Collection call latency.",
+                  lambda stats: stats.latency)
+        histogram("operation_batch_size", "Records or queries per call.",
+                  lambda stats: stats.batch_size)
+        counter("embedding_seconds_total", "Time spent computing embeddings.",
+                lambda stats: stats.embed_seconds)
+        counter("operation_errors_total", "Calls that raised.", lambda stats: stats.errors)
+        if self.trace_memory:
+            counter("python_allocated_bytes_total", "Net Python allocations (tracemalloc).",
+                    lambda stats: stats.memory_bytes)
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Human-readable table in the style of the step scripts."""
+        lines = [f"  {'collection/operation':<36} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} "
+                 f"{'embed %':>8} {'batch':>7}"]
+        for row in self.snapshot():
+            total = row["total_seconds"]
+            embed_share = 100 * row["embed_seconds"] / total if total else 0.0
+            batch = f"{row['mean_batch_size']:.1f}" if row["mean_batch_size"] is not None else "-"
+            lines.append(f"  {row['collection'] + '.' + row['operation']:<36} {row['calls']:>6} "
+                         f"{row['p50_seconds'] * 1000:>8.1f} {row['p95_seconds'] * 1000:>8.1f} "
+                         f"{embed_share:>7.0f}% {batch:>7}")
+        return "\n".join(lines)
+
+
+def _batch_size(operation, kwargs, result):
+    if operation == "query":
+        for key in ("query_texts", "query_embeddings", "query_images", "query_uris"):
+            if kwargs.get(key) is not None:
+                value = kwargs[key]
+                return 1 if isinstance(value, str) else len(value)
+        return None
+    ids = kwargs.get("ids")
+    if ids is not None:
+        return 1 if isinstance(ids, str) else len(ids)
+    if operation == "get" and isinstance(result, dict):
+        return len(result["ids"])
+    return None
+
+
+class InstrumentedCollection:
+    """Times every data call on a collection; everything else is delegated."""
+
+    def __init__(self, collection, metrics):
+        self._collection = collection
+        self._metrics = metrics
+        self._local = threading.local()
+        embed = getattr(collection, "_embed", None)
+        if embed is not None:
+            # Wrap the collection's own embedding step to split embed vs search time
+            def timed_embed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return embed(*args, **kwargs)
+                finally:
+                    self._local.embed_seconds = (getattr(self._local, "embed_seconds", 0.0)
+                                                 + time.perf_counter() - start)
+            collection._embed = timed_embed
+
+    def _call(self, operation, kwargs):
+        self._local.embed_seconds = 0.0
+        trace = self._metrics.trace_memory and tracemalloc.is_tracing()
+        if trace:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = None
+        error = False
+        try:
+            result = getattr(self._collection, operation)(**kwargs)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            memory = peak = 0
+            if trace:
+                after, peak_now = tracemalloc.get_traced_memory()
+                memory, peak = after - before, peak_now - before
+            self._metrics.record(self._collection.name, operation, seconds,
+                                 batch_size=_batch_size(operation, kwargs, result),
+                                 embed_seconds=self._local.embed_seconds, error=error,
+                                 memory_bytes=memory, memory_peak_bytes=peak)
+
+    def add(self, **kwargs):
+        return self._call("add", kwargs)
+
+    def query(self, **kwargs):
+        return self._call("query", kwargs)
+
+    def get(self, **kwargs):
+        return self._call("get", kwargs)
+
+    def upsert(self, **kwargs):
+        return self._call("upsert", kwargs)
+
+    def update(self, **kwargs):
+        return self._call("update", kwargs)
+
+    def delete(self, **kwargs):
+        return self._call("delete", kwargs)
+
+    def count(self):
+        return self._call("count", {})
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class InstrumentedClient:
+    """Hands out InstrumentedCollections; everything else is delegated."""
+
+    def __init__(self, client, metrics=None):
+        self._client = client
+        self.metrics = metrics or Metrics()
+
+    def create_collection(self, *args, **kwargs):
+        return InstrumentedCollection(self._client.create_collection(*args, **kwargs),
+                                      self.metrics)
+
+    def get_collection(self, *args, **kwargs):
+        return InstrumentedCollection(self._client.get_collection(*args, **kwargs),
+                                      self.metrics)
+
+    def get_or_create_collection(self, *args, **kwargs):
+        return InstrumentedCollection(self._client.get_or_create_collection(*args, **kwargs),
+                                      self.metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def profile_client(client, argv=None, output="profile.json"):
+    """Instrument `client` if --profile is on the command line.
+
+    With the flag, a report is printed when the script exits and the
+    metrics are written to `output` (JSON) and `output` with a .prom
+    extension (Prometheus text). Without it, the client is returned as is.
+    """
+    argv = sys.argv if argv is None else argv
+    if PROFILE_FLAG not in argv:
+        return client
+    instrumented = InstrumentedClient(client, Metrics(trace_memory=True))
+
+    def write_report():
+        metrics = instrumented.metrics
+        print("\n" + "="*60)
+        print("PROFILE")
+        print("="*60)
+        print(metrics.report())
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(metrics.to_json())
+        prometheus_path = output.rsplit(".", 1)[0] + ".prom"
+        with open(prometheus_path, "w", encoding="utf-8") as f:
+            f.write(metrics.to_prometheus())
+        print(f"\n  Metrics written to {output} and {prometheus_path}")
+
+    atexit.register(write_report)
+    return instrumented
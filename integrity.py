@@ -0,0 +1,268 @@
+"""
+Integrity Checker: Is the Persistent Data Intact?
+
+step4_verify_persistence.py prints what is stored. This module checks it:
+- Scans every collection of a PersistentClient in parallel (one thread per
+  collection), page by page, so memory stays flat however large they are
+- Streamed id count vs count()
+- Every record has an embedding of the collection's dimension, with no
+  NaN or infinite values. The expected dimension comes from the caller,
+  the dimension ChromaDB recorded for the collection, or one probe call
+  to the stored embedding function, in that order; only if none of those
+  is available is the first record taken as the reference
+- Content hashes (incremental_sync.content_hash) match a manifest written
+  by an earlier run, and the "content_hash" metadata field written by
+  incremental sync, where present
+- A sample of records (reservoir-sampled during the scan) is queried by
+  its own embedding, which must come back as its nearest neighbour
+- Throughput per collection and a JSON report
+
+The manifest is a small SQLite file (collection, id, hash), looked up one
+page at a time, so checking against it does not load it into memory.
+
+Usage:
+    python cli.py verify --write-manifest manifest.sqlite3     # record hashes
+    python cli.py verify --manifest manifest.sqlite3 --output report.json
+"""
+
+import concurrent.futures
+import json
+import random
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from incremental_sync import CONTENT_HASH_KEY, content_hash
+from streaming_reader import CollectionReader
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_SAMPLE = 20
+DEFAULT_WORKERS = 4
+
+
+class HashManifest:
+    """(collection, id) -> content hash, stored in SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " collection TEXT NOT NULL, id TEXT NOT NULL, hash TEXT NOT NULL,"
+            " PRIMARY KEY (collection, id))")
+
+    def clear(self, collection):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM hashes WHERE collection = ?", (collection,))
+
+    def write(self, collection, ids, hashes):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO hashes (collection, id, hash) VALUES (?, ?, ?)",
+                [(collection, doc_id, value) for doc_id, value in zip(ids, hashes)])
+
+    def lookup(self, collection, ids):
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for first in range(0, len(ids), 500):
+                chunk = ids[first:first + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT id, hash FROM hashes WHERE collection = ? AND id IN ({placeholders})",
+                    [collection] + chunk)
+                found.update(rows)
+        return found
+
+    def count(self, collection):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM hashes WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+def expected_dimension(collection):
+    """(dimension, source) the collection's embeddings should have, or (None, None)."""
+    get_model = getattr(collection, "get_model", None)
+    dimension = get_model().dimension if get_model is not None else None
+    if dimension:
+        return dimension, "collection"
+    configuration = getattr(collection, "configuration", None) or {}
+    embedding_function = configuration.get("embedding_function")
+    if embedding_function is not None:
+        try:
+            return len(embedding_function(["dimension probe"])[0]), "embedding_function"
+        except Exception:
+            # e.g. an API key that is not set here; fall back to the first record
+            pass
+    return None, None
+
+
+def check_collection(collection, manifest=None, write_manifest=None, sample=DEFAULT_SAMPLE,
+                     page_size=DEFAULT_PAGE_SIZE, seed=0, dimension=None):
+    """Scan one collection and return its report dict ("ok" is the verdict).
+
+    Pass `dimension` to check against a known embedding size; otherwise it
+    comes from expected_dimension().
+    """
+    start = time.perf_counter()
+    name = collection.name
+    expected = collection.count()
+    rng = random.Random(seed)
+    reservoir = []
+    valid = 0
+    source = "argument" if dimension is not None else None
+    if dimension is None and expected:
+        dimension, source = expected_dimension(collection)
+    report = {
+        "collection": name,
+        "count": expected,
+        "streamed": 0,
+        "dimension": dimension,
+        "dimension_source": source,
+        "missing_embeddings": 0,
+        "wrong_dimension": 0,
+        "non_finite": 0,
+        "stored_hash_mismatches": 0,
+        "manifest_mismatches": 0,
+        "not_in_manifest": 0,
+        "missing_from_collection": 0,
+        "self_query_checked": 0,
+        "self_query_failures": [],
+    }
+    if write_manifest is not None:
+        write_manifest.clear(name)
+    matched_in_manifest = 0
+
+    reader = CollectionReader(collection, include=["documents", "metadatas", "embeddings"],
+                              page_size=page_size)
+    for page in reader.pages():
+        ids = page["ids"]
+        embeddings = page["embeddings"]
+        hashes = [content_hash(document, metadata)
+                  for document, metadata in zip(page["documents"], page["metadatas"])]
+
+        for i, doc_id in enumerate(ids):
+            embedding = embeddings[i] if embeddings is not None else None
+            if embedding is None or len(embedding) == 0:
+                report["missing_embeddings"] += 1
+                continue
+            if report["dimension"] is None:
+                report["dimension"] = len(embedding)
+                report["dimension_source"] = "first_record"
+            if len(embedding) != report["dimension"]:
+                report["wrong_dimension"] += 1
+            elif not np.all(np.isfinite(embedding)):
+                report["non_finite"] += 1
+            else:
+                # Reservoir sampling keeps a uniform sample of the valid
+                # records in constant memory
+                valid += 1
+                if len(reservoir) < sample:
+                    reservoir.append((doc_id, np.asarray(embedding, dtype=np.float32)))
+                elif rng.random() < sample / valid:
+                    reservoir[rng.randrange(sample)] = (doc_id,
+                                                        np.asarray(embedding, dtype=np.float32))
+
+        for metadata, value in zip(page["metadatas"], hashes):
+            stored = (metadata or {}).get(CONTENT_HASH_KEY)
+            if stored is not None and stored != value:
+                report["stored_hash_mismatches"] += 1
+
+        if manifest is not None:
+            recorded = manifest.lookup(name, ids)
+            matched_in_manifest += len(recorded)
+            for doc_id, value in zip(ids, hashes):
+                if doc_id not in recorded:
+                    report["not_in_manifest"] += 1
+                elif recorded[doc_id] != value:
+                    report["manifest_mismatches"] += 1
+        if write_manifest is not None:
+            write_manifest.write(name, ids, hashes)
+        report["streamed"] += len(ids)
+
+    if manifest is not None:
+        report["missing_from_collection"] = manifest.count(name) - matched_in_manifest
+
+    if reservoir:
+        result = collection.query(query_embeddings=[embedding for _, embedding in reservoir],
+                                  n_results=1, include=["distances"])
+        for (doc_id, _), hits, distances in zip(reservoir, result["ids"], result["distances"]):
+            # An exact duplicate vector may legitimately win the tie
+            if not hits or (hits[0] != doc_id and distances[0] > 1e-6):
+                report["self_query_failures"].append(doc_id)
+        report["self_query_checked"] = len(reservoir)
+
+    elapsed = time.perf_counter() - start
+    report["seconds"] = elapsed
+    report["records_per_sec"] = report["streamed"] / elapsed if elapsed else 0.0
+    report["ok"] = (
+        report["streamed"] == expected
+        and not any(report[key] for key in (
+            "missing_embeddings", "wrong_dimension", "non_finite", "stored_hash_mismatches",
+            "manifest_mismatches", "not_in_manifest", "missing_from_collection",
+            "self_query_failures"))
+    )
+    return report
+
+
+def check_client(client, names=None, manifest_path=None, write_manifest_path=None,
+                 sample=DEFAULT_SAMPLE, page_size=DEFAULT_PAGE_SIZE, workers=DEFAULT_WORKERS):
+    """Check every (or each named) collection in parallel; returns the full report."""
+    names = names or [collection.name for collection in client.list_collections()]
+    manifest = HashManifest(manifest_path) if manifest_path else None
+    write_manifest = HashManifest(write_manifest_path) if write_manifest_path else None
+    start = time.perf_counter()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(
+                lambda name: check_collection(client.get_collection(name=name), manifest,
+                                              write_manifest, sample, page_size),
+                names))
+    finally:
+        for opened in (manifest, write_manifest):
+            if opened is not None:
+                opened.close()
+    elapsed = time.perf_counter() - start
+    records = sum(report["streamed"] for report in reports)
+    return {
+        "ok": all(report["ok"] for report in reports),
+        "collections": reports,
+        "records": records,
+        "seconds": elapsed,
+        "records_per_sec": records / elapsed if elapsed else 0.0,
+        "manifest": manifest_path,
+        "checked_at": time.time(),
+    }
+
+
+def format_report(report):
+    """Human-readable lines for a check_client() report."""
+    lines = []
+    for entry in report["collections"]:
+        mark = "✓" if entry["ok"] else "✗"
+        lines.append(f"{mark} {entry['collection']}: {entry['streamed']}/{entry['count']} records,"
+                     f" {entry['dimension']}d, {entry['records_per_sec']:.0f} records/sec")
+        problems = {key: entry[key] for key in (
+            "missing_embeddings", "wrong_dimension", "non_finite", "stored_hash_mismatches",
+            "manifest_mismatches", "not_in_manifest", "missing_from_collection") if entry[key]}
+        for key, value in problems.items():
+            lines.append(f"    {key.replace('_', ' ')}: {value}")
+        failures = entry["self_query_failures"]
+        lines.append(f"    self-query: {entry['self_query_checked'] - len(failures)}/"
+                     f"{entry['self_query_checked']} found themselves")
+        if failures:
+            lines.append(f"    not found: {', '.join(failures[:5])}")
+    lines.append(f"\n{'✓' if report['ok'] else '✗'} {report['records']} records in"
+                 f" {report['seconds']:.1f}s ({report['records_per_sec']:.0f} records/sec)")
+    return "\n".join(lines)
+
+
+def write_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,207 @@
+"""
+Local Embeddings: A Deterministic, Offline, Vectorized Embedding Function
+
+This module provides:
+- An embedding function that needs no network and no model download
+- Feature hashing of words and word pairs, followed by a fixed sparse
+  random projection down to a configurable dimension
+- Batched NumPy computation spread across a thread pool
+- Identical vectors on every machine: hashing uses crc32 and the projection
+  is generated from a counter-based hash (splitmix64), not from a random
+  number generator whose stream could change between NumPy versions
+- Registered with ChromaDB as "local_hashing", so a collection created with
+  it keeps it: get_collection() in a later run (with this module imported)
+  embeds query_texts with the same settings instead of the default model
+
+The vectors only capture shared words and word pairs, so use it for
+benchmarks, CI, load tests and dry runs, not for search quality.
+
+Usage:
+    local_ef = HashingEmbeddingFunction(dimension=384)
+    collection = client.get_or_create_collection(name="...", embedding_function=local_ef)
+
+Run this file to compare its throughput with ChromaDB's default embedder:
+    python local_embeddings.py
+"""
+
+import concurrent.futures
+import functools
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions import register_embedding_function
+
+DEFAULT_DIMENSION = 384
+DEFAULT_HASH_FEATURES = 2 ** 14
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_SEED = 0
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_projection_cache = {}
+_projection_lock = threading.Lock()
+
+
+def tokenize(text):
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def features(text):
+    """Words plus adjacent word pairs, so word order counts a little."""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def _hash_feature(feature):
+    # crc32 is stable across processes and machines, unlike Python's hash()
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def _splitmix64(values):
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def projection_matrix(hash_features, dimension, seed=DEFAULT_SEED):
+    """Sparse random projection with entries sqrt(3/d) * {+1: 1/6, 0: 2/3, -1: 1/6}.
+
+    Built once per (hash_features, dimension, seed) and shared read-only.
+    """
+    key = (hash_features, dimension, seed)
+    with _projection_lock:
+        if key not in _projection_cache:
+            matrix = np.empty((hash_features, dimension), dtype=np.float32)
+            scale = np.float32(np.sqrt(3.0 / dimension))
+            columns = np.arange(dimension, dtype=np.uint64)
+            offset = np.uint64(seed) * np.uint64(hash_features) * np.uint64(dimension)
+            # Fill in row blocks to keep the uint64 scratch space small
+            for start in range(0, hash_features, 1024):
+                rows = np.arange(start, min(start + 1024, hash_features), dtype=np.uint64)
+                counters = rows[:, None] * np.uint64(dimension) + columns[None, :] + offset
+                draws = _splitmix64(counters) % np.uint64(6)
+                block = np.zeros(draws.shape, dtype=np.float32)
+                block[draws == 0] = scale
+                block[draws == 1] = -scale
+                matrix[start:start + len(rows)] = block
+            matrix.setflags(write=False)
+            _projection_cache[key] = matrix
+        return _projection_cache[key]
+
+
+@register_embedding_function
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Feature hashing + fixed random projection, L2-normalized.
+
+    Texts are embedded in chunks of `batch_size`, spread over `workers`
+    threads; NumPy releases the GIL for the heavy array work.
+    """
+
+    def __init__(self, dimension=DEFAULT_DIMENSION, hash_features=DEFAULT_HASH_FEATURES,
+                 seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+        self.dimension = dimension
+        self.hash_features = hash_features
+        self.seed = seed
+        self.batch_size = batch_size
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self._projection = projection_matrix(hash_features, dimension, seed)
+        self._executor = None
+
+    def _embed_chunk(self, texts):
+        hashes = []
+        lengths = np.zeros(len(texts), dtype=np.int64)
+        for row, text in enumerate(texts):
+            text_features = features(text)
+            lengths[row] = len(text_features)
+            hashes.extend(map(_hash_feature, text_features))
+
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if hashes:
+            hashes = np.asarray(hashes, dtype=np.uint32)
+            buckets = hashes % np.uint32(self.hash_features)
+            signs = np.where(hashes & np.uint32(0x80000000), 1.0, -1.0).astype(np.float32)
+            contributions = self._projection[buckets] * signs[:, None]
+            # Sum each text's feature rows; features are laid out text by text.
+            # Contiguous slice sums are much faster than np.add.reduceat on axis 0.
+            ends = np.cumsum(lengths)
+            for row, (start, end) in enumerate(zip(ends - lengths, ends)):
+                if end > start:
+                    vectors[row] = contributions[start:end].sum(axis=0)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed_matrix(self, texts):
+        """Embed `texts` into one (len(texts), dimension) float32 array."""
+        texts = list(texts)
+        chunks = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(chunks) <= 1 or self.workers == 1:
+            parts = [self._embed_chunk(chunk) for chunk in chunks]
+        else:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+            parts = list(self._executor.map(self._embed_chunk, chunks))
+        if not parts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def __call__(self, input):
+        return list(self.embed_matrix(input))
+
+    # ChromaDB stores name() and get_config() in the collection configuration
+    # and calls build_from_config() when the collection is opened again.
+    # batch_size and workers only change speed, so they are not stored.
+
+    @staticmethod
+    def name():
+        return "local_hashing"
+
+    def get_config(self):
+        return {"dimension": self.dimension, "hash_features": self.hash_features,
+                "seed": self.seed}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashingEmbeddingFunction(dimension=config["dimension"],
+                                        hash_features=config["hash_features"],
+                                        seed=config["seed"])
+
+
+if __name__ == "__main__":
+    import hashlib
+    import time
+
+    from benchmark import synthetic_records
+
+    print("="*60)
+    print("LOCAL EMBEDDINGS: Throughput vs ChromaDB's default embedder")
+    print("="*60)
+
+    texts = [document for _, document, _ in synthetic_records(20_000)]
+    local_ef = HashingEmbeddingFunction()
+
+    fingerprint = hashlib.sha256(local_ef.embed_matrix(["Hotel budget is $300 per night."]).tobytes())
+    print(f"\nDeterminism check (same on every machine): {fingerprint.hexdigest()[:16]}")
+
+    def measure(name, embed, sample):
+        embed(sample[:10])  # warm up (model load, thread pool start)
+        start = time.perf_counter()
+        embed(sample)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<28} {len(sample) / elapsed:>10.0f} texts/sec")
+
+    print()
+    measure("local (1 thread)", HashingEmbeddingFunction(workers=1), texts)
+    measure(f"local ({local_ef.workers} threads)", local_ef, texts)
+    try:
+        from chromadb.utils import embedding_functions
+        measure("default (all-MiniLM-L6-v2)", embedding_functions.DefaultEmbeddingFunction(),
+                texts[:2000])
+    except Exception as error:
+        print(f"  default embedder unavailable here: {error}")
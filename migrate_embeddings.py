@@ -0,0 +1,243 @@
+"""
+Embedding Migration: Re-embedding a Collection with a Different Model
+
+Step 6 keeps a default-embedding collection and an OpenAI one side by side.
+This script moves an existing collection from one embedding function to
+another:
+
+- Streams the source collection in pages (documents + metadata only)
+- Re-embeds each page with the target embedding function, in batches
+  spread over a thread pool
+- Writes into a new staging collection with embeddings=, created with the
+  source's HNSW settings and the target embedding function stored in its
+  configuration
+- Saves a checkpoint after every page, so a crash or Ctrl+C resumes from
+  the last completed page (upsert makes a replayed page harmless)
+- Reports throughput and ETA while it runs
+- Swaps names with modify(name=...) like Step 5: the source becomes
+  "<name>_pre_migration" and the staging collection takes its name. A
+  crash between the two renames is finished by running again, and the
+  checkpoint file is removed once the swap is done
+
+Records without a document cannot be re-embedded; they are counted as
+skipped and the swap is not done, so they are not lost with the source
+name. The swap also needs an embedding function ChromaDB can store with
+the collection (one with get_config(), not a plain callable); otherwise
+reopening the collection would not embed queries with the new model.
+
+Usage:
+    python migrate_embeddings.py travel_policies --to openai
+    python migrate_embeddings.py travel_policies --to local --no-swap
+    # After a crash, run the same command again to resume
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+
+import numpy as np
+
+from bulk_ingest import get_embedding_function, register_embedding_functions
+from snapshot import copy_configuration
+from streaming_reader import CollectionReader, ReadCursor
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_WORKERS = 4
+STAGING_SUFFIX = "_migrating"
+PREVIOUS_SUFFIX = "_pre_migration"
+
+
+def default_checkpoint_path(source_name):
+    return f".migration_{source_name}.json"
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    # Write then rename, so a crash never leaves a half-written checkpoint
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temporary, path)
+
+
+def _finish_swap(client, state, checkpoint_path):
+    """Complete the two renames of a swap, whichever of them already happened."""
+    source_name, staging_name = state["source"], state["staging"]
+    names = {collection.name for collection in client.list_collections()}
+    if source_name in names and f"{source_name}{PREVIOUS_SUFFIX}" not in names:
+        client.get_collection(name=source_name).modify(name=f"{source_name}{PREVIOUS_SUFFIX}")
+        names.add(f"{source_name}{PREVIOUS_SUFFIX}")
+        names.discard(source_name)
+    if source_name not in names and staging_name in names:
+        client.get_collection(name=staging_name).modify(name=source_name)
+    state["swapped"] = True
+    state.pop("swapping", None)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state
+
+
+def _format_eta(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def _is_stored(embedding_function):
+    """True if ChromaDB can persist `embedding_function` with a collection."""
+    is_legacy = getattr(embedding_function, "is_legacy", None)
+    return is_legacy is not None and not is_legacy()
+
+
+def _embed_page(documents, embedding_function, batch_size, pool):
+    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+    parts = pool.map(lambda batch: np.asarray(embedding_function(batch), dtype=np.float32),
+                     batches)
+    return np.concatenate(list(parts))
+
+
+def migrate_collection(client, source_name, embedding_function, staging_name=None,
+                       checkpoint_path=None, page_size=DEFAULT_PAGE_SIZE,
+                       batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS, swap=True,
+                       progress=print, report_every=5.0):
+    """Copy `source_name` into a staging collection re-embedded with `embedding_function`.
+
+    Resumes from `checkpoint_path` if it exists. With swap=True the staging
+    collection takes over the source's name at the end and the checkpoint
+    is removed, unless records were skipped (state["swap_blocked"] says
+    why). Raises ValueError up front when swapping to an embedding function
+    that cannot be stored with the collection. Returns statistics.
+    """
+    if swap and not _is_stored(embedding_function):
+        raise ValueError(f"{type(embedding_function).__name__} cannot be stored with the "
+                         "collection, so the swapped collection would not embed queries "
+                         "with it; use swap=False")
+    staging_name = staging_name or f"{source_name}{STAGING_SUFFIX}"
+    checkpoint_path = checkpoint_path or default_checkpoint_path(source_name)
+    state = load_checkpoint(checkpoint_path)
+    if state and (state["source"], state["staging"]) != (source_name, staging_name):
+        raise ValueError(f"{checkpoint_path} belongs to a migration of {state['source']} "
+                         f"into {state['staging']}")
+    state = state or {"source": source_name, "staging": staging_name, "offset": 0,
+                      "migrated": 0, "skipped": 0, "swapped": False}
+    if state["swapped"]:
+        if progress:
+            progress(f"  Migration of {source_name} already finished")
+        return state
+    if state.get("swapping"):
+        if progress:
+            progress(f"  Finishing the interrupted swap of {source_name}")
+        return _finish_swap(client, state, checkpoint_path)
+
+    source = client.get_collection(name=source_name)
+    configuration = copy_configuration(source)
+    # The staging collection stores the target embedding function, not the source's
+    configuration.pop("embedding_function", None)
+    staging = client.get_or_create_collection(name=staging_name, metadata=source.metadata,
+                                              configuration=configuration or None,
+                                              embedding_function=embedding_function)
+    total = source.count()
+    if state["offset"] and progress:
+        progress(f"  Resuming at record {state['offset']} of {total}")
+
+    reader = CollectionReader(source, include=["documents", "metadatas"], page_size=page_size,
+                              cursor=ReadCursor(state["offset"]))
+    start = time.perf_counter()
+    resumed_from = state["offset"]
+    last_report = start
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in reader.pages():
+            keep = [i for i, document in enumerate(page["documents"]) if document is not None]
+            if keep:
+                documents = [page["documents"][i] for i in keep]
+                metadatas = [page["metadatas"][i] for i in keep]
+                staging.upsert(
+                    ids=[page["ids"][i] for i in keep],
+                    embeddings=_embed_page(documents, embedding_function, batch_size, pool),
+                    documents=documents,
+                    metadatas=metadatas if any(metadatas) else None,
+                )
+            state["offset"] = reader.cursor.offset + len(page["ids"])
+            state["migrated"] += len(keep)
+            state["skipped"] += len(page["ids"]) - len(keep)
+            save_checkpoint(checkpoint_path, state)
+
+            now = time.perf_counter()
+            if progress and now - last_report >= report_every:
+                rate = (state["offset"] - resumed_from) / (now - start)
+                eta = (total - state["offset"]) / rate if rate else None
+                progress(f"  {state['offset']}/{total} records ({rate:.0f}/sec, "
+                         f"ETA {_format_eta(eta)})")
+                last_report = now
+
+    elapsed = time.perf_counter() - start
+    state["seconds"] = elapsed
+    state["records_per_sec"] = (state["offset"] - resumed_from) / elapsed if elapsed else 0.0
+
+    if swap and state["skipped"]:
+        state["swap_blocked"] = (f"{state['skipped']} records have no document and are only "
+                                 f"in '{source_name}'")
+        save_checkpoint(checkpoint_path, state)
+    elif swap:
+        # Recorded first, so a crash between the two renames is finished on rerun
+        state["swapping"] = True
+        save_checkpoint(checkpoint_path, state)
+        # Two renames: the name is briefly unassigned between them
+        _finish_swap(client, state, checkpoint_path)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-embed a collection with another model.")
+    parser.add_argument("collection", help="source collection name")
+    parser.add_argument("--to", choices=["default", "openai", "local"], default="openai",
+                        help="target embedding function")
+    parser.add_argument("--db", default="./chroma_db", help="PersistentClient path")
+    parser.add_argument("--staging", help="staging collection name")
+    parser.add_argument("--checkpoint", help="checkpoint file path")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--no-swap", action="store_true",
+                        help="leave the result in the staging collection")
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    register_embedding_functions()
+
+    print("="*60)
+    print(f"EMBEDDING MIGRATION: {args.collection} -> {args.to}")
+    print("="*60)
+
+    client = chromadb.PersistentClient(path=args.db)
+    stats = migrate_collection(
+        client, args.collection, get_embedding_function(args.to),
+        staging_name=args.staging, checkpoint_path=args.checkpoint, page_size=args.page_size,
+        batch_size=args.batch_size, workers=args.workers, swap=not args.no_swap)
+
+    print(f"\n✓ Migrated {stats['migrated']} records ({stats['skipped']} skipped, no document)")
+    if "seconds" in stats:
+        print(f"  Time: {stats['seconds']:.1f}s ({stats['records_per_sec']:.0f} records/sec)")
+    if stats["swapped"]:
+        print(f"  '{args.collection}' now uses the {args.to} embeddings; the original is "
+              f"'{args.collection}{PREVIOUS_SUFFIX}'")
+    else:
+        if stats.get("swap_blocked"):
+            print(f"  ✗ Not swapped: {stats['swap_blocked']}")
+        print(f"  Result is in '{stats['staging']}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Precomputed Import: Loading Embeddings You Already Have
+
+This script demonstrates:
+- Reading embeddings from a memory-mapped .npy file or Arrow IPC file
+- Pairing each vector with an id (and optional document/metadata) from a
+  JSONL manifest, line i <-> row i
+- Passing the vectors as embeddings= in batch-sized slices of the mapped
+  file, so no embedding function runs and the matrix is never fully in RAM
+
+Import speed is then bounded by disk and index build, not the embedding model.
+
+Manifest format (one line per embedding row):
+    {"id": "flight_policy_01", "document": "...", "metadata": {"policy_type": "flights"}}
+
+Usage:
+    python precomputed_import.py vectors.npy manifest.jsonl --collection saved_policies
+    python precomputed_import.py vectors.arrow manifest.jsonl --column embedding
+
+Arrow files need pyarrow (pip install pyarrow) and a fixed-size-list column.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from bulk_ingest import iter_batches, peak_memory_mb
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+class ChunkedMatrix:
+    """Row-sliceable view over several zero-copy (rows, dimension) arrays.
+
+    Arrow files written in several record batches map to one array per
+    batch. A slice inside one batch is a view; a slice that spans batches
+    copies only its own rows.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = [chunk for chunk in chunks if len(chunk)]
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in self.chunks])
+        dimension = self.chunks[0].shape[1] if self.chunks else 0
+        self.shape = (int(self.offsets[-1]), dimension)
+        self.dtype = self.chunks[0].dtype if self.chunks else np.dtype(np.float32)
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        if not isinstance(rows, slice) or rows.step not in (None, 1):
+            raise TypeError("ChunkedMatrix only supports contiguous row slices")
+        start, stop, _ = rows.indices(len(self))
+        pieces = []
+        for chunk, offset in zip(self.chunks, self.offsets):
+            low, high = max(start - offset, 0), min(stop - offset, len(chunk))
+            if low < high:
+                pieces.append(chunk[low:high])
+        if len(pieces) == 1:
+            return pieces[0]
+        if not pieces:
+            return np.empty((0, self.shape[1]), dtype=self.dtype)
+        return np.concatenate(pieces)
+
+
+def open_embeddings(path, column="embedding"):
+    """Memory-map an embedding matrix of shape (rows, dimension)."""
+    if path.endswith(".npy"):
+        matrix = np.load(path, mmap_mode="r")
+    else:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Reading Arrow files requires pyarrow: pip install pyarrow")
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        chunks = []
+        for number in range(reader.num_record_batches):
+            vectors = reader.get_batch(number).column(column)
+            dimension = vectors.type.list_size
+            # The flattened child array is a view over the mapped file; combining
+            # the batches instead would copy the whole matrix into memory
+            values = vectors.values[vectors.offset * dimension:
+                                    (vectors.offset + len(vectors)) * dimension]
+            chunks.append(values.to_numpy(zero_copy_only=True).reshape(-1, dimension))
+        matrix = chunks[0] if len(chunks) == 1 else ChunkedMatrix(chunks)
+    if matrix.ndim != 2:
+        raise ValueError(f"{path}: expected a 2-D embedding matrix, got shape {matrix.shape}")
+    return matrix
+
+
+def count_manifest(path):
+    """Number of records in a manifest, read line by line."""
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def iter_manifest(path):
+    """Yield (id, document, metadata) per manifest line."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                yield str(record["id"]), record.get("document"), record.get("metadata") or None
+
+
+def import_embeddings(collection, matrix, manifest, batch_size=DEFAULT_BATCH_SIZE,
+                      progress=print, report_every=10.0, manifest_count=None):
+    """Upsert rows of `matrix` with the matching manifest records.
+
+    Returns throughput statistics. Raises ValueError if the manifest and
+    the matrix have different lengths; pass `manifest_count` (or a list as
+    the manifest) so that is found before anything is written.
+    """
+    if manifest_count is None and hasattr(manifest, "__len__"):
+        manifest_count = len(manifest)
+    if manifest_count is not None and manifest_count != len(matrix):
+        raise ValueError(f"Manifest has {manifest_count} records but there are "
+                         f"{len(matrix)} embedding rows")
+    start = time.perf_counter()
+    last_report = start
+    row = 0
+    for batch in iter_batches(manifest, batch_size):
+        stop = row + len(batch)
+        if stop > len(matrix):
+            raise ValueError(f"Manifest has more records than the {len(matrix)} embedding rows")
+        ids, documents, metadatas = zip(*batch)
+        # Slicing a memmap is a view; only this batch is paged in from disk
+        embeddings = matrix[row:stop]
+        if embeddings.dtype != np.float32:
+            embeddings = embeddings.astype(np.float32)
+        collection.upsert(
+            ids=list(ids),
+            embeddings=embeddings,
+            documents=list(documents) if any(d is not None for d in documents) else None,
+            metadatas=list(metadatas) if any(metadatas) else None,
+        )
+        row = stop
+
+        now = time.perf_counter()
+        if progress and now - last_report >= report_every:
+            progress(f"  {row} vectors imported ({row / (now - start):.0f}/sec)")
+            last_report = now
+
+    if row != len(matrix):
+        raise ValueError(f"Manifest has {row} records but there are {len(matrix)} embedding rows")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "vectors": row,
+        "dimension": int(matrix.shape[1]),
+        "seconds": elapsed,
+        "vectors_per_sec": row / elapsed if elapsed else 0.0,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import precomputed embeddings into ChromaDB.")
+    parser.add_argument("embeddings", help=".npy or Arrow IPC file of vectors")
+    parser.add_argument("manifest", help="JSONL file with one id/document/metadata per row")
+    parser.add_argument("--db", default="./chroma_db", help="PersistentClient path")
+    parser.add_argument("--collection", default="saved_policies")
+    parser.add_argument("--column", default="embedding", help="Arrow column holding the vectors")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    print("="*60)
+    print("PRECOMPUTED EMBEDDING IMPORT")
+    print("="*60)
+
+    matrix = open_embeddings(args.embeddings, args.column)
+    client = chromadb.PersistentClient(path=args.db)
+    collection = client.get_or_create_collection(name=args.collection)
+    batch_size = min(args.batch_size, client.get_max_batch_size())
+
+    print(f"  Embeddings: {args.embeddings} {matrix.shape} {matrix.dtype}")
+    print(f"  Manifest:   {args.manifest}")
+    print(f"  Collection: {collection.name}, batch size {batch_size}\n")
+
+    stats = import_embeddings(collection, matrix, iter_manifest(args.manifest), batch_size,
+                              manifest_count=count_manifest(args.manifest))
+
+    peak = stats["peak_memory_mb"]
+    print(f"\n✓ Imported {stats['vectors']} vectors ({stats['dimension']} dims) "
+          f"in {stats['seconds']:.1f}s")
+    print(f"  Throughput: {stats['vectors_per_sec']:.0f} vectors/sec")
+    print(f"  Peak memory: {f'{peak:.0f} MB' if peak is not None else 'n/a'}")
+    print("  No embedding function was called")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Query Cache: Answering Repeated Questions Without Re-Searching
+
+This module provides:
+- An LRU + TTL cache for collection.query(query_texts=...) results, keyed on
+  (collection, query text, n_results, where, where_document, include)
+- A CachedCollection wrapper that looks and behaves like a Collection
+- Automatic invalidation whenever add/upsert/update/delete/modify go
+  through the wrapper, so answers never go stale after an update like
+  step 3's change to hotel_policy_01
+- An optional second tier (semantic_cache.SemanticQueryCache) that reuses
+  answers for paraphrased questions
+
+Usage:
+    collection = CachedCollection(client.get_or_create_collection(name="travel_policies"))
+    collection.query(query_texts=["What is the hotel budget?"], n_results=1)  # searches
+    collection.query(query_texts=["What is the hotel budget?"], n_results=1)  # cached
+"""
+
+import collections
+import copy
+import json
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300.0
+
+# Query result fields that hold one list per query text
+_ROW_FIELDS = ("ids", "embeddings", "documents", "uris", "data", "metadatas", "distances")
+
+
+def _freeze(value):
+    """Stable, hashable form of a filter dict (or None)."""
+    return None if value is None else json.dumps(value, sort_keys=True, default=str)
+
+
+def split_rows(result):
+    """Split a batched query result into one single-query result per text."""
+    count = len(result["ids"])
+    rows = []
+    for i in range(count):
+        row = {}
+        for field in _ROW_FIELDS:
+            values = result.get(field)
+            row[field] = None if values is None else values[i]
+        row["included"] = result.get("included")
+        rows.append(row)
+    return rows
+
+
+def merge_rows(rows):
+    """Inverse of split_rows: build a batched result from per-text rows."""
+    result = {}
+    for field in _ROW_FIELDS:
+        values = [row[field] for row in rows]
+        result[field] = None if all(value is None for value in values) else values
+    result["included"] = rows[0]["included"] if rows else []
+    return result
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a TTL and per-collection invalidation.
+
+    Invalidation bumps a per-collection generation number, so it is O(1);
+    entries from an older generation are treated as misses and dropped.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._generations = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, collection_id, key):
+        with self._lock:
+            entry = self._entries.get((collection_id, key))
+            if entry is not None:
+                generation, expires_at, value = entry
+                if generation == self._generations[collection_id] and expires_at > self.clock():
+                    self._entries.move_to_end((collection_id, key))
+                    self.hits += 1
+                    return value
+                del self._entries[(collection_id, key)]
+            self.misses += 1
+            return None
+
+    def generation(self, collection_id):
+        with self._lock:
+            return self._generations[collection_id]
+
+    def put(self, collection_id, key, value, generation):
+        """Store `value` unless the collection was invalidated since `generation`."""
+        with self._lock:
+            if generation != self._generations[collection_id]:
+                return
+            self._entries[(collection_id, key)] = (
+                generation, self.clock() + self.ttl_seconds, value
+            )
+            self._entries.move_to_end((collection_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collection_id):
+        with self._lock:
+            self._generations[collection_id] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+class CachedCollection:
+    """Wraps a Collection so query(query_texts=...) results are cached.
+
+    Several wrappers may share one QueryCache; a write through any of them
+    invalidates the cached answers of that collection for all of them.
+    Every other attribute is forwarded to the wrapped collection.
+    """
+
+    def __init__(self, collection, cache=None, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, semantic_cache=None, embedding_function=None):
+        self._collection = collection
+        self.cache = cache or QueryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.semantic_cache = semantic_cache
+        # The semantic tier embeds query texts itself, so it needs the
+        # collection's embedding function: the one given, the semantic cache's,
+        # or the one stored in the collection's configuration
+        self.embedding_function = embedding_function
+        if semantic_cache is not None:
+            self.embedding_function = (embedding_function or semantic_cache.embedding_function
+                                       or collection.configuration.get("embedding_function"))
+            if self.embedding_function is None:
+                raise ValueError(f"No embedding function for {collection.name}: pass "
+                                 "embedding_function= to SemanticQueryCache or CachedCollection")
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def __repr__(self):
+        return f"CachedCollection({self._collection!r})"
+
+    @property
+    def collection(self):
+        return self._collection
+
+    def query(self, query_texts=None, n_results=10, where=None, where_document=None,
+              include=None, **kwargs):
+        # Only plain text queries are cached; embeddings, images etc. pass through
+        if query_texts is None or kwargs:
+            if query_texts is not None:
+                kwargs["query_texts"] = query_texts
+            return self._query(n_results=n_results, where=where,
+                               where_document=where_document, include=include, **kwargs)
+
+        if isinstance(query_texts, str):
+            query_texts = [query_texts]
+        collection_id = self._collection.id
+        shape = (n_results, _freeze(where), _freeze(where_document),
+                 None if include is None else tuple(include))
+
+        generation = self.cache.generation(collection_id)
+        rows = [self.cache.get(collection_id, (text,) + shape) for text in query_texts]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if not missing:
+            # Copies, so editing a returned result cannot change the cached rows
+            return copy.deepcopy(merge_rows(rows))
+
+        semantic = self.semantic_cache
+        if semantic is None or not semantic.is_enabled(collection_id):
+            fresh = self._query(query_texts=[query_texts[i] for i in missing],
+                                n_results=n_results, where=where,
+                                where_document=where_document, include=include)
+            for i, row in zip(missing, split_rows(fresh)):
+                rows[i] = row
+                self.cache.put(collection_id, (query_texts[i],) + shape, row, generation)
+            return copy.deepcopy(merge_rows(rows))
+
+        # Second tier: embed the misses once, reuse answers to close paraphrases,
+        # and search with the same embeddings for whatever is left
+        semantic_generation = semantic.generation(collection_id)
+        embeddings = self._embed_queries([query_texts[i] for i in missing])
+        reused = semantic.lookup(collection_id, shape, embeddings)
+        to_search = [j for j, row in enumerate(reused) if row is None]
+        if to_search:
+            fresh = self._query(query_embeddings=[embeddings[j] for j in to_search],
+                                n_results=n_results, where=where,
+                                where_document=where_document, include=include)
+            fresh_rows = split_rows(fresh)
+            for j, row in zip(to_search, fresh_rows):
+                reused[j] = row
+            semantic.store(collection_id, shape, [embeddings[j] for j in to_search],
+                           fresh_rows, semantic_generation)
+        for i, row in zip(missing, reused):
+            rows[i] = row
+            self.cache.put(collection_id, (query_texts[i],) + shape, row, generation)
+        return copy.deepcopy(merge_rows(rows))
+
+    def _embed_queries(self, texts):
+        embedding_function = self.embedding_function
+        if hasattr(embedding_function, "embed_query"):
+            return embedding_function.embed_query(input=texts)
+        return embedding_function(texts)
+
+    def _query(self, include=None, **kwargs):
+        if include is not None:
+            kwargs["include"] = include
+        return self._collection.query(**kwargs)
+
+    def _invalidate(self):
+        self.cache.invalidate(self._collection.id)
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate(self._collection.id)
+
+    # Writes invalidate cached answers for this collection. Invalidating
+    # after the write means a query racing with it cannot cache old results.
+
+    def add(self, *args, **kwargs):
+        try:
+            return self._collection.add(*args, **kwargs)
+        finally:
+            self._invalidate()
+
+    def upsert(self, *args, **kwargs):
+        try:
+            return self._collection.upsert(*args, **kwargs)
+        finally:
+            self._invalidate()
+
+    def update(self, *args, **kwargs):
+        try:
+            return self._collection.update(*args, **kwargs)
+        finally:
+            self._invalidate()
+
+    def delete(self, *args, **kwargs):
+        try:
+            return self._collection.delete(*args, **kwargs)
+        finally:
+            self._invalidate()
+
+    def modify(self, *args, **kwargs):
+        try:
+            return self._collection.modify(*args, **kwargs)
+        finally:
+            self._invalidate()
@@ -0,0 +1,200 @@
+"""
+Query Service: Micro-Batching Concurrent Queries over One Client
+
+This module provides:
+- A long-lived asyncio service that holds a single ChromaDB client
+- Coalescing of concurrent queries that arrive within a few milliseconds
+  into one batched collection.query(query_texts=[...]) call
+- Fan-out of each batched result back to the caller that asked for it
+- Configurable max batch size and max wait, plus latency/throughput metrics
+
+Only queries with the same collection, n_results, filters and include are
+batched together, since a single query() call shares those arguments.
+
+Usage:
+    service = QueryService(chromadb.PersistentClient(path="./chroma_db"))
+    result = await service.query("saved_policies", "What is the meal allowance?", n_results=1)
+    print(service.metrics())
+    service.close()
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import time
+
+import numpy as np
+
+from query_cache import split_rows
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+LATENCY_WINDOW = 10_000
+
+
+class QueryService:
+    """Coalesces concurrent single-text queries into batched query() calls.
+
+    Batches run on a small thread pool so the event loop keeps accepting
+    requests while ChromaDB searches. Must be used from one event loop.
+    """
+
+    def __init__(self, client, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, workers=2, embedding_function=None):
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.embedding_function = embedding_function
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self._collections = {}
+        self._pending = {}   # batch key -> list of (text, future, enqueued_at)
+        self._timers = {}    # batch key -> asyncio.TimerHandle
+        self._tasks = set()  # running batches; the loop itself only keeps weak references
+        self._closed = False
+        self._started_at = time.perf_counter()
+        self._requests = 0
+        self._batches = 0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def _collection(self, name):
+        if name not in self._collections:
+            if self.embedding_function is not None:
+                self._collections[name] = self.client.get_collection(
+                    name=name, embedding_function=self.embedding_function)
+            else:
+                self._collections[name] = self.client.get_collection(name=name)
+        return self._collections[name]
+
+    async def query(self, collection_name, query_text, n_results=10, where=None,
+                    where_document=None, include=None):
+        """Answer one query; the result has the same shape as a 1-text query()."""
+        if self._closed:
+            raise RuntimeError("QueryService is closed")
+        loop = asyncio.get_running_loop()
+        key = (
+            collection_name, n_results,
+            json.dumps(where, sort_keys=True) if where is not None else None,
+            json.dumps(where_document, sort_keys=True) if where_document is not None else None,
+            tuple(include) if include is not None else None,
+        )
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((query_text, future, time.perf_counter()))
+        self._requests += 1
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        self._batches += 1
+        self._batch_sizes.append(len(batch))
+        task = asyncio.get_running_loop().create_task(self._run_batch(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, key, batch):
+        collection_name, n_results, where, where_document, include = key
+        kwargs = {"query_texts": [text for text, _, _ in batch], "n_results": n_results}
+        if where is not None:
+            kwargs["where"] = json.loads(where)
+        if where_document is not None:
+            kwargs["where_document"] = json.loads(where_document)
+        if include is not None:
+            kwargs["include"] = list(include)
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor, lambda: self._collection(collection_name).query(**kwargs))
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        now = time.perf_counter()
+        for (_, future, enqueued_at), row in zip(batch, split_rows(result)):
+            self._latencies.append(now - enqueued_at)
+            if not future.done():
+                future.set_result(row)
+
+    def metrics(self):
+        """Request/batch counters, average batch size, QPS and latency percentiles."""
+        elapsed = time.perf_counter() - self._started_at
+        latencies_ms = np.asarray(self._latencies) * 1000
+        return {
+            "requests": self._requests,
+            "batches": self._batches,
+            "mean_batch_size": float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0,
+            "qps": self._requests / elapsed if elapsed else 0.0,
+            "p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "p95_ms": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+            "p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else 0.0,
+        }
+
+    def reset_metrics(self):
+        self._started_at = time.perf_counter()
+        self._requests = 0
+        self._batches = 0
+        self._latencies.clear()
+        self._batch_sizes.clear()
+
+    def close(self):
+        """Fail the queries still waiting to be batched and stop the worker threads.
+
+        Batches already handed to ChromaDB finish and answer their callers.
+        Call it from the service's event loop thread.
+        """
+        self._closed = True
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        pending, self._pending = self._pending, {}
+        for batch in pending.values():
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("QueryService is closed"))
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    import chromadb
+    from local_embeddings import HashingEmbeddingFunction
+
+    print("="*60)
+    print("QUERY SERVICE: Micro-batching concurrent queries")
+    print("="*60)
+
+    local_ef = HashingEmbeddingFunction()
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(name="service_demo", embedding_function=local_ef)
+    collection.upsert(
+        ids=[f"policy_{i}" for i in range(2000)],
+        documents=[f"Policy {i}: travel rule number {i} about hotels, meals and flights"
+                   for i in range(2000)],
+    )
+
+    async def simulate(concurrency):
+        service = QueryService(client, embedding_function=local_ef)
+        questions = [f"What does rule {i} say about hotels?" for i in range(concurrency)]
+        await asyncio.gather(*[service.query("service_demo", q, n_results=3) for q in questions])
+        metrics = service.metrics()
+        service.close()
+        return metrics
+
+    for concurrency in (1, 50, 500):
+        metrics = asyncio.run(simulate(concurrency))
+        print(f"\n  {concurrency} concurrent queries -> {metrics['batches']} batched calls")
+        print(f"    mean batch {metrics['mean_batch_size']:.1f}, {metrics['qps']:.0f} QPS,"
+              f" p50 {metrics['p50_ms']:.1f} ms, p99 {metrics['p99_ms']:.1f} ms")
@@ -0,0 +1,264 @@
+"""
+Reduced Embeddings: Smaller Vectors for Cheaper Collections
+
+text-embedding-3-small returns 1536 float32 values (about 6 KB per document).
+This module provides:
+- Truncation to fewer dimensions, which is what OpenAI's `dimensions`
+  parameter does for text-embedding-3 models (keep the first d values,
+  then re-normalize), so it can be evaluated without new API calls
+- PCA fitted on a sample of vectors, as an alternative reduction
+- Optional int8 scalar quantization (per-dimension scale)
+- ReducedEmbeddingFunction, which wraps any embedding function so a
+  collection stores the reduced vectors
+- A recall@k vs memory/latency report against the full-precision vectors
+
+Note: ChromaDB always stores float32, so int8 mode keeps the int8 *precision*
+(values are quantized and restored) to measure its recall cost; the 4x
+memory saving applies wherever the int8 codes themselves are stored.
+
+To create a reduced collection with OpenAI directly:
+    openai_ef = embedding_functions.OpenAIEmbeddingFunction(
+        model_name="text-embedding-3-small", dimensions=256)
+
+Or with PCA (fit on a sample of full vectors) and int8:
+    reducer = PCAReducer(256).fit(sample)
+    quantizer = Int8Quantizer().fit(reducer.transform(sample))
+    reduced_ef = ReducedEmbeddingFunction(openai_ef, reducer, quantizer)
+
+Usage:
+    python reduced_embeddings.py --collection travel_policies_openai --dims 256 512
+    python reduced_embeddings.py --synthetic 20000 --dims 64 128 --int8
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+DEFAULT_K = 10
+DEFAULT_QUERIES = 200
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class TruncationReducer:
+    """Keep the first `dimension` values (OpenAI's `dimensions` behaviour)."""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+
+    def transform(self, vectors):
+        return normalize(np.asarray(vectors, dtype=np.float32)[:, :self.dimension])
+
+
+class PCAReducer:
+    """Project onto the top principal components of a fitted sample."""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.mean = None
+        self.components = None
+
+    def fit(self, sample):
+        sample = np.asarray(sample, dtype=np.float32)
+        self.mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+        self.components = vt[:self.dimension].astype(np.float32)
+        return self
+
+    def transform(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return normalize((vectors - self.mean) @ self.components.T)
+
+    def save(self, path):
+        np.savez(path, mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        reducer = cls(data["components"].shape[0])
+        reducer.mean, reducer.components = data["mean"], data["components"]
+        return reducer
+
+
+class Int8Quantizer:
+    """Symmetric per-dimension int8 quantization."""
+
+    def __init__(self):
+        self.scale = None
+
+    def fit(self, sample):
+        peak = np.abs(np.asarray(sample, dtype=np.float32)).max(axis=0)
+        self.scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        return self
+
+    def quantize(self, vectors):
+        codes = np.round(np.asarray(vectors, dtype=np.float32) / self.scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def dequantize(self, codes):
+        return codes.astype(np.float32) * self.scale
+
+    def round_trip(self, vectors):
+        return self.dequantize(self.quantize(vectors))
+
+
+class ReducedEmbeddingFunction(EmbeddingFunction):
+    """Wraps an embedding function and stores reduced (optionally int8) vectors.
+
+    Use the same instance for adding and querying so both go through the
+    same reduction.
+    """
+
+    def __init__(self, embedding_function, reducer, quantizer=None):
+        self.embedding_function = embedding_function
+        self.reducer = reducer
+        self.quantizer = quantizer
+
+    def __call__(self, input):
+        vectors = self.reducer.transform(np.asarray(self.embedding_function(input), dtype=np.float32))
+        if self.quantizer is not None:
+            vectors = self.quantizer.round_trip(vectors)
+        return list(vectors)
+
+
+# ============================================================
+# Recall / memory / latency report
+# ============================================================
+
+def _build_collection(client, name, vectors):
+    collection = client.create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    ids = [str(i) for i in range(len(vectors))]
+    batch = client.get_max_batch_size()
+    start = time.perf_counter()
+    for first in range(0, len(vectors), batch):
+        collection.add(ids=ids[first:first + batch], embeddings=vectors[first:first + batch])
+    return collection, time.perf_counter() - start
+
+
+def _search(collection, queries, k):
+    latencies = []
+    hits = []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits.append(set(result["ids"][0]))
+    return hits, float(np.percentile(np.asarray(latencies) * 1000, 50))
+
+
+def evaluate(vectors, queries, variants, k=DEFAULT_K):
+    """Compare reduced variants with the full-precision vectors.
+
+    `variants` maps a label to (reducer, quantizer_or_None); reducers that
+    need fitting (PCA) must already be fitted. Returns one row per variant.
+    """
+    import chromadb
+
+    vectors = normalize(np.asarray(vectors, dtype=np.float32))
+    queries = normalize(np.asarray(queries, dtype=np.float32))
+    workdir = tempfile.mkdtemp(prefix="chroma_reduced_")
+    rows = []
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        full, build_seconds = _build_collection(client, "full_precision", vectors)
+        reference, latency = _search(full, queries, k)
+        rows.append({"variant": f"full ({vectors.shape[1]}d float32)", "dimension": vectors.shape[1],
+                     "bytes_per_vector": vectors.shape[1] * 4, "int8_bytes_per_vector": None,
+                     f"recall@{k}": 1.0,
+                     "p50_ms": latency, "build_seconds": build_seconds})
+
+        for number, (label, (reducer, quantizer)) in enumerate(variants.items()):
+            reduced = reducer.transform(vectors)
+            reduced_queries = reducer.transform(queries)
+            if quantizer is not None:
+                quantizer.fit(reduced)
+                reduced = quantizer.round_trip(reduced)
+                reduced_queries = quantizer.round_trip(reduced_queries)
+            collection, build_seconds = _build_collection(client, f"variant_{number}", reduced)
+            found, latency = _search(collection, reduced_queries, k)
+            recall = np.mean([len(a & b) / len(b) for a, b in zip(found, reference) if b])
+            rows.append({"variant": label, "dimension": reduced.shape[1],
+                         # ChromaDB stores the round-tripped vectors as float32; the
+                         # int8 size only applies where the codes themselves are kept
+                         "bytes_per_vector": reduced.shape[1] * 4,
+                         "int8_bytes_per_vector": reduced.shape[1] if quantizer else None,
+                         f"recall@{k}": float(recall), "p50_ms": latency,
+                         "build_seconds": build_seconds})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def load_vectors(args):
+    if args.synthetic:
+        from benchmark import synthetic_records
+        from local_embeddings import HashingEmbeddingFunction
+        texts = [document for _, document, _ in synthetic_records(args.synthetic + args.queries)]
+        matrix = HashingEmbeddingFunction(dimension=args.synthetic_dimension).embed_matrix(texts)
+        return matrix[:args.synthetic], matrix[args.synthetic:]
+
+    import chromadb
+    from streaming_reader import CollectionReader
+    collection = chromadb.PersistentClient(path=args.db).get_collection(name=args.collection)
+    vectors = []
+    for record in CollectionReader(collection, include=["embeddings"]):
+        vectors.append(record["embedding"])
+        if len(vectors) >= args.sample + args.queries:
+            break
+    matrix = np.asarray(vectors, dtype=np.float32)
+    # Held-out stored vectors stand in for queries
+    return matrix[args.queries:], matrix[:args.queries]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall vs memory report for reduced embeddings.")
+    parser.add_argument("--db", default="./chroma_db")
+    parser.add_argument("--collection", default="travel_policies_openai")
+    parser.add_argument("--sample", type=int, default=20_000, help="max stored vectors to use")
+    parser.add_argument("--synthetic", type=int, help="use N synthetic local embeddings instead")
+    parser.add_argument("--synthetic-dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--int8", action="store_true", help="also evaluate int8 quantization")
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    args = parser.parse_args(argv)
+
+    print("="*60)
+    print("REDUCED EMBEDDINGS: recall vs memory")
+    print("="*60)
+
+    vectors, queries = load_vectors(args)
+    print(f"\n  {len(vectors)} vectors ({vectors.shape[1]}d), {len(queries)} queries, k={args.k}\n")
+
+    variants = {}
+    for dimension in args.dims:
+        variants[f"truncate {dimension}d (OpenAI dimensions=)"] = (TruncationReducer(dimension), None)
+        variants[f"pca {dimension}d"] = (PCAReducer(dimension).fit(vectors[:10_000]), None)
+        if args.int8:
+            variants[f"truncate {dimension}d int8"] = (TruncationReducer(dimension), Int8Quantizer())
+            variants[f"pca {dimension}d int8"] = (PCAReducer(dimension).fit(vectors[:10_000]),
+                                                  Int8Quantizer())
+
+    rows = evaluate(vectors, queries, variants, args.k)
+    recall_key = f"recall@{args.k}"
+    print(f"  {'variant':<36} {'stored B/vec':>12} {'int8 B/vec*':>11} {recall_key:>10} "
+          f"{'p50 ms':>8}")
+    for row in rows:
+        int8_bytes = row["int8_bytes_per_vector"] or "-"
+        print(f"  {row['variant']:<36} {row['bytes_per_vector']:>12} {int8_bytes:>11} "
+              f"{row[recall_key]:>10.3f} {row['p50_ms']:>8.2f}")
+    if args.int8:
+        print("\n  * theoretical: what the int8 codes would take if stored outside ChromaDB,"
+              " which keeps float32")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Semantic Cache: Reusing Answers for Paraphrased Questions
+
+This module provides:
+- A second-tier query cache keyed on query *meaning* rather than exact text
+- Recent query embeddings kept in one compact, normalized NumPy matrix
+- Reuse of a cached result when cosine similarity to a new query is above
+  a configurable threshold ("hotel budget?" vs "max hotel spend per night?")
+- Least-recently-used eviction, a hit-rate metric, and a per-collection switch
+
+Cached results are copied on the way in and out, so a caller that edits a
+result it got back cannot change what later callers see.
+
+It plugs into query_cache.CachedCollection:
+    semantic = SemanticQueryCache(threshold=0.92, embedding_function=openai_ef)
+    collection = CachedCollection(raw_collection, semantic_cache=semantic)
+
+The embedding function must be the one the collection was built with. If
+none is given, the one stored in the collection's configuration is used;
+CachedCollection raises ValueError up front when there is neither.
+"""
+
+import copy
+import threading
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_MAX_ENTRIES = 512
+
+
+class SemanticQueryCache:
+    """Nearest-neighbour lookup over recently answered query embeddings.
+
+    Results are only shared between queries with the same scope: the same
+    collection and the same n_results/where/where_document/include. Scopes
+    are interned to integers so matching is one vectorized comparison; a
+    scope is forgotten once none of its entries are left.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES,
+                 embedding_function=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.embedding_function = embedding_function
+        self.hits = 0
+        self.misses = 0
+        self._matrix = None  # (max_entries, dim) float32, rows L2-normalized
+        self._scopes = np.full(max_entries, -1, dtype=np.int64)  # -1 = empty slot
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._values = [None] * max_entries
+        self._scope_ids = {}
+        self._scope_keys = {}
+        self._next_scope = 0
+        self._disabled = set()
+        self._generations = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    # Per-collection switch
+
+    def disable(self, collection_id):
+        with self._lock:
+            self._disabled.add(collection_id)
+            self._drop_collection(collection_id)
+
+    def enable(self, collection_id):
+        with self._lock:
+            self._disabled.discard(collection_id)
+
+    def is_enabled(self, collection_id):
+        return collection_id not in self._disabled
+
+    # Lookup and insert
+
+    def _scope_id(self, collection_id, scope):
+        key = (collection_id, scope)
+        if key not in self._scope_ids:
+            self._scope_ids[key] = self._next_scope
+            self._scope_keys[self._next_scope] = key
+            self._next_scope += 1
+        return self._scope_ids[key]
+
+    def _forget_scopes(self, scope_ids):
+        """Drop interned scopes that no longer have any entries."""
+        for scope_id in scope_ids:
+            if scope_id in self._scope_keys and not np.any(self._scopes == scope_id):
+                del self._scope_ids[self._scope_keys.pop(scope_id)]
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def lookup(self, collection_id, scope, embeddings):
+        """Return one cached result (or None) per query embedding."""
+        results = [None] * len(embeddings)
+        with self._lock:
+            if self._matrix is None or collection_id in self._disabled:
+                self.misses += len(embeddings)
+                return results
+            scope_id = self._scope_ids.get((collection_id, scope))
+            candidates = np.flatnonzero(self._scopes == scope_id) if scope_id is not None else []
+            if len(candidates) == 0:
+                self.misses += len(embeddings)
+                return results
+
+            similarities = self._normalize(embeddings) @ self._matrix[candidates].T
+            best = np.argmax(similarities, axis=1)
+            for i, column in enumerate(best):
+                if similarities[i, column] >= self.threshold:
+                    slot = candidates[column]
+                    self._tick += 1
+                    self._last_used[slot] = self._tick
+                    results[i] = copy.deepcopy(self._values[slot])
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return results
+
+    def generation(self, collection_id):
+        with self._lock:
+            return self._generations.get(collection_id, 0)
+
+    def store(self, collection_id, scope, embeddings, values, generation):
+        """Remember results unless the collection was invalidated since `generation`."""
+        with self._lock:
+            if collection_id in self._disabled:
+                return
+            if generation != self._generations.get(collection_id, 0):
+                return
+            vectors = self._normalize(embeddings)
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vectors.shape[1]), dtype=np.float32)
+            scope_id = self._scope_id(collection_id, scope)
+            replaced = set()
+            for vector, value in zip(vectors, values):
+                empty = np.flatnonzero(self._scopes == -1)
+                slot = empty[0] if len(empty) else int(np.argmin(self._last_used))
+                if self._scopes[slot] != -1:
+                    replaced.add(int(self._scopes[slot]))
+                self._matrix[slot] = vector
+                self._scopes[slot] = scope_id
+                self._values[slot] = copy.deepcopy(value)
+                self._tick += 1
+                self._last_used[slot] = self._tick
+            self._forget_scopes(replaced)
+
+    def invalidate(self, collection_id):
+        with self._lock:
+            self._generations[collection_id] = self._generations.get(collection_id, 0) + 1
+            self._drop_collection(collection_id)
+
+    def _drop_collection(self, collection_id):
+        scope_ids = [sid for sid, (cid, _) in self._scope_keys.items() if cid == collection_id]
+        if not scope_ids:
+            return
+        stale = np.isin(self._scopes, scope_ids)
+        self._scopes[stale] = -1
+        self._last_used[stale] = 0
+        for slot in np.flatnonzero(stale):
+            self._values[slot] = None
+        self._forget_scopes(scope_ids)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": int(np.count_nonzero(self._scopes != -1)),
+                "scopes": len(self._scope_ids),
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,293 @@
+"""
+Snapshots: Backing Up and Restoring a PersistentClient
+
+Step 5 warns that delete_collection() is permanent and says to always back
+up first, but copying ./chroma_db while it is in use is not safe. This
+script exports through the client API instead:
+
+- export: streams every collection (ids, documents, metadata, embeddings,
+  collection metadata, index settings and the stored embedding-function
+  configuration) page by page into one snapshot file, reading and
+  compressing several collections in parallel. Pages are read by offset
+  while the collection stays writable, so the export is not point-in-time:
+  records added or deleted during an export may be missed or appear in a
+  different page. Stop writers first if you need a consistent snapshot
+- restore: bulk-loads a snapshot back with embeddings=, so nothing is
+  re-embedded. Restored collections get new collection ids; look them up
+  by name
+
+Snapshot format: a zip archive (stored, not re-compressed) containing
+    manifest.json
+    <n>/<page>/ids.json.z          zlib-compressed JSON columns
+    <n>/<page>/documents.json.z
+    <n>/<page>/metadatas.json.z
+    <n>/<page>/embeddings.npy.z    zlib-compressed float32 matrix
+where <n> numbers the collections listed in the manifest.
+
+Usage:
+    python snapshot.py export backup.chromasnap
+    python snapshot.py restore backup.chromasnap --db ./restored_db
+    python snapshot.py restore backup.chromasnap --replace
+"""
+
+import argparse
+import concurrent.futures
+import io
+import json
+import os
+import queue
+import threading
+import time
+import zipfile
+import zlib
+
+import numpy as np
+
+from streaming_reader import CollectionReader
+
+FORMAT_VERSION = 1
+DEFAULT_PAGE_SIZE = 2000
+DEFAULT_WORKERS = 4
+COMPRESSION_LEVEL = 6
+
+_HNSW_SETTINGS = ("space", "ef_construction", "ef_search", "max_neighbors")
+
+
+def _pack_json(values):
+    return zlib.compress(json.dumps(values).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _unpack_json(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def _pack_matrix(matrix):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(matrix, dtype=np.float32), allow_pickle=False)
+    return zlib.compress(buffer.getvalue(), COMPRESSION_LEVEL)
+
+
+def _unpack_matrix(blob):
+    return np.load(io.BytesIO(zlib.decompress(blob)), allow_pickle=False)
+
+
+def hnsw_settings(collection):
+    """The collection's HNSW index settings that can be passed back to create_collection."""
+    configuration = getattr(collection, "configuration_json", None) or {}
+    hnsw = configuration.get("hnsw") or {}
+    return {key: hnsw[key] for key in _HNSW_SETTINGS if key in hnsw}
+
+
+def export_configuration(collection):
+    """JSON-safe configuration: HNSW settings plus the stored embedding function.
+
+    Embedding functions that ChromaDB cannot persist (custom "legacy" ones)
+    are left out; pass them to get_collection() yourself after a restore.
+    """
+    configuration = {"hnsw": hnsw_settings(collection)}
+    embedding_function = (getattr(collection, "configuration_json", None) or {}) \
+        .get("embedding_function")
+    if embedding_function and embedding_function.get("type") == "known":
+        configuration["embedding_function"] = embedding_function
+    return configuration
+
+
+def load_configuration(configuration):
+    """Turn export_configuration() output into a create_collection configuration."""
+    result = {}
+    if configuration.get("hnsw"):
+        result["hnsw"] = configuration["hnsw"]
+    if configuration.get("embedding_function"):
+        from chromadb.api.collection_configuration import load_collection_configuration_from_json
+        # Builds the embedding function, e.g. OpenAI reading its API key variable
+        loaded = load_collection_configuration_from_json(
+            {"embedding_function": configuration["embedding_function"]})
+        result["embedding_function"] = loaded["embedding_function"]
+    return result
+
+
+def copy_configuration(collection):
+    """create_collection configuration that reproduces `collection`'s settings."""
+    return load_configuration(export_configuration(collection))
+
+
+# ============================================================
+# Export
+# ============================================================
+
+class _ExportCancelled(Exception):
+    pass
+
+
+def _put(members, item, cancelled):
+    """Queue a member for the writer, giving up once the export is cancelled."""
+    while not cancelled.is_set():
+        try:
+            members.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    raise _ExportCancelled()
+
+
+def _export_collection(collection, number, page_size, members, cancelled):
+    """Read one collection page by page, handing compressed members to the writer."""
+    pages = 0
+    records = 0
+    dimension = None
+    reader = CollectionReader(collection, include=["documents", "metadatas", "embeddings"],
+                              page_size=page_size)
+    for page in reader.pages():
+        prefix = f"{number}/{pages:06d}"
+        embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+        dimension = int(embeddings.shape[1]) if embeddings.size else dimension
+        _put(members, (f"{prefix}/ids.json.z", _pack_json(page["ids"])), cancelled)
+        _put(members, (f"{prefix}/documents.json.z", _pack_json(page["documents"])), cancelled)
+        _put(members, (f"{prefix}/metadatas.json.z", _pack_json(page["metadatas"])), cancelled)
+        _put(members, (f"{prefix}/embeddings.npy.z", _pack_matrix(embeddings)), cancelled)
+        pages += 1
+        records += len(page["ids"])
+    return {
+        "name": collection.name,
+        "metadata": collection.metadata,
+        "hnsw": hnsw_settings(collection),
+        "configuration": export_configuration(collection),
+        "records": records,
+        "pages": pages,
+        "dimension": dimension,
+    }
+
+
+def export_snapshot(client, path, names=None, page_size=DEFAULT_PAGE_SIZE,
+                    workers=DEFAULT_WORKERS):
+    """Write every (or each named) collection of `client` to a snapshot file."""
+    collections = [c for c in client.list_collections() if names is None or c.name in names]
+    # Bounded, so readers wait for the writer instead of piling pages up in memory
+    members = queue.Queue(maxsize=4 * workers)
+    cancelled = threading.Event()
+    start = time.perf_counter()
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_export_collection, c, n, page_size, members, cancelled)
+                       for n, c in enumerate(collections)]
+            try:
+                # ZipFile is not thread-safe, so this thread is the only writer
+                while True:
+                    try:
+                        name, blob = members.get(timeout=0.1)
+                    except queue.Empty:
+                        if all(future.done() for future in futures) and members.empty():
+                            break
+                        continue
+                    archive.writestr(name, blob)
+            finally:
+                # If writing failed, stop readers that are waiting on the full queue
+                cancelled.set()
+            entries = [future.result() for future in futures]
+
+        manifest = {"format_version": FORMAT_VERSION, "created_at": time.time(),
+                    "collections": entries}
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+    elapsed = time.perf_counter() - start
+    return {"collections": len(entries), "records": sum(e["records"] for e in entries),
+            "seconds": elapsed}
+
+
+# ============================================================
+# Restore
+# ============================================================
+
+def read_manifest(path):
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot format {manifest.get('format_version')}")
+    return manifest
+
+
+def _restore_collection(client, path, number, entry, replace, batch_size):
+    if replace:
+        try:
+            client.delete_collection(name=entry["name"])
+        except Exception:
+            pass
+    # Snapshots written before "configuration" was recorded only have "hnsw"
+    configuration = load_configuration(entry.get("configuration") or {"hnsw": entry["hnsw"]})
+    # Legacy "hnsw:*" keys in the metadata take precedence over the configuration
+    collection = client.create_collection(name=entry["name"], metadata=entry["metadata"] or None,
+                                          configuration=configuration or None)
+
+    # Each thread needs its own handle on the archive
+    with zipfile.ZipFile(path) as archive:
+        for page in range(entry["pages"]):
+            prefix = f"{number}/{page:06d}"
+            ids = _unpack_json(archive.read(f"{prefix}/ids.json.z"))
+            documents = _unpack_json(archive.read(f"{prefix}/documents.json.z"))
+            metadatas = _unpack_json(archive.read(f"{prefix}/metadatas.json.z"))
+            embeddings = _unpack_matrix(archive.read(f"{prefix}/embeddings.npy.z"))
+            for first in range(0, len(ids), batch_size):
+                last = first + batch_size
+                page_documents = documents[first:last] if documents else None
+                page_metadatas = metadatas[first:last] if metadatas else None
+                collection.add(
+                    ids=ids[first:last],
+                    embeddings=embeddings[first:last],
+                    documents=page_documents if page_documents and any(
+                        d is not None for d in page_documents) else None,
+                    metadatas=page_metadatas if page_metadatas and any(page_metadatas) else None,
+                )
+    return entry["records"]
+
+
+def restore_snapshot(client, path, replace=False, workers=DEFAULT_WORKERS):
+    """Recreate every collection in a snapshot without re-embedding."""
+    manifest = read_manifest(path)
+    batch_size = client.get_max_batch_size()
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(
+            lambda item: _restore_collection(client, path, item[0], item[1], replace, batch_size),
+            enumerate(manifest["collections"])))
+    return {"collections": len(counts), "records": sum(counts),
+            "seconds": time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or restore a ChromaDB snapshot.")
+    parser.add_argument("command", choices=["export", "restore"])
+    parser.add_argument("snapshot", help="snapshot file path")
+    parser.add_argument("--db", default="./chroma_db", help="PersistentClient path")
+    parser.add_argument("--collections", nargs="+", help="export only these collections")
+    parser.add_argument("--replace", action="store_true",
+                        help="on restore, drop existing collections with the same name")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=args.db)
+
+    print("="*60)
+    print(f"SNAPSHOT {args.command.upper()}")
+    print("="*60)
+
+    if args.command == "export":
+        stats = export_snapshot(client, args.snapshot, args.collections,
+                                page_size=args.page_size, workers=args.workers)
+        size_mb = os.path.getsize(args.snapshot) / (1024 * 1024)
+        print(f"\n✓ Exported {stats['collections']} collections ({stats['records']} records)"
+              f" to {args.snapshot}")
+        print(f"  Size: {size_mb:.1f} MB, time: {stats['seconds']:.1f}s")
+    else:
+        stats = restore_snapshot(client, args.snapshot, replace=args.replace,
+                                 workers=args.workers)
+        print(f"\n✓ Restored {stats['collections']} collections ({stats['records']} records)"
+              f" into {args.db} in {stats['seconds']:.1f}s")
+        print("  No embeddings were recomputed")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,11 @@ This script demonstrates how to:
 """
 
 import chromadb
+from instrumentation import profile_client
 
 # Initialize the ChromaDB client. This creates an in-memory database.
 print("Initializing ChromaDB client...")
-client = chromadb.Client()
+client = profile_client(chromadb.Client())  # --profile reports timings on exit
 print("✓ Client initialized")
 
 # Create a new collection or get it if it already exists.
@@ -9,13 +9,21 @@ This script demonstrates:
 """
 
 import chromadb
+from instrumentation import profile_client
+from query_cache import CachedCollection
+from semantic_cache import SemanticQueryCache
 
 # Initialize the ChromaDB client
 print("Initializing ChromaDB client...")
-client = chromadb.Client()
-
-# Create/get the collection
-collection = client.get_or_create_collection(name="travel_policies")
+client = profile_client(chromadb.Client())  # --profile reports timings on exit
+
+# Create/get the collection. CachedCollection remembers recent query
+# answers (and, with a SemanticQueryCache, answers to close paraphrases)
+# and forgets them whenever add/upsert/delete change the data.
+collection = CachedCollection(
+    client.get_or_create_collection(name="travel_policies"),
+    semantic_cache=SemanticQueryCache()
+)
 print(f"✓ Collection: {collection.name}\n")
 
 # ============================================================
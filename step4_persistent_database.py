@@ -9,6 +9,10 @@ This script demonstrates:
 
 import chromadb
 import os
+from catalog import CollectionCatalog
+from instrumentation import profile_client
+from query_cache import CachedCollection
+from semantic_cache import SemanticQueryCache
 
 print("="*60)
 print("STEP 4: Persistent Database")
@@ -22,7 +26,7 @@ print("-"*60)
 
 # Use PersistentClient and give it a path to a folder
 # This client will save all data to the "./chroma_db" directory
-persistent_client = chromadb.PersistentClient(path="./chroma_db")
+persistent_client = profile_client(chromadb.PersistentClient(path="./chroma_db"))
 
 print("✓ PersistentClient created")
 print(f"  Data will be stored in: {os.path.abspath('./chroma_db')}")
@@ -33,8 +37,12 @@ print(f"  Data will be stored in: {os.path.abspath('./chroma_db')}")
 print("\n2. Creating persistent collection...")
 print("-"*60)
 
-# Now, creating a collection works the same way, but it will be saved to disk
-p_collection = persistent_client.get_or_create_collection(name="saved_policies")
+# Now, creating a collection works the same way, but it will be saved to disk.
+# The cache wrapper reuses answers to repeated or paraphrased questions.
+p_collection = CachedCollection(
+    persistent_client.get_or_create_collection(name="saved_policies"),
+    semantic_cache=SemanticQueryCache()
+)
 
 print(f"✓ Collection created: {p_collection.name}")
 print(f"  Current count: {p_collection.count()} documents")
@@ -100,10 +108,12 @@ print("✓ If you run this script again, the data will still be there!")
 print("✓ You can restart Python and the data will persist.")
 
 # List all collections in the persistent client
-all_collections = persistent_client.list_collections()
+# The catalog reads every collection's count and index size in one pass
+catalog = CollectionCatalog(persistent_client, path="./chroma_db")
+all_collections = catalog.entries()
 print(f"\n✓ Collections in persistent database: {len(all_collections)}")
-for coll in all_collections:
-    print(f"  - {coll.name} ({coll.count()} documents)")
+for entry in all_collections:
+    print(f"  - {entry['name']} ({entry['count']} documents, {entry['index_bytes'] or 0} bytes on disk)")
 
 # ============================================================
 # SUMMARY
@@ -1,17 +1,21 @@
 """
 Step 4: Persistent Database - Smart Demo
 
-This script demonstrates persistence by checking if data exists first.
+This script demonstrates persistence by syncing against what is already
+stored: only new or changed documents are embedded and written, and
+documents removed from the source are deleted.
 """
 
 import chromadb
+from incremental_sync import sync_collection
+from instrumentation import profile_client
 
 print("="*60)
 print("STEP 4: Persistent Database (Smart Demo)")
 print("="*60)
 
 # Create persistent client
-persistent_client = chromadb.PersistentClient(path="./chroma_db")
+persistent_client = profile_client(chromadb.PersistentClient(path="./chroma_db"))
 
 # Get or create collection
 p_collection = persistent_client.get_or_create_collection(name="saved_policies")
@@ -19,35 +23,33 @@ p_collection = persistent_client.get_or_create_collection(name="saved_policies")
 print(f"\n✓ Connected to collection: {p_collection.name}")
 print(f"  Current document count: {p_collection.count()}")
 
-# Check if data already exists
-existing_data = p_collection.get()
-existing_ids = existing_data['ids']
+# The documents we want the collection to hold
+policies = [
+    ("saved_policy_01",
+     "All expense reports must be submitted within 15 days of trip completion.",
+     {"policy_type": "expenses", "deadline_days": 15}),
+    ("saved_policy_02",
+     "Meal allowance is $75 per day for domestic travel and $100 per day for international travel.",
+     {"policy_type": "meals", "domestic_allowance": 75, "international_allowance": 100}),
+    ("saved_policy_03",
+     "All travel bookings must be made at least 14 days in advance for the best rates.",
+     {"policy_type": "booking", "advance_days": 14}),
+]
 
-if len(existing_ids) > 0:
+# Sync compares per-document content hashes (read page by page) and only
+# upserts/deletes the differences
+stats = sync_collection(p_collection, policies)
+
+if stats["added"] == 0 and stats["updated"] == 0 and stats["deleted"] == 0:
     print("\n✓ DATA ALREADY EXISTS (Persistence confirmed!)")
-    print(f"  Found {len(existing_ids)} existing documents:")
-    for doc_id in existing_ids:
-        print(f"    - {doc_id}")
-    print("\n  Skipping data insertion (already exists)")
+    print(f"  All {stats['unchanged']} documents are unchanged")
+    print("\n  Skipping data insertion (nothing to embed)")
 else:
-    print("\n  No existing data found. Adding new documents...")
-    
-    # Add data only if it doesn't exist
-    p_collection.add(
-        ids=["saved_policy_01", "saved_policy_02", "saved_policy_03"],
-        documents=[
-            "All expense reports must be submitted within 15 days of trip completion.",
-            "Meal allowance is $75 per day for domestic travel and $100 per day for international travel.",
-            "All travel bookings must be made at least 14 days in advance for the best rates."
-        ],
-        metadatas=[
-            {"policy_type": "expenses", "deadline_days": 15},
-            {"policy_type": "meals", "domestic_allowance": 75, "international_allowance": 100},
-            {"policy_type": "booking", "advance_days": 14}
-        ]
-    )
-    
-    print(f"  ✓ Added 3 documents")
+    print("\n  Synced collection with source documents:")
+    print(f"  ✓ Added {stats['added']} documents")
+    print(f"  ✓ Updated {stats['updated']} documents")
+    print(f"  ✓ Deleted {stats['deleted']} documents")
+    print(f"  ✓ Unchanged {stats['unchanged']} documents")
 
 # Query the data (works whether it's new or existing)
 print("\n" + "-"*60)
@@ -70,4 +72,3 @@ print("="*60)
 print("\n✓ Data persists in ./chroma_db/")
 print("✓ Run this script multiple times - data will remain!")
 print("="*60)
-
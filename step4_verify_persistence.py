@@ -2,43 +2,52 @@
 Step 4 Verification: Check if data persists between runs
 
 This script checks the persistent database without modifying it.
+It streams the collection page by page, so it runs in constant memory
+however many documents are stored.
 """
 
 import chromadb
+from instrumentation import profile_client
+from streaming_reader import CollectionReader, iter_ids
+
+# How many documents to print in full
+SAMPLE_SIZE = 10
 
 print("="*60)
 print("VERIFYING PERSISTENT DATA")
 print("="*60)
 
 # Connect to the existing persistent database
-persistent_client = chromadb.PersistentClient(path="./chroma_db")
+persistent_client = profile_client(chromadb.PersistentClient(path="./chroma_db"))
 
 # Get the existing collection (don't create if it doesn't exist)
 try:
     p_collection = persistent_client.get_collection(name="saved_policies")
-    
+
     print(f"\n✓ Collection 'saved_policies' found!")
     print(f"  Total documents: {p_collection.count()}")
-    
-    # Show all document IDs
-    all_data = p_collection.get()
+
+    # Show all document IDs (fetched in pages, ids only)
     print(f"\n  Document IDs in collection:")
-    for doc_id in all_data['ids']:
+    for doc_id in iter_ids(p_collection):
         print(f"    - {doc_id}")
-    
-    # Query to verify data
+
+    # Show a few documents (only the first page is ever fetched)
     print(f"\n  Sample documents:")
-    for i, (doc_id, doc) in enumerate(zip(all_data['ids'], all_data['documents'])):
-        print(f"\n  {i+1}. ID: {doc_id}")
-        print(f"     Content: {doc}")
-    
+    reader = CollectionReader(p_collection, include=["documents"], page_size=SAMPLE_SIZE)
+    for i, record in enumerate(reader):
+        if i == SAMPLE_SIZE:
+            break
+        print(f"\n  {i+1}. ID: {record['id']}")
+        print(f"     Content: {record['document']}")
+
     print("\n" + "="*60)
     print("✓ DATA HAS PERSISTED!")
     print("="*60)
-    
+    print("\nFor a full integrity check: python cli.py verify")
+
 except Exception as e:
     print(f"\n✗ Collection not found or error: {e}")
     print("\nThis might mean:")
     print("  - You haven't run step4_persistent_database.py yet")
     print("  - The data didn't persist properly")
-
@@ -3,19 +3,22 @@ Step 5: Managing Collections (CRUD on Collections)
 
 This script demonstrates:
 - CREATE: Creating collections (we've already done this)
-- READ: Listing all collections
+- READ: Listing all collections (and searching them all at once)
 - UPDATE: Modifying collection name/metadata
 - DELETE: Removing collections
 """
 
 import chromadb
+from catalog import CollectionCatalog
+from fanout_search import FanOutSearch
+from instrumentation import profile_client
 
 print("="*60)
 print("STEP 5: Managing Collections (CRUD)")
 print("="*60)
 
 # Initialize client (using regular client for demo purposes)
-client = chromadb.Client()
+client = profile_client(chromadb.Client())  # --profile reports timings on exit
 
 # ============================================================
 # CREATE: Create some sample collections
@@ -43,11 +46,25 @@ print("  - it_policies")
 print("\n2. READ: Listing all collections...")
 print("-"*60)
 
-all_collections = client.list_collections()
+# The catalog lists every collection with its document count in one pass
+# (instead of calling count() once per collection)
+catalog = CollectionCatalog(client)
+all_collections = catalog.entries()
 
 print(f"✓ Found {len(all_collections)} collections:\n")
-for coll in all_collections:
-    print(f"  - {coll.name} ({coll.count()} documents)")
+for entry in all_collections:
+    print(f"  - {entry['name']} ({entry['count']} documents)")
+
+# One search box over all three collections: they are queried in parallel
+# and the hits merged into a single ranking
+search = FanOutSearch([collection1, collection2, collection3], timeout=2.0)
+results = search.query(query_texts=["policy for employees"], n_results=3)
+search.close()
+
+print("\n✓ Searched all collections at once for 'policy for employees':")
+for doc, source, distance in zip(results["documents"][0], results["sources"][0],
+                                 results["distances"][0]):
+    print(f"  - [{source}] {doc} (distance: {distance:.4f})")
 
 # ============================================================
 # UPDATE: Modify a Collection
@@ -116,6 +133,7 @@ print("!"*60)
 print("  - All documents in the collection are deleted")
 print("  - This action CANNOT be undone")
 print("  - Always backup important data before deleting")
+print("    (python snapshot.py export backup.chromasnap)")
 
 # ============================================================
 # SUMMARY
@@ -4,8 +4,10 @@ Step 6: Advanced - Using OpenAI's Embedding Model
 This script demonstrates:
 - Installing and using OpenAI and tiktoken libraries
 - Counting tokens with tiktoken
+- Packing texts into token-budgeted embedding requests
 - Creating collections with OpenAI embedding functions
 - Querying with OpenAI embeddings
+- Caching embeddings on disk so re-runs only pay for new texts
 
 PREREQUISITES:
 1. Install libraries: pip install openai tiktoken
@@ -94,6 +96,15 @@ for text in sample_texts:
     print(f"  Token count: {token_count}")
     print(f"  First few tokens: {tokens[:10]}\n")
 
+# Token counts also decide how many texts fit in one embedding request.
+# embedding_batcher packs texts up to the API's per-request limits and
+# sends the requests concurrently, instead of one small request at a time.
+from embedding_batcher import count_tokens, pack_batches, MAX_TOKENS_PER_REQUEST
+
+batches = pack_batches(count_tokens(sample_texts, encoding))
+print(f"Request packing: {len(sample_texts)} texts fit in {len(batches)} request(s)")
+print(f"  (limit: {MAX_TOKENS_PER_REQUEST} tokens per request)\n")
+
 # ============================================================
 # 4. Create Collection with OpenAI Embedding Function
 # ============================================================
@@ -101,23 +112,38 @@ print("4. Creating collection with OpenAI embeddings...")
 print("-"*60)
 
 import chromadb
+from instrumentation import profile_client
 from chromadb.utils import embedding_functions
+from embedding_cache import CachingEmbeddingFunction
+from query_cache import CachedCollection
+from semantic_cache import SemanticQueryCache
 
 # Create an embedding function using OpenAI's model
 openai_ef = embedding_functions.OpenAIEmbeddingFunction(
     model_name="text-embedding-3-small"
 )
 
+# Wrap it in an on-disk cache so repeated runs only embed new texts
+cached_openai_ef = CachingEmbeddingFunction(
+    openai_ef,
+    model_name="text-embedding-3-small"
+)
+
 print("[OK] Created OpenAI embedding function")
 print("  Model: text-embedding-3-small")
+print(f"  Cache: {cached_openai_ef.path} ({cached_openai_ef.stats()['entries']} cached embeddings)")
 
 # Initialize ChromaDB client
-client = chromadb.Client()
+client = profile_client(chromadb.Client())  # --profile reports timings on exit
 
 # Create a new collection with OpenAI embedding function
-openai_collection = client.get_or_create_collection(
-    name="travel_policies_openai",
-    embedding_function=openai_ef
+# Paraphrased questions reuse earlier answers instead of searching again
+openai_collection = CachedCollection(
+    client.get_or_create_collection(
+        name="travel_policies_openai",
+        embedding_function=cached_openai_ef
+    ),
+    semantic_cache=SemanticQueryCache(embedding_function=cached_openai_ef)
 )
 
 print(f"[OK] Created collection: {openai_collection.name}")
@@ -144,7 +170,7 @@ openai_collection.add(
 
 print("[OK] Added 3 documents to collection")
 print(f"  Total documents: {openai_collection.count()}")
-print("  Note: OpenAI API was called to generate embeddings")
+print("  Note: OpenAI API was called only for texts not already cached")
 
 # ============================================================
 # 6. Query with OpenAI Embeddings
@@ -170,6 +196,10 @@ for i, (doc, distance, metadata) in enumerate(zip(
     print(f"   Policy Type: {metadata['policy_type']}")
     print(f"   Content: {doc[:80]}...")
 
+cache_stats = cached_openai_ef.stats()
+print(f"\nEmbedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+print("  Run this script again and every embedding will come from the cache")
+
 # ============================================================
 # Comparison with Default Embeddings
 # ============================================================
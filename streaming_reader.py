@@ -0,0 +1,126 @@
+"""
+Streaming Reader: Paging Through a Collection in Constant Memory
+
+This module provides:
+- Lazy iteration over a collection in fixed-size pages
+- include= projection, so only the requested fields are fetched
+  (never embeddings unless asked for)
+- A resumable cursor that can be saved and handed back later
+- copy_records(), which copies a collection page by page with its
+  stored embeddings
+
+Usage:
+    reader = CollectionReader(collection, include=["documents"], page_size=500)
+    for record in reader:
+        print(record["id"], record["document"])
+        saved = reader.cursor.to_json()      # resume later from here
+
+    reader = CollectionReader(collection, cursor=ReadCursor.from_json(saved))
+
+The cursor is an offset into the collection's stable storage order, so
+resuming is exact as long as nothing was deleted in between.
+"""
+
+import json
+
+DEFAULT_PAGE_SIZE = 500
+
+# get() field names -> the singular key each record uses
+_FIELDS = {
+    "documents": "document",
+    "metadatas": "metadata",
+    "embeddings": "embedding",
+    "uris": "uri",
+    "data": "data",
+}
+
+
+class ReadCursor:
+    """Position of the next record to read."""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+
+    def to_json(self):
+        return json.dumps({"offset": self.offset})
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(**json.loads(text))
+
+    def __repr__(self):
+        return f"ReadCursor(offset={self.offset})"
+
+
+class CollectionReader:
+    """Iterates a collection page by page, yielding one dict per record.
+
+    Each record has an "id" key plus one key per included field:
+    "document", "metadata", "embedding", "uri" or "data".
+    """
+
+    def __init__(self, collection, include=("documents", "metadatas"),
+                 page_size=DEFAULT_PAGE_SIZE, where=None, where_document=None, cursor=None):
+        unknown = set(include) - set(_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown include fields: {sorted(unknown)}")
+        self.collection = collection
+        self.include = list(include)
+        self.page_size = page_size
+        self.where = where
+        self.where_document = where_document
+        self.cursor = cursor or ReadCursor()
+
+    def pages(self):
+        """Yield raw get() results, one page at a time."""
+        while True:
+            start = self.cursor.offset
+            page = self.collection.get(
+                include=self.include,
+                limit=self.page_size,
+                offset=start,
+                where=self.where,
+                where_document=self.where_document,
+            )
+            if not page["ids"]:
+                return
+            yield page
+            self.cursor.offset = start + len(page["ids"])
+            if len(page["ids"]) < self.page_size:
+                return
+
+    def __iter__(self):
+        for page in self.pages():
+            start = self.cursor.offset
+            columns = [(_FIELDS[field], page[field]) for field in self.include]
+            for i, doc_id in enumerate(page["ids"]):
+                record = {"id": doc_id}
+                for key, values in columns:
+                    record[key] = values[i] if values is not None else None
+                # Advance before yielding so a saved cursor points past this record
+                self.cursor.offset = start + i + 1
+                yield record
+
+
+def iter_ids(collection, page_size=DEFAULT_PAGE_SIZE):
+    """Yield just the ids of a collection."""
+    for record in CollectionReader(collection, include=(), page_size=page_size):
+        yield record["id"]
+
+
+def copy_records(source, target, page_size=DEFAULT_PAGE_SIZE):
+    """Copy every record, with its stored embedding, from one collection to another.
+
+    Nothing is re-embedded. Returns the number of records copied.
+    """
+    copied = 0
+    reader = CollectionReader(source, include=["documents", "metadatas", "embeddings"],
+                              page_size=page_size)
+    for page in reader.pages():
+        documents = page["documents"]
+        metadatas = page["metadatas"]
+        target.add(ids=page["ids"], embeddings=page["embeddings"],
+                   documents=documents if any(d is not None for d in documents) else None,
+                   metadatas=metadatas if any(metadatas) else None)
+        copied += len(page["ids"])
+    return copied
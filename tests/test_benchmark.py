@@ -0,0 +1,40 @@
+"""CRUD benchmark helpers and regression detection."""
+
+import chromadb
+
+from benchmark import find_regressions, run_crud, summarize, synthetic_queries, synthetic_records
+
+
+def result(operation, throughput, p95_ms):
+    return {"client": "ephemeral", "size": 100, "operation": operation,
+            "throughput": throughput, "p95_ms": p95_ms}
+
+
+def test_synthetic_corpus_is_reproducible():
+    assert list(synthetic_records(5, seed=3)) == list(synthetic_records(5, seed=3))
+    assert list(synthetic_records(5, seed=3)) != list(synthetic_records(5, seed=4))
+
+
+def test_summarize():
+    summary = summarize("add", [0.1, 0.2, 0.3, 0.4], items=100)
+    assert summary["calls"] == 4
+    assert summary["throughput"] == 100 / 1.0
+    assert summary["p50_ms"] == 250.0
+
+
+def test_regressions_beyond_tolerance_are_flagged():
+    baseline = {"results": [result("add", 1000.0, 10.0), result("query", 500.0, 2.0)]}
+    current = {"results": [result("add", 950.0, 10.5), result("query", 400.0, 2.5),
+                           result("delete", 1.0, 99.0)]}
+    regressions = find_regressions(baseline, current, tolerance=0.10)
+    assert [(r["operation"], r["metric"]) for r in regressions] == \
+        [("query", "throughput"), ("query", "p95_ms")]
+
+
+def test_run_crud_covers_every_operation(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("bench_small", embedding_function=letter_ef)
+    results = run_crud(collection, size=250, queries=synthetic_queries(20), batch_size=100, seed=0)
+    assert [r["operation"] for r in results] == ["add", "query", "upsert", "delete"]
+    assert results[0]["items"] == 250 and results[0]["calls"] == 3
+    assert collection.count() == 250 - results[3]["items"]
@@ -0,0 +1,60 @@
+"""Filtered deletes, copying stored records and compaction."""
+
+import chromadb
+import numpy as np
+import pytest
+
+from bulk_delete import count_matches, delete_and_compact, delete_where
+from streaming_reader import copy_records
+
+
+def make_collection(client, letter_ef, size=30):
+    collection = client.create_collection("saved_policies", embedding_function=letter_ef,
+                                          configuration={"hnsw": {"space": "cosine"}})
+    collection.add(ids=[f"policy-{i}" for i in range(size)],
+                   documents=[f"{'train' if i % 3 == 0 else 'hotel'} policy {i}"
+                              for i in range(size)],
+                   metadatas=[{"policy_type": "trains" if i % 3 == 0 else "hotels", "row": i}
+                              for i in range(size)])
+    return collection
+
+
+def test_delete_where_removes_every_match_in_batches(tmp_path, letter_ef):
+    collection = make_collection(chromadb.PersistentClient(path=str(tmp_path)), letter_ef)
+    assert count_matches(collection, where={"policy_type": "trains"}, page_size=4) == 10
+    assert delete_where(collection, where={"policy_type": "trains"}, batch_size=4,
+                        progress=None) == 10
+    assert collection.count() == 20
+    assert count_matches(collection, where={"policy_type": "trains"}) == 0
+    with pytest.raises(ValueError):
+        delete_where(collection)
+
+
+def test_copy_records_keeps_vectors_and_missing_fields(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    source = make_collection(client, letter_ef, size=5)
+    source.add(ids=["vector-only"], embeddings=[[0.5] * 26])
+    target = client.create_collection("copied_policies")
+    assert copy_records(source, target, page_size=2) == 6
+    copied = target.get(ids=["policy-1", "vector-only"],
+                        include=["documents", "metadatas", "embeddings"])
+    original = source.get(ids=["policy-1", "vector-only"], include=["embeddings"])
+    np.testing.assert_allclose(copied["embeddings"], original["embeddings"])
+    assert copied["documents"] == ["hotel policy 1", None]
+    assert copied["metadatas"] == [{"policy_type": "hotels", "row": 1}, None]
+
+
+def test_compaction_keeps_the_remaining_records_and_settings(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    make_collection(client, letter_ef)
+    report = delete_and_compact(client, str(tmp_path), "saved_policies",
+                                where={"policy_type": "trains"}, batch_size=7, progress=None)
+    assert (report["deleted"], report["count_before"], report["count_after"]) == (10, 30, 20)
+    assert report["unavailable_seconds"] >= report["vacuum_seconds"]
+    assert [c.name for c in client.list_collections()] == ["saved_policies"]
+    rebuilt = client.get_collection("saved_policies")
+    assert rebuilt.count() == 20
+    assert rebuilt.configuration_json["hnsw"]["space"] == "cosine"
+    # Letter counts ignore digits, so any hotel policy is a nearest match
+    hits = rebuilt.query(query_texts=["hotel policy"], n_results=3)["documents"][0]
+    assert all(hit.startswith("hotel") for hit in hits)
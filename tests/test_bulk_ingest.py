@@ -0,0 +1,50 @@
+"""Streaming readers and the embed/write pipeline of bulk_ingest."""
+
+import json
+
+import chromadb
+
+from bulk_ingest import ingest, iter_batches, iter_records
+
+
+def fake_embedding_function(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_jsonl_and_csv_readers(tmp_path):
+    jsonl = tmp_path / "policies.jsonl"
+    jsonl.write_text(json.dumps({"id": 1, "document": "Hotel budget", "metadata": {"a": 1}})
+                     + "\n\n" + json.dumps({"id": "b", "document": "Meals"}) + "\n")
+    assert list(iter_records(str(jsonl))) == [("1", "Hotel budget", {"a": 1}),
+                                              ("b", "Meals", None)]
+
+    csv_path = tmp_path / "policies.csv"
+    csv_path.write_text("id,document,policy_type,region\nh1,Hotel budget,hotels,\n")
+    assert list(iter_records(str(csv_path))) == [("h1", "Hotel budget",
+                                                  {"policy_type": "hotels"})]
+
+
+def test_iter_batches_is_lazy():
+    def records():
+        for i in range(5):
+            yield i
+        raise AssertionError("read past the last batch that was asked for")
+
+    batches = iter_batches(records(), 2)
+    assert next(batches) == [0, 1]
+    assert next(batches) == [2, 3]
+
+
+def test_ingest_writes_every_record(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("bulk_policies")
+    records = ((f"doc-{i}", f"policy text {'x' * (i % 9)}", {"n": i} if i % 2 else None)
+               for i in range(250))
+    stats = ingest(records, collection, fake_embedding_function, batch_size=40, workers=3,
+                   progress=None)
+    assert stats["documents"] == 250
+    assert collection.count() == 250
+    stored = collection.get(ids=["doc-7"], include=["documents", "metadatas", "embeddings"])
+    assert stored["documents"] == ["policy text xxxxxxx"]
+    assert stored["metadatas"] == [{"n": 7}]
+    assert list(stored["embeddings"][0]) == [19.0, 1.0]
@@ -0,0 +1,38 @@
+"""CollectionCatalog counts match count(), with and without the SQLite shortcut."""
+
+import chromadb
+
+from catalog import CollectionCatalog, read_sqlite_stats
+
+
+def make_client(path):
+    client = chromadb.PersistentClient(path=str(path))
+    for name, size in (("travel_policies", 3), ("saved_policies", 12), ("empty_policies", 0)):
+        collection = client.create_collection(name)
+        if size:
+            collection.add(ids=[f"{name}-{i}" for i in range(size)],
+                           embeddings=[[float(i), 0.5] for i in range(size)])
+    return client
+
+
+def counts(entries):
+    return {entry["name"]: entry["count"] for entry in entries}
+
+
+def test_sqlite_counts_match_count_calls(tmp_path):
+    client = make_client(tmp_path)
+    expected = {c.name: c.count() for c in client.list_collections()}
+    assert counts(CollectionCatalog(client, path=str(tmp_path)).entries()) == expected
+    # Without a path every count() runs on the thread pool instead
+    assert counts(CollectionCatalog(client).entries()) == expected
+    assert read_sqlite_stats(str(tmp_path / "missing")) is None
+
+
+def test_snapshot_refreshes_after_changes_through_the_catalog(tmp_path):
+    client = make_client(tmp_path)
+    catalog = CollectionCatalog(client, path=str(tmp_path))
+    assert len(catalog.entries()) == 3
+    catalog.create_collection("visa_policies")
+    catalog.delete_collection("empty_policies")
+    assert sorted(counts(catalog.entries())) == ["saved_policies", "travel_policies",
+                                                 "visa_policies"]
@@ -0,0 +1,65 @@
+"""Chunk windows, chunk records, stale-chunk removal and regrouping."""
+
+import chromadb
+import pytest
+
+from bulk_ingest import ingest
+from chunking import Chunker, group_by_parent, token_windows
+
+
+class WordEncoding:
+    """One token per word; tiktoken's files need a download."""
+
+    def encode_ordinary_batch(self, texts, num_threads=1):
+        return [text.split() for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def words(count):
+    return " ".join(f"w{i}" for i in range(count))
+
+
+def test_token_windows_overlap_and_cover_the_document():
+    assert token_windows(5, 10, 2) == [(0, 5)]
+    assert token_windows(20, 8, 3) == [(0, 8), (5, 13), (10, 18), (15, 20)]
+    with pytest.raises(ValueError):
+        Chunker(WordEncoding(), max_tokens=4, overlap=4)
+
+
+def test_chunks_inherit_metadata():
+    chunker = Chunker(WordEncoding(), max_tokens=4, overlap=1)
+    chunks = list(chunker.chunk([("handbook", words(10), {"policy_type": "hotels"}),
+                                 ("short", "one two", None)]))
+    assert [chunk_id for chunk_id, _, _ in chunks] == \
+        ["handbook#0", "handbook#1", "handbook#2", "short#0"]
+    assert chunks[1][1] == "w3 w4 w5 w6"
+    assert chunks[1][2] == {"policy_type": "hotels", "parent_id": "handbook",
+                            "chunk_index": 1, "chunk_tokens": 4}
+    assert chunker.stats.summary()["chunks"] == 4
+
+
+def test_reingesting_a_shorter_document_leaves_no_stale_chunks(tmp_path, letter_ef):
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "chunked_policies", embedding_function=letter_ef)
+    chunker = Chunker(WordEncoding(), max_tokens=4, overlap=0)
+    ingest(chunker.chunk([("doc", words(12), None)], collection=collection), collection,
+           letter_ef, progress=None)
+    assert collection.count() == 3
+    ingest(chunker.chunk([("doc", words(3), None)], collection=collection), collection,
+           letter_ef, progress=None)
+    assert collection.get()["ids"] == ["doc#0"]
+
+
+def test_group_by_parent_keeps_best_first():
+    results = {
+        "ids": [["a#1", "b#0", "a#0"]],
+        "documents": [["a1", "b0", "a0"]],
+        "metadatas": [[{"parent_id": "a"}, {"parent_id": "b"}, None]],
+        "distances": [[0.1, 0.2, 0.3]],
+    }
+    groups = group_by_parent(results)
+    assert [(group["parent_id"], group["distance"]) for group in groups] == [("a", 0.1),
+                                                                             ("b", 0.2)]
+    assert [chunk["id"] for chunk in groups[0]["chunks"]] == ["a#1", "a#0"]
@@ -0,0 +1,41 @@
+"""cli.py start-up budget and argument routing."""
+
+import os
+import subprocess
+import sys
+
+from cli import _split_global_options
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_startup_within_budget():
+    # benchmark.py --startup exits non-zero if any command is over budget
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "benchmark.py"), "--startup"],
+                            capture_output=True, text=True, cwd=ROOT)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_global_db_before_delegated_subcommand():
+    assert _split_global_options(["--db", "./x", "ingest", "file.jsonl"]) == \
+        (["--db", "./x"], "ingest", ["file.jsonl"])
+    assert _split_global_options(["--db=./x", "ingest", "file.jsonl", "--db", "./y"]) == \
+        (["--db=./x"], "ingest", ["file.jsonl", "--db", "./y"])
+    assert _split_global_options(["query", "hotel"]) == ([], "query", ["hotel"])
+
+
+def test_query_reopens_a_collection_with_a_repo_embedding_function(tmp_path):
+    import chromadb
+
+    from local_embeddings import HashingEmbeddingFunction
+
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "saved_policies", embedding_function=HashingEmbeddingFunction(dimension=32))
+    collection.add(ids=["hotel", "meals"],
+                   documents=["Hotel budget is $300 per night.", "Meals up to $75 per day."])
+    # A fresh process has not imported local_embeddings; open_client registers it
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), "--db", str(tmp_path),
+                             "query", "hotel budget", "--n-results", "1"],
+                            capture_output=True, text=True, cwd=ROOT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "[hotel]" in result.stdout
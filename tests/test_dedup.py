@@ -0,0 +1,87 @@
+"""Near-duplicate policies, the LSH bound, stored duplicates and reused embeddings."""
+
+import chromadb
+
+from bulk_ingest import ingest
+from dedup import Deduplicator, shingles
+
+HOTEL = ("Hotel budget is $300 per night for all employees traveling on business. Book "
+         "through the travel portal, choose the negotiated rate where one exists, keep the "
+         "itemized folio and submit it with the expense report within thirty days of return.")
+HOTEL_EDIT = HOTEL.replace("thirty days", "thirty calendar days")
+MEALS = ("Meal allowance is $75 per day including tips and taxes while away from home. "
+         "Alcohol is not reimbursed, client dinners need prior approval from a manager, and "
+         "receipts are required for any single meal that costs more than twenty five dollars.")
+
+
+def records():
+    return [("hotel-1", HOTEL, {"version": 1}), ("meals", MEALS, None),
+            ("hotel-2", HOTEL_EDIT, {"version": 2})]
+
+
+def test_shingles():
+    assert shingles("One two") == {"one two"}
+    assert shingles("a b c d", size=3) == {"a b c", "b c d"}
+
+
+def test_policies():
+    skip = Deduplicator(threshold=0.5, policy="skip")
+    assert [r[0] for r in skip.filter(records())] == ["hotel-1", "meals"]
+    assert skip.stats(dimension=4)["estimated_bytes_saved"] == 4 * 4 + 2 * 16 * 4
+
+    merge = Deduplicator(threshold=0.5, policy="merge")
+    assert [r[0] for r in merge.filter(records())] == ["hotel-1", "meals"]
+    assert merge.merges == {"hotel-1": ["hotel-2"]}
+
+    link = Deduplicator(threshold=0.5, policy="link")
+    linked = list(link.filter(records()))
+    assert linked[2] == ("hotel-2", HOTEL_EDIT, {"version": 2, "duplicate_of": "hotel-1"})
+    assert link.stats()["dropped"] == 0
+
+
+def test_lsh_index_is_bounded():
+    dedup = Deduplicator(threshold=0.5, max_records=2)
+    texts = [f"policy number {i} covers topic {i} in region {i}" for i in range(10)]
+    list(dedup.filter((f"doc-{i}", text, None) for i, text in enumerate(texts)))
+    assert list(dedup._signatures) == ["doc-8", "doc-9"]
+    assert set().union(*dedup._buckets.values()) == {"doc-8", "doc-9"}
+    # A forgotten record is no longer matched
+    assert dedup.find_duplicate("again", texts[0]) is None
+
+
+def test_scan_collection_handles_duplicates_from_earlier_runs(tmp_path, letter_ef):
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "saved_policies", embedding_function=letter_ef)
+    # An earlier run without dedup stored both revisions
+    collection.add(ids=["hotel-1", "meals", "hotel-2"], documents=[HOTEL, MEALS, HOTEL_EDIT],
+                   metadatas=[{"version": 1}, {"duplicate_ids": "hotel-0"}, {"version": 2}])
+    dedup = Deduplicator(threshold=0.5, policy="merge")
+    assert dedup.scan_collection(collection) == {"scanned": 3, "duplicates": 1}
+    assert sorted(collection.get()["ids"]) == ["hotel-1", "meals"]
+
+    # New records are compared with the stored ones
+    new = [("hotel-3", HOTEL + " today", None), ("meals-2", MEALS + " today", None)]
+    assert list(dedup.filter(new)) == []
+    dedup.apply_merges(collection)
+    stored = collection.get(ids=["hotel-1", "meals"], include=["metadatas"])["metadatas"]
+    assert stored[0]["duplicate_ids"] == "hotel-2,hotel-3"
+    # Ids merged by an earlier run are kept
+    assert stored[1]["duplicate_ids"] == "hotel-0,meals-2"
+
+
+def test_ingest_reuses_dedup_embeddings(tmp_path, letter_ef):
+    calls = []
+
+    def counting_ef(texts):
+        calls.append(len(texts))
+        return letter_ef(texts)
+
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "saved_policies", embedding_function=letter_ef)
+    dedup = Deduplicator(threshold=0.5, embedding_function=counting_ef, embedding_threshold=0.9)
+    written = list(dedup.filter(records(), page_size=2))
+    assert [len(record) for record in written] == [4, 4]
+    ingest(written, collection, counting_ef, progress=None)
+    # Two pages embedded by the filter, nothing re-embedded by ingest
+    assert calls == [2, 1]
+    assert collection.count() == 2
@@ -0,0 +1,77 @@
+"""Token packing, retries and the event loop of BatchedOpenAIEmbeddingFunction."""
+
+import asyncio
+
+import pytest
+import tiktoken
+
+from embedding_batcher import BatchedOpenAIEmbeddingFunction, embed_texts, pack_batches
+
+
+class FakeEncoding:
+    """One token per word; tiktoken's files need a download."""
+
+    def encode_ordinary_batch(self, texts):
+        return [text.split() for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def fake_encoding(monkeypatch):
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: FakeEncoding())
+
+
+def test_pack_batches_respects_limits():
+    assert pack_batches([3, 3, 3, 3], max_tokens=6) == [[0, 1], [2, 3]]
+    assert pack_batches([1] * 5, max_inputs=2) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        pack_batches([10], max_tokens_per_input=5)
+
+
+def test_results_keep_input_order_through_rate_limits():
+    attempts = []
+
+    async def embed_request(texts):
+        attempts.append(len(texts))
+        if len(attempts) == 1:
+            error = RuntimeError("rate limited")
+            error.status_code = 429
+            raise error
+        await asyncio.sleep(0.01 * (len(texts) % 3))
+        return [[float(len(text))] for text in texts]
+
+    texts = [f"policy {'word ' * (i % 7)}" for i in range(40)]
+    vectors = asyncio.run(embed_texts(texts, embed_request, FakeEncoding(), max_tokens=20,
+                                      base_delay=0.01))
+    assert vectors == [[float(len(text))] for text in texts]
+    assert len(attempts) > len(pack_batches([len(t.split()) for t in texts], max_tokens=20))
+
+
+def test_calls_share_one_open_event_loop():
+    loops = []
+
+    async def embed_request(texts):
+        loops.append(asyncio.get_running_loop())
+        return [[1.0] for _ in texts]
+
+    batched_ef = BatchedOpenAIEmbeddingFunction(embed_request=embed_request)
+    batched_ef(["hotel budget"])
+    batched_ef(["meal allowance"])
+    assert loops[0] is loops[1] and not loops[0].is_closed()
+
+    batched_ef.close()
+    with pytest.raises(RuntimeError):
+        batched_ef(["flight class"])
+
+
+def test_configuration_round_trip(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")  # the client is built, never used
+    batched_ef = BatchedOpenAIEmbeddingFunction(model_name="text-embedding-3-small",
+                                                dimensions=256)
+    rebuilt = BatchedOpenAIEmbeddingFunction.build_from_config(batched_ef.get_config())
+    assert (rebuilt.model_name, rebuilt.dimensions) == ("text-embedding-3-small", 256)
+
+    async def embed_request(texts):
+        return [[1.0] for _ in texts]
+
+    assert BatchedOpenAIEmbeddingFunction(embed_request=embed_request).get_config() \
+        is NotImplemented
@@ -0,0 +1,115 @@
+"""CachingEmbeddingFunction against a local fake model."""
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions import register_embedding_function
+
+from embedding_cache import CachingEmbeddingFunction
+
+
+class FakeModel:
+    """Stands in for the OpenAI API and records every text it embeds."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(sum(map(ord, text)) % 97)] for text in texts]
+
+
+@register_embedding_function
+class StoredFakeModel(EmbeddingFunction):
+    """A fake model ChromaDB can store in a collection's configuration."""
+
+    def __init__(self, dimension=2):
+        self.dimension = dimension
+
+    def __call__(self, input):
+        return [np.full(self.dimension, float(len(text)), dtype=np.float32) for text in input]
+
+    @staticmethod
+    def name():
+        return "stored_fake_model"
+
+    def get_config(self):
+        return {"dimension": self.dimension}
+
+    @staticmethod
+    def build_from_config(config):
+        return StoredFakeModel(config["dimension"])
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+def test_hits_and_misses(tmp_path, model):
+    cached_ef = CachingEmbeddingFunction(model, model_name="fake",
+                                         path=str(tmp_path / "cache.sqlite3"))
+    first = cached_ef(["hotel budget", "meal allowance", "hotel budget"])
+    assert model.calls == [["hotel budget", "meal allowance"]]
+
+    # Whitespace-only differences share a key
+    second = cached_ef(["hotel  budget", "flight class"])
+    assert model.calls[-1] == ["flight class"]
+    np.testing.assert_array_equal(first[0], second[0])
+    assert cached_ef.stats()["hits"] == 2
+    assert cached_ef.stats()["misses"] == 3
+    cached_ef.close()
+
+
+def test_vectors_survive_a_restart(tmp_path, model):
+    path = str(tmp_path / "cache.sqlite3")
+    CachingEmbeddingFunction(model, model_name="fake", path=path)(["hotel budget"])
+    reopened = CachingEmbeddingFunction(model, model_name="fake", path=path)
+    reopened(["hotel budget"])
+    assert len(model.calls) == 1
+    # Another model name is another key
+    CachingEmbeddingFunction(model, model_name="other", path=path)(["hotel budget"])
+    assert len(model.calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, model):
+    cached_ef = CachingEmbeddingFunction(model, model_name="fake",
+                                         path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cached_ef(["a"])
+    cached_ef(["b"])
+    cached_ef(["a"])  # "b" is now the least recently used
+    cached_ef(["c"])
+    assert cached_ef.stats()["entries"] == 2
+
+    model.calls.clear()
+    cached_ef(["a", "b", "c"])
+    assert model.calls == [["b"]]
+
+
+def test_configuration_round_trip(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cached_ef = CachingEmbeddingFunction(StoredFakeModel(dimension=3),
+                                         model_name="fake", path=path, max_entries=10)
+    rebuilt = CachingEmbeddingFunction.build_from_config(cached_ef.get_config())
+    assert rebuilt.path == path and rebuilt.max_entries == 10
+    assert rebuilt.embedding_function.dimension == 3
+
+    # A plain callable cannot be stored, so ChromaDB treats the cache as legacy
+    assert CachingEmbeddingFunction(FakeModel(), model_name="fake",
+                                    path=path).get_config() is NotImplemented
+
+
+def test_reopened_collection_keeps_the_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    client = chromadb.PersistentClient(path=str(tmp_path / "db"))
+    collection = client.create_collection(
+        "cached_policies", embedding_function=CachingEmbeddingFunction(
+            StoredFakeModel(), model_name="fake", path=path))
+    collection.add(ids=["hotel", "meals"], documents=["hotel budget", "meal allowance!"])
+
+    reopened = chromadb.PersistentClient(path=str(tmp_path / "db")).get_collection(
+        "cached_policies")
+    embedding_function = reopened.configuration["embedding_function"]
+    assert isinstance(embedding_function, CachingEmbeddingFunction)
+    assert reopened.query(query_texts=["hotel budget"], n_results=1)["ids"] == [["hotel"]]
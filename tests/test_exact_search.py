@@ -0,0 +1,131 @@
+"""The exact engine must return what ChromaDB's own query returns."""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from exact_search import ExactIndex, ExactSearchCollection
+
+METADATAS = [
+    {"g": 1},
+    {"h": 1},
+    {"g": True},
+    {"g": 1.0},
+    {"g": "1"},
+    {"g": 2.5, "h": "x"},
+    {"g": False},
+    {"g": 0, "h": 2},
+]
+
+FILTERS = [
+    {"g": 1},
+    {"g": 1.0},
+    {"g": True},
+    {"g": "1"},
+    {"g": {"$eq": False}},
+    {"g": {"$ne": 1}},
+    {"g": {"$ne": True}},
+    {"g": {"$nin": [1]}},
+    {"g": {"$nin": ["1", "x"]}},
+    {"g": {"$in": [1, 2]}},
+    {"g": {"$in": [2.5, 0.5]}},
+    {"g": {"$gt": 0}},
+    {"g": {"$gte": 1}},
+    {"g": {"$lt": 2}},
+    {"g": {"$lte": 0}},
+    {"g": {"$gt": -0.5}},
+    {"g": {"$lt": 0.7}},
+    {"g": 0.5},
+    {"$and": [{"g": {"$ne": 1}}, {"h": {"$ne": 2}}]},
+    {"$or": [{"g": {"$nin": [1]}}, {"h": 1}]},
+]
+
+
+@pytest.fixture(scope="module", params=["l2", "cosine", "ip"])
+def collection(request):
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(name=f"exact_{uuid.uuid4().hex}",
+                                          metadata={"hnsw:space": request.param})
+    rng = np.random.default_rng(0)
+    collection.add(ids=[f"doc_{i}" for i in range(len(METADATAS))],
+                   embeddings=rng.normal(size=(len(METADATAS), 8)).astype(np.float32),
+                   metadatas=METADATAS, documents=[f"document {i}" for i in range(len(METADATAS))])
+    yield collection
+    client.delete_collection(name=collection.name)
+
+
+@pytest.mark.parametrize("where", FILTERS, ids=[str(where) for where in FILTERS])
+def test_filtered_query_matches_chroma(collection, where):
+    queries = np.random.default_rng(1).normal(size=(3, 8)).astype(np.float32)
+    expected = collection.query(query_embeddings=queries, n_results=len(METADATAS), where=where)
+    actual = ExactIndex.from_collection(collection).search(queries, len(METADATAS), where)
+    assert actual["ids"] == expected["ids"]
+    assert actual["metadatas"] == expected["metadatas"]
+    for got, want in zip(actual["distances"], expected["distances"]):
+        assert np.allclose(got, want, atol=1e-4)
+
+
+def test_wrapper_switches_on_threshold(collection):
+    query = np.ones((1, 8), dtype=np.float32)
+    small = ExactSearchCollection(collection, threshold=len(METADATAS))
+    assert small.query(query_embeddings=query, n_results=3)["ids"] == \
+        collection.query(query_embeddings=query, n_results=3)["ids"]
+    assert small._index is not None
+
+    large = ExactSearchCollection(collection, threshold=len(METADATAS) - 1)
+    large.query(query_embeddings=query, n_results=3)
+    assert large._index is None
+
+
+def test_empty_collection_returns_empty_rows():
+    client = chromadb.EphemeralClient()
+    empty = client.create_collection(name=f"exact_{uuid.uuid4().hex}")
+    try:
+        index = ExactIndex.from_collection(empty)
+        result = index.search(np.ones((2, 8), dtype=np.float32), n_results=3)
+        assert result["ids"] == [[], []] and result["distances"] == [[], []]
+        assert ExactSearchCollection(empty, threshold=10).query(
+            query_embeddings=np.ones((1, 8)), n_results=3)["ids"] == [[]]
+    finally:
+        client.delete_collection(name=empty.name)
+
+
+def test_both_paths_embed_query_texts_the_same_way(tmp_path):
+    from local_embeddings import HashingEmbeddingFunction
+
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "saved_policies", embedding_function=HashingEmbeddingFunction(dimension=32))
+    collection.add(ids=["hotel", "meals", "visa"],
+                   documents=["hotel budget per night", "meals per day", "visa fees"])
+    reopened = chromadb.PersistentClient(path=str(tmp_path)).get_collection("saved_policies")
+    exact = ExactSearchCollection(reopened, threshold=10)
+    hnsw = ExactSearchCollection(reopened, threshold=0)
+    texts = ["hotel budget", "visa"]
+    assert exact.query(query_texts=texts, n_results=1)["ids"] == [["hotel"], ["visa"]]
+    assert hnsw.query(query_texts=texts, n_results=1)["ids"] == [["hotel"], ["visa"]]
+    assert exact._index is not None and hnsw._index is None
+
+
+def test_embedding_function_is_used_on_the_hnsw_path(collection):
+    calls = []
+
+    def ones(texts):
+        calls.append(list(texts))
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+    hnsw = ExactSearchCollection(collection, threshold=0, embedding_function=ones)
+    expected = collection.query(query_embeddings=np.ones((1, 8)), n_results=3)["ids"]
+    assert hnsw.query(query_texts="anything", n_results=3)["ids"] == expected
+    assert calls == [["anything"]]
+
+
+def test_cli_queries_go_through_the_wrapper(tmp_path):
+    from cli import open_collection
+
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    client.create_collection("saved_policies")
+    assert isinstance(open_collection(client, "saved_policies", exact=True),
+                      ExactSearchCollection)
+    assert not isinstance(open_collection(client, "saved_policies"), ExactSearchCollection)
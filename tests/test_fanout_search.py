@@ -0,0 +1,77 @@
+"""Global top-k across shards, timeouts, busy shards and labels."""
+
+import threading
+
+import chromadb
+import pytest
+
+from fanout_search import FanOutSearch
+
+
+class SlowCollection:
+    """Blocks in query() until released, counting the calls it received."""
+
+    name = "slow_policies"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def query(self, **kwargs):
+        self.calls += 1
+        self.release.wait(5)
+        return {"ids": [[]], "distances": [[]], "documents": [[]], "metadatas": [[]],
+                "included": kwargs["include"]}
+
+
+class BrokenCollection:
+    name = "broken_policies"
+
+    def query(self, **kwargs):
+        raise RuntimeError("shard is down")
+
+
+@pytest.fixture
+def shards(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    travel = client.create_collection("travel_policies")
+    travel.add(ids=["hotel", "meals"], embeddings=[[1.0, 0.0], [0.6, 0.8]],
+               documents=["hotel", "meals"])
+    hr = client.create_collection("hr_policies")
+    hr.add(ids=["remote", "leave"], embeddings=[[0.9, 0.1], [0.0, 1.0]],
+           documents=["remote", "leave"])
+    return [travel, hr]
+
+
+def test_hits_are_merged_by_distance_with_sources(shards):
+    search = FanOutSearch(shards + [BrokenCollection()])
+    results = search.query(query_embeddings=[[1.0, 0.0]], n_results=3)
+    search.close()
+    assert results["ids"] == [["hotel", "remote", "meals"]]
+    assert results["sources"] == [["travel_policies", "hr_policies", "travel_policies"]]
+    assert results["distances"][0] == sorted(results["distances"][0])
+    assert results["failed"] == ["broken_policies"] and results["timed_out"] == []
+
+
+def test_a_slow_shard_is_skipped_while_its_call_is_running(shards):
+    slow = SlowCollection()
+    search = FanOutSearch(shards + [slow], timeout=0.2)
+    try:
+        first = search.query(query_embeddings=[[1.0, 0.0]], n_results=1)
+        second = search.query(query_embeddings=[[1.0, 0.0]], n_results=1)
+        assert first["timed_out"] == second["timed_out"] == ["slow_policies"]
+        assert second["ids"] == [["hotel"]]
+        # The second query did not start another call on the busy shard
+        assert slow.calls == 1
+        slow.release.set()
+        search._running["slow_policies"].result(timeout=5)
+        assert search.query(query_embeddings=[[1.0, 0.0]], n_results=1)["timed_out"] == []
+        assert slow.calls == 2
+    finally:
+        slow.release.set()
+        search.close()
+
+
+def test_duplicate_labels_are_rejected(shards):
+    with pytest.raises(ValueError):
+        FanOutSearch([shards[0], ("travel_policies", shards[1])])
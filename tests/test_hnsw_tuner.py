@@ -0,0 +1,51 @@
+"""Exact neighbours, trial runs, recommendations and applying settings."""
+
+import chromadb
+import numpy as np
+
+from hnsw_tuner import (PREVIOUS_SUFFIX, apply_settings, current_settings, exact_neighbors,
+                        recommend, tune)
+
+
+def test_exact_neighbors_follow_the_space():
+    vectors = [[1.0, 0.0], [10.0, 1.0], [0.0, 1.0]]
+    queries = [[1.0, 0.0]]
+    assert exact_neighbors(vectors, queries, 1, "l2") == [{0}]
+    # Cosine ignores length; inner product favours the long vector
+    assert exact_neighbors(vectors, queries, 1, "cosine") == [{0}]
+    assert exact_neighbors(vectors, queries, 1, "ip") == [{1}]
+    assert exact_neighbors(vectors, queries, 5, "l2") == [{0, 1, 2}]
+
+
+def test_recommend_prefers_the_fastest_configuration_meeting_the_target():
+    rows = [{"recall@10": 0.99, "p95_ms": 3.0, "build_seconds": 1.0, "name": "slow"},
+            {"recall@10": 0.96, "p95_ms": 1.0, "build_seconds": 1.0, "name": "fast"},
+            {"recall@10": 0.80, "p95_ms": 0.5, "build_seconds": 1.0, "name": "sloppy"}]
+    assert recommend(rows)["name"] == "fast"
+    assert recommend(rows, target_recall=0.999)["name"] == "slow"
+
+
+def test_tune_measures_every_combination():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, 8)).astype(np.float32)
+    rows = tune(vectors, vectors[:5], ["l2"], [100], [10, 50], [16], k=5)
+    assert [(row["space"], row["search_ef"]) for row in rows] == [("l2", 10), ("l2", 50)]
+    assert all(0.0 <= row["recall@5"] <= 1.0 and row["p95_ms"] > 0 for row in rows)
+
+
+def test_apply_settings_modifies_or_rebuilds(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("saved_policies", embedding_function=letter_ef,
+                                          metadata={"owner": "finance"})
+    collection.add(ids=["hotel", "meals"], documents=["hotel budget", "meals per day"])
+    settings = dict(current_settings(collection), search_ef=77)
+    assert apply_settings(client, "saved_policies", settings) == "modified"
+
+    settings = dict(settings, space="cosine")
+    assert apply_settings(client, "saved_policies", settings) == "rebuilt"
+    rebuilt = client.get_collection("saved_policies")
+    assert current_settings(rebuilt)["space"] == "cosine"
+    assert rebuilt.metadata["owner"] == "finance"
+    assert rebuilt.configuration_json["embedding_function"]["name"] == "test_letters"
+    assert rebuilt.query(query_texts=["hotel budget"], n_results=1)["ids"] == [["hotel"]]
+    assert client.get_collection(f"saved_policies{PREVIOUS_SUFFIX}").count() == 2
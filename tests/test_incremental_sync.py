@@ -0,0 +1,57 @@
+"""sync_collection only writes what changed."""
+
+import chromadb
+
+from incremental_sync import CONTENT_HASH_KEY, content_hash, sync_collection
+
+RECORDS = [
+    ("hotel", "Hotel budget is $300 per night.", {"policy_type": "hotels"}),
+    ("meals", "Meals are covered up to $75 per day.", {"policy_type": "meals"}),
+    ("flights", "Economy class for flights under 6 hours.", None),
+]
+
+
+class CountingCollection:
+    """Records the ids of every upsert and delete."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.upserted = []
+        self.deleted = []
+
+    def get(self, **kwargs):
+        return self.collection.get(**kwargs)
+
+    def upsert(self, ids, **kwargs):
+        self.upserted.extend(ids)
+        return self.collection.upsert(ids=ids, **kwargs)
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        return self.collection.delete(ids=ids)
+
+
+def test_content_hash_ignores_its_own_field():
+    assert content_hash("a", {"x": 1}) == content_hash("a", {"x": 1, CONTENT_HASH_KEY: "old"})
+    assert content_hash("a", {"x": 1}) != content_hash("a", {"x": 2})
+    assert content_hash("a") == content_hash("a", {})
+
+
+def test_second_sync_only_touches_changes(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = CountingCollection(client.create_collection("travel_policies",
+                                                             embedding_function=letter_ef))
+    assert sync_collection(collection, RECORDS, page_size=2) == \
+        {"added": 3, "updated": 0, "unchanged": 0, "deleted": 0}
+
+    collection.upserted.clear()
+    changed = [RECORDS[0],
+               ("meals", "Meals are covered up to $90 per day.", {"policy_type": "meals"}),
+               ("visa", "Visa fees are reimbursed.", None)]
+    assert sync_collection(collection, changed, page_size=2) == \
+        {"added": 1, "updated": 1, "unchanged": 1, "deleted": 1}
+    assert sorted(collection.upserted) == ["meals", "visa"]
+    assert collection.deleted == ["flights"]
+
+    stored = collection.get(ids=["meals"], include=["metadatas"])["metadatas"][0]
+    assert stored[CONTENT_HASH_KEY] == content_hash(changed[1][1], changed[1][2])
@@ -0,0 +1,63 @@
+"""Histograms, per-call metrics, exports and the --profile switch."""
+
+import json
+
+import chromadb
+import pytest
+
+from instrumentation import (Histogram, InstrumentedClient, InstrumentedCollection, Metrics,
+                             profile_client)
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = Histogram((1, 2, 5))
+    for value in (0.5, 1.5, 1.5, 4, 10):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(0.99) == float("inf")
+    assert Histogram((1,)).quantile(0.5) == 0.0
+
+
+def test_calls_are_recorded_with_batch_sizes_and_errors(tmp_path, letter_ef):
+    metrics = Metrics()
+    client = InstrumentedClient(chromadb.PersistentClient(path=str(tmp_path)), metrics)
+    collection = client.create_collection("travel_policies", embedding_function=letter_ef)
+    assert isinstance(collection, InstrumentedCollection)
+    collection.add(ids=["hotel", "meals", "visa"], documents=["hotel", "meals", "visa"])
+    collection.query(query_texts=["hotel", "food"], n_results=1)
+    assert collection.count() == 3
+    with pytest.raises(chromadb.errors.InvalidArgumentError):
+        collection.update(ids=["hotel"], embeddings=[[1.0]])
+    # Attributes other than the timed calls are passed through
+    assert collection.name == "travel_policies"
+
+    rows = {row["operation"]: row for row in metrics.snapshot()}
+    assert rows["add"]["calls"] == 1 and rows["add"]["mean_batch_size"] == 3
+    assert rows["query"]["mean_batch_size"] == 2
+    assert rows["count"]["mean_batch_size"] is None
+    assert rows["update"]["errors"] == 1
+    assert all(row["search_seconds"] >= 0 for row in rows.values())
+    assert rows["add"]["memory_bytes"] is None
+
+
+def test_exports_cover_every_operation():
+    metrics = Metrics()
+    metrics.record("travel_policies", "query", 0.003, batch_size=4, embed_seconds=0.001)
+    metrics.record("travel_policies", "query", 0.2, batch_size=1, error=True)
+    exported = json.loads(metrics.to_json())["operations"]
+    assert [(row["calls"], row["errors"]) for row in exported] == [(2, 1)]
+
+    prometheus = metrics.to_prometheus()
+    labels = 'collection="travel_policies",operation="query"'
+    assert f'chromadb_operation_duration_seconds_bucket{{{labels},le="0.005"}} 1' in prometheus
+    assert f'chromadb_operation_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in prometheus
+    assert f"chromadb_operation_errors_total{{{labels}}} 1" in prometheus
+    assert "travel_policies.query" in metrics.report()
+    metrics.reset()
+    assert metrics.snapshot() == []
+
+
+def test_profile_client_only_wraps_with_the_flag(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    assert profile_client(client, argv=["step3_crud_operations.py"]) is client
@@ -0,0 +1,91 @@
+"""Collection checks: counts, dimensions, hashes, manifests and the self-query sample."""
+
+import chromadb
+
+from incremental_sync import CONTENT_HASH_KEY
+from integrity import (HashManifest, check_client, check_collection, expected_dimension,
+                       format_report)
+
+
+class PagedCollection:
+    """Just enough of a collection to feed check_collection() made-up records."""
+
+    name = "made_up"
+
+    def __init__(self, embeddings):
+        self.ids = [f"doc-{i}" for i in range(len(embeddings))]
+        self.embeddings = embeddings
+        self.queried = []
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, include, limit, offset, where=None, where_document=None):
+        ids = self.ids[offset:offset + limit]
+        return {"ids": ids, "documents": [None] * len(ids), "metadatas": [None] * len(ids),
+                "embeddings": self.embeddings[offset:offset + limit]}
+
+    def query(self, query_embeddings, n_results, include):
+        # Every sampled record finds itself
+        hits = [[self.ids[self.embeddings.index(list(e))]] for e in query_embeddings]
+        self.queried.extend(hit[0] for hit in hits)
+        return {"ids": hits, "distances": [[0.0]] * len(hits)}
+
+
+def make_client(path, letter_ef):
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.create_collection("saved_policies", embedding_function=letter_ef)
+    collection.add(ids=["hotel", "meals", "visa"],
+                   documents=["hotel budget", "meals per day", "visa fees"],
+                   metadatas=[{"policy_type": "hotels"}, None, None])
+    return client
+
+
+def test_healthy_collection_passes_and_manifest_round_trips(tmp_path, letter_ef):
+    client = make_client(tmp_path / "db", letter_ef)
+    manifest = str(tmp_path / "manifest.sqlite3")
+    assert check_client(client, write_manifest_path=manifest)["ok"]
+    report = check_client(client, manifest_path=manifest)
+    assert report["ok"] and report["records"] == 3
+    entry = report["collections"][0]
+    assert (entry["dimension"], entry["dimension_source"]) == (26, "collection")
+    assert entry["self_query_checked"] == 3
+    assert "✓ saved_policies: 3/3 records, 26d" in format_report(report)
+
+    collection = client.get_collection("saved_policies")
+    collection.update(ids=["meals"], documents=["meals per night"])
+    collection.update(ids=["hotel"], metadatas=[{CONTENT_HASH_KEY: "stale"}])
+    entry = check_collection(collection, manifest=HashManifest(manifest))
+    # update() merges metadata, and the hash ignores its own field, so only meals changed
+    assert (entry["manifest_mismatches"], entry["stored_hash_mismatches"]) == (1, 1)
+    assert not entry["ok"]
+
+
+def test_dimension_comes_from_the_collection_not_the_first_record(tmp_path, letter_ef):
+    client = make_client(tmp_path / "db", letter_ef)
+    collection = client.get_collection("saved_policies")
+    assert expected_dimension(collection) == (26, "collection")
+    entry = check_collection(collection, dimension=32)
+    assert entry["wrong_dimension"] == 3 and not entry["ok"]
+
+    # Without a recorded dimension, the first record is the reference
+    made_up = PagedCollection([[1.0, 0.0], [0.0, 1.0, 0.0], [0.5, 0.5]])
+    entry = check_collection(made_up, page_size=2)
+    assert (entry["dimension"], entry["dimension_source"]) == (2, "first_record")
+    assert entry["wrong_dimension"] == 1
+
+
+def test_reservoir_only_counts_valid_records():
+    # 200 invalid records, then two valid ones competing for a single sample slot
+    made_up = PagedCollection([[float("nan"), 0.0]] * 200 + [[1.0, 0.0], [0.0, 1.0]])
+    for seed in range(40):
+        assert check_collection(made_up, sample=1, seed=seed)["non_finite"] == 200
+    # Each valid record should win about half the time, not 1 in 202
+    assert set(made_up.queried) == {"doc-200", "doc-201"}
+
+
+def test_empty_collection_checks_without_embedding(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    client.create_collection("empty_policies")
+    entry = check_client(client)["collections"][0]
+    assert entry["ok"] and entry["dimension"] is None and entry["streamed"] == 0
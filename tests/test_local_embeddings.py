@@ -0,0 +1,42 @@
+"""HashingEmbeddingFunction: deterministic, batched, and stored with the collection."""
+
+import chromadb
+import numpy as np
+
+from local_embeddings import HashingEmbeddingFunction
+
+TEXTS = ["Hotel budget is $300 per night.", "Meals up to $75 per day.", "", "hotel budget"]
+
+
+def test_vectors_are_deterministic_and_normalized():
+    first = HashingEmbeddingFunction(dimension=64).embed_matrix(TEXTS)
+    second = HashingEmbeddingFunction(dimension=64).embed_matrix(TEXTS)
+    np.testing.assert_array_equal(first, second)
+    assert first.shape == (4, 64) and first.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(first[[0, 1, 3]], axis=1), 1.0, rtol=1e-5)
+    assert not first[2].any()
+    # Shared words make texts closer
+    assert first[0] @ first[3] > first[1] @ first[3]
+
+
+def test_batches_and_threads_do_not_change_the_result():
+    texts = [f"policy {i} about hotels and meals" for i in range(50)]
+    reference = HashingEmbeddingFunction(batch_size=1000, workers=1).embed_matrix(texts)
+    threaded = HashingEmbeddingFunction(batch_size=7, workers=4).embed_matrix(texts)
+    np.testing.assert_allclose(threaded, reference, rtol=1e-6)
+    assert HashingEmbeddingFunction().embed_matrix([]).shape == (0, 384)
+
+
+def test_reopened_collection_uses_the_same_settings(tmp_path):
+    local_ef = HashingEmbeddingFunction(dimension=32, seed=7)
+    rebuilt = HashingEmbeddingFunction.build_from_config(local_ef.get_config())
+    np.testing.assert_array_equal(rebuilt.embed_matrix(TEXTS), local_ef.embed_matrix(TEXTS))
+
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "local_policies", embedding_function=local_ef)
+    collection.add(ids=["hotel", "meals"], documents=TEXTS[:2])
+    reopened = chromadb.PersistentClient(path=str(tmp_path)).get_collection("local_policies")
+    stored = reopened.configuration["embedding_function"]
+    assert stored.get_config() == {"dimension": 32, "hash_features": local_ef.hash_features,
+                                   "seed": 7}
+    assert reopened.query(query_texts=["hotel budget"], n_results=1)["ids"] == [["hotel"]]
@@ -0,0 +1,70 @@
+"""Migration keeps the index settings, stores the new model, and never drops records."""
+
+import chromadb
+import pytest
+from chromadb.api.types import EmbeddingFunction
+
+from local_embeddings import HashingEmbeddingFunction
+from migrate_embeddings import PREVIOUS_SUFFIX, load_checkpoint, migrate_collection
+
+
+class UnstoredEmbeddingFunction(EmbeddingFunction):
+    """No get_config(), so ChromaDB records it as a legacy function."""
+
+    def __init__(self):
+        self.local_ef = HashingEmbeddingFunction(dimension=32)
+
+    def __call__(self, input):
+        return self.local_ef(input)
+
+
+def make_source(path, letter_ef):
+    client = chromadb.PersistentClient(path=str(path))
+    source = client.create_collection("travel_policies", embedding_function=letter_ef,
+                                      configuration={"hnsw": {"space": "cosine"}},
+                                      metadata={"owner": "finance"})
+    source.add(ids=["hotel", "meals", "visa"],
+               documents=["Hotel budget is $300 per night.", "Meals up to $75 per day.",
+                          "Visa fees are reimbursed."],
+               metadatas=[{"policy_type": "hotels"}, {"policy_type": "meals"}, None])
+    return client
+
+
+def test_swapped_collection_reopens_with_the_new_model(tmp_path, letter_ef):
+    client = make_source(tmp_path / "db", letter_ef)
+    checkpoint = str(tmp_path / "migration.json")
+    stats = migrate_collection(client, "travel_policies", HashingEmbeddingFunction(dimension=32),
+                               checkpoint_path=checkpoint, page_size=2, progress=None)
+    assert (stats["migrated"], stats["skipped"], stats["swapped"]) == (3, 0, True)
+    assert load_checkpoint(checkpoint) is None
+
+    reopened = chromadb.PersistentClient(path=str(tmp_path / "db"))
+    migrated = reopened.get_collection("travel_policies")
+    assert migrated.metadata == {"owner": "finance"}
+    assert migrated.configuration_json["hnsw"]["space"] == "cosine"
+    assert migrated.configuration_json["embedding_function"]["name"] == "local_hashing"
+    assert migrated.query(query_texts=["hotel budget"], n_results=1)["ids"] == [["hotel"]]
+    assert reopened.get_collection(f"travel_policies{PREVIOUS_SUFFIX}").count() == 3
+
+
+def test_records_without_documents_block_the_swap(tmp_path, letter_ef):
+    client = make_source(tmp_path / "db", letter_ef)
+    client.get_collection("travel_policies").add(ids=["vector-only"],
+                                                 embeddings=[[0.1] * 26])
+    stats = migrate_collection(client, "travel_policies", HashingEmbeddingFunction(dimension=32),
+                               checkpoint_path=str(tmp_path / "migration.json"), progress=None)
+    assert (stats["migrated"], stats["skipped"], stats["swapped"]) == (3, 1, False)
+    assert "1 records have no document" in stats["swap_blocked"]
+    assert client.get_collection("travel_policies").count() == 4
+
+
+def test_swap_to_an_unstored_embedding_function_is_refused(tmp_path, letter_ef):
+    client = make_source(tmp_path / "db", letter_ef)
+    unstored = UnstoredEmbeddingFunction()
+    with pytest.raises(ValueError):
+        migrate_collection(client, "travel_policies", unstored,
+                           checkpoint_path=str(tmp_path / "migration.json"), progress=None)
+    stats = migrate_collection(client, "travel_policies", unstored, swap=False,
+                               checkpoint_path=str(tmp_path / "migration.json"), progress=None)
+    assert stats["migrated"] == 3 and not stats["swapped"]
+    assert client.get_collection("travel_policies_migrating").count() == 3
@@ -0,0 +1,79 @@
+"""Memory-mapped .npy and multi-batch Arrow imports."""
+
+import json
+
+import chromadb
+import numpy as np
+import pytest
+
+from precomputed_import import (ChunkedMatrix, count_manifest, import_embeddings,
+                                iter_manifest, open_embeddings)
+
+
+def write_manifest(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"vec-{i}", "document": f"policy {i}",
+                                "metadata": {"row": i}}) + "\n")
+    return str(path)
+
+
+def write_arrow(path, matrix, rows_per_batch):
+    import pyarrow as pa
+    dimension = matrix.shape[1]
+    vector_type = pa.list_(pa.float32(), dimension)
+    schema = pa.schema([("embedding", vector_type)])
+    with pa.ipc.new_file(str(path), schema) as writer:
+        for start in range(0, len(matrix), rows_per_batch):
+            block = matrix[start:start + rows_per_batch]
+            column = pa.FixedSizeListArray.from_arrays(pa.array(block.ravel()), dimension)
+            writer.write_batch(pa.record_batch([column], schema=schema))
+    return str(path)
+
+
+@pytest.fixture
+def matrix():
+    return np.random.default_rng(0).random((23, 4), dtype=np.float32)
+
+
+def test_chunked_matrix_slices():
+    chunks = [np.arange(12, dtype=np.float32).reshape(3, 4),
+              np.arange(12, 20, dtype=np.float32).reshape(2, 4)]
+    whole = np.concatenate(chunks)
+    chunked = ChunkedMatrix(chunks)
+    assert chunked.shape == (5, 4) and len(chunked) == 5
+    for start, stop in ((0, 2), (1, 5), (3, 5), (2, 4), (4, 9)):
+        np.testing.assert_array_equal(chunked[start:stop], whole[start:stop])
+    # Inside one chunk the slice is a view, not a copy
+    assert np.shares_memory(chunked[0:2], chunks[0])
+    with pytest.raises(TypeError):
+        chunked[::2]
+
+
+def test_multi_batch_arrow_file_is_read_without_copies(tmp_path, matrix):
+    pytest.importorskip("pyarrow")
+    opened = open_embeddings(write_arrow(tmp_path / "vectors.arrow", matrix, rows_per_batch=10))
+    assert isinstance(opened, ChunkedMatrix) and opened.shape == matrix.shape
+    np.testing.assert_array_equal(opened[0:len(matrix)], matrix)
+
+
+def test_import_pairs_rows_with_manifest_lines(tmp_path, matrix):
+    np.save(tmp_path / "vectors.npy", matrix)
+    manifest = write_manifest(tmp_path / "manifest.jsonl", len(matrix))
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).create_collection("imported")
+    stats = import_embeddings(collection, open_embeddings(str(tmp_path / "vectors.npy")),
+                              iter_manifest(manifest), batch_size=5, progress=None,
+                              manifest_count=count_manifest(manifest))
+    assert stats["vectors"] == 23 and collection.count() == 23
+    stored = collection.get(ids=["vec-17"], include=["embeddings", "metadatas"])
+    np.testing.assert_allclose(stored["embeddings"][0], matrix[17])
+    assert stored["metadatas"] == [{"row": 17}]
+
+
+def test_length_mismatch_is_rejected_before_writing(tmp_path, matrix):
+    manifest = write_manifest(tmp_path / "manifest.jsonl", len(matrix) - 1)
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).create_collection("imported")
+    with pytest.raises(ValueError):
+        import_embeddings(collection, matrix, iter_manifest(manifest), progress=None,
+                          manifest_count=count_manifest(manifest))
+    assert collection.count() == 0
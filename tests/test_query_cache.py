@@ -0,0 +1,85 @@
+"""QueryCache expiry and eviction, CachedCollection hits and invalidation."""
+
+import chromadb
+import pytest
+
+from query_cache import CachedCollection, QueryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def collection(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("travel_policies", embedding_function=letter_ef)
+    collection.add(ids=["hotel", "meals"],
+                   documents=["Hotel budget is $300 per night.", "Meals up to $75 per day."])
+    return collection
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.queries = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def query(self, **kwargs):
+        self.queries += 1
+        return self.collection.query(**kwargs)
+
+
+def test_entries_expire_and_are_evicted():
+    clock = Clock()
+    cache = QueryCache(max_entries=2, ttl_seconds=10, clock=clock)
+    for key in ("a", "b"):
+        cache.put("c", key, key.upper(), cache.generation("c"))
+    assert cache.get("c", "a") == "A"
+    cache.put("c", "x", "X", cache.generation("c"))  # evicts "b", the least recently used
+    assert cache.get("c", "b") is None
+    clock.now = 11
+    assert cache.get("c", "a") is None
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = QueryCache()
+    generation = cache.generation("c")
+    cache.invalidate("c")
+    cache.put("c", "a", "stale", generation)
+    assert cache.get("c", "a") is None
+
+
+def test_repeated_queries_are_answered_from_the_cache(collection):
+    counting = CountingCollection(collection)
+    cached = CachedCollection(counting)
+    first = cached.query(query_texts=["hotel budget"], n_results=1)
+    second = cached.query(query_texts=["hotel budget"], n_results=1)
+    assert first == second and counting.queries == 1
+
+    # Only the text that missed is searched
+    both = cached.query(query_texts=["hotel budget", "meal allowance"], n_results=1)
+    assert counting.queries == 2
+    assert both["ids"] == [["hotel"], ["meals"]]
+
+
+def test_writes_through_the_wrapper_invalidate(collection):
+    counting = CountingCollection(collection)
+    cached = CachedCollection(counting)
+    cached.query(query_texts=["hotel budget"], n_results=1, include=["documents"])
+    cached.upsert(ids=["hotel"], documents=["Hotel budget is $250 per night."])
+    result = cached.query(query_texts=["hotel budget"], n_results=1, include=["documents"])
+    assert counting.queries == 2
+    assert result["documents"] == [["Hotel budget is $250 per night."]]
+
+
+def test_results_are_copies(collection):
+    cached = CachedCollection(collection)
+    cached.query(query_texts=["hotel budget"], n_results=1)["ids"][0].append("edited")
+    assert cached.query(query_texts=["hotel budget"], n_results=1)["ids"] == [["hotel"]]
@@ -0,0 +1,59 @@
+"""QueryService batching, error fan-out and shutdown."""
+
+import asyncio
+
+import chromadb
+import pytest
+
+from query_service import QueryService
+
+
+@pytest.fixture
+def client(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("service_policies", embedding_function=letter_ef)
+    collection.add(ids=["hotel", "meals", "flights"],
+                   documents=["Hotel budget per night", "Meal allowance per day",
+                              "Economy flights only"])
+    return client
+
+
+def test_concurrent_queries_share_batches(client, letter_ef):
+    async def run():
+        service = QueryService(client, max_wait_ms=20, embedding_function=letter_ef)
+        texts = ["hotel budget", "meal allowance", "economy flights"] * 10
+        results = await asyncio.gather(*[
+            service.query("service_policies", text, n_results=1) for text in texts])
+        service.close()
+        return texts, results, service.metrics()
+
+    texts, results, metrics = asyncio.run(run())
+    expected = {"hotel budget": "hotel", "meal allowance": "meals", "economy flights": "flights"}
+    assert [result["ids"] for result in results] == [[expected[text]] for text in texts]
+    assert metrics["requests"] == 30 and metrics["batches"] < 30
+
+
+def test_a_failed_batch_fails_its_callers(client, letter_ef):
+    async def run():
+        service = QueryService(client, embedding_function=letter_ef)
+        try:
+            return await service.query("no_such_collection", "hotel")
+        finally:
+            service.close()
+
+    with pytest.raises(chromadb.errors.NotFoundError):
+        asyncio.run(run())
+
+
+def test_close_fails_waiting_queries_and_later_calls(client, letter_ef):
+    async def run():
+        service = QueryService(client, max_wait_ms=10_000, embedding_function=letter_ef)
+        waiting = asyncio.ensure_future(service.query("service_policies", "hotel"))
+        await asyncio.sleep(0)  # let it join a batch
+        service.close()
+        with pytest.raises(RuntimeError):
+            await waiting
+        with pytest.raises(RuntimeError):
+            await service.query("service_policies", "hotel")
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
@@ -0,0 +1,50 @@
+"""Reducers, int8 quantization and the recall report."""
+
+import numpy as np
+
+from reduced_embeddings import (Int8Quantizer, PCAReducer, ReducedEmbeddingFunction,
+                                TruncationReducer, evaluate)
+
+
+def sample(rows=300, dimension=32):
+    return np.random.default_rng(0).standard_normal((rows, dimension)).astype(np.float32)
+
+
+def test_truncation_keeps_leading_values_and_renormalizes():
+    reduced = TruncationReducer(2).transform([[3.0, 4.0, 12.0]])
+    np.testing.assert_allclose(reduced, [[0.6, 0.8]], rtol=1e-6)
+
+
+def test_pca_round_trips_through_a_file(tmp_path):
+    vectors = sample()
+    reducer = PCAReducer(8).fit(vectors)
+    reducer.save(tmp_path / "pca.npz")
+    loaded = PCAReducer.load(tmp_path / "pca.npz")
+    np.testing.assert_allclose(loaded.transform(vectors), reducer.transform(vectors), rtol=1e-5)
+    assert loaded.transform(vectors).shape == (300, 8)
+
+
+def test_int8_round_trip_error_is_within_half_a_step():
+    vectors = sample()
+    quantizer = Int8Quantizer().fit(vectors)
+    codes = quantizer.quantize(vectors)
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(quantizer.round_trip(vectors) - vectors) <= quantizer.scale / 2 + 1e-6)
+
+
+def test_reduced_embedding_function_wraps_another():
+    reduced_ef = ReducedEmbeddingFunction(lambda texts: sample(len(texts)), TruncationReducer(4))
+    vectors = reduced_ef(["a", "b"])
+    assert len(vectors) == 2 and len(vectors[0]) == 4
+
+
+def test_report_separates_stored_and_int8_sizes():
+    vectors = sample()
+    rows = evaluate(vectors, vectors[:10], {
+        "truncate 16d": (TruncationReducer(16), None),
+        "truncate 16d int8": (TruncationReducer(16), Int8Quantizer()),
+    }, k=5)
+    assert [row["bytes_per_vector"] for row in rows] == [128, 64, 64]
+    assert [row["int8_bytes_per_vector"] for row in rows] == [None, None, 16]
+    assert rows[0]["recall@5"] == 1.0
+    assert all(0.0 <= row["recall@5"] <= 1.0 for row in rows)
@@ -0,0 +1,81 @@
+"""SemanticQueryCache reuse, scoping and bounds, and its use in CachedCollection."""
+
+import chromadb
+import numpy as np
+import pytest
+
+from query_cache import CachedCollection
+from semantic_cache import SemanticQueryCache
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_close_queries_reuse_results_within_their_scope():
+    semantic = SemanticQueryCache(threshold=0.9, max_entries=4)
+    semantic.store("c", "scope", [unit(1, 0, 0)], [{"ids": ["hotel"]}], semantic.generation("c"))
+
+    assert semantic.lookup("c", "scope", [unit(1, 0.1, 0)]) == [{"ids": ["hotel"]}]
+    assert semantic.lookup("c", "scope", [unit(0, 1, 0)]) == [None]
+    assert semantic.lookup("c", "other scope", [unit(1, 0, 0)]) == [None]
+    assert semantic.lookup("other", "scope", [unit(1, 0, 0)]) == [None]
+
+
+def test_stored_and_returned_values_are_copies():
+    semantic = SemanticQueryCache(threshold=0.9)
+    value = {"ids": ["hotel"]}
+    semantic.store("c", "scope", [unit(1, 0)], [value], semantic.generation("c"))
+    value["ids"].append("edited")
+    semantic.lookup("c", "scope", [unit(1, 0)])[0]["ids"].append("edited")
+    assert semantic.lookup("c", "scope", [unit(1, 0)]) == [{"ids": ["hotel"]}]
+
+
+def test_scopes_are_bounded_by_entries():
+    semantic = SemanticQueryCache(threshold=0.9, max_entries=4)
+    for i in range(30):
+        semantic.store("c", f"where {i}", [unit(1, i)], [i], semantic.generation("c"))
+    assert semantic.stats()["entries"] == 4
+    assert semantic.stats()["scopes"] == 4
+
+
+def test_invalidation_drops_entries_and_late_stores():
+    semantic = SemanticQueryCache(threshold=0.9)
+    generation = semantic.generation("c")
+    semantic.store("c", "scope", [unit(1, 0)], ["old"], generation)
+    semantic.invalidate("c")
+    semantic.store("c", "scope", [unit(1, 0)], ["stale"], generation)
+    assert semantic.lookup("c", "scope", [unit(1, 0)]) == [None]
+
+
+@pytest.fixture
+def collection(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("travel_policies", embedding_function=letter_ef)
+    collection.add(ids=["hotel", "meals"],
+                   documents=["Hotel budget is $300 per night.", "Meals up to $75 per day."])
+    return collection
+
+
+def test_paraphrase_is_answered_without_searching(collection):
+    semantic = SemanticQueryCache(threshold=0.95)
+    cached = CachedCollection(collection, semantic_cache=semantic)
+    first = cached.query(query_texts=["hotel budget per night"], n_results=1)
+    # Same letters in another order: identical embedding, different text
+    second = cached.query(query_texts=["night budget per hotel"], n_results=1)
+    assert second["ids"] == first["ids"] == [["hotel"]]
+    assert semantic.stats()["hits"] == 1
+
+
+def test_embedding_function_is_required_up_front(collection):
+    class LegacyCollection:
+        """A collection whose embedding function is not stored in its configuration."""
+        name = "legacy"
+        configuration = {"embedding_function": None}
+
+    with pytest.raises(ValueError):
+        CachedCollection(LegacyCollection(), semantic_cache=SemanticQueryCache())
+    # The one stored in the collection's configuration is used by default
+    assert CachedCollection(collection, semantic_cache=SemanticQueryCache()).embedding_function \
+        is not None
@@ -0,0 +1,57 @@
+"""Snapshot export and restore, and cleanup when the writer fails."""
+
+import zipfile
+
+import chromadb
+import numpy as np
+import pytest
+
+from snapshot import export_snapshot, read_manifest, restore_snapshot
+
+
+def make_client(path, letter_ef):
+    client = chromadb.PersistentClient(path=str(path))
+    policies = client.create_collection("travel_policies", embedding_function=letter_ef,
+                                        configuration={"hnsw": {"space": "cosine"}},
+                                        metadata={"owner": "finance"})
+    policies.add(ids=[f"policy-{i}" for i in range(25)],
+                 documents=[f"hotel policy number {i}" for i in range(25)],
+                 metadatas=[{"row": i} for i in range(25)])
+    vectors = client.create_collection("raw_vectors")
+    vectors.add(ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 1.0]])
+    return client
+
+
+def test_restore_reproduces_records_and_settings(tmp_path, letter_ef):
+    source = make_client(tmp_path / "source", letter_ef)
+    stats = export_snapshot(source, str(tmp_path / "backup.chromasnap"), page_size=10)
+    assert stats == {"collections": 2, "records": 27, "seconds": stats["seconds"]}
+    entries = {entry["name"]: entry for entry in
+               read_manifest(str(tmp_path / "backup.chromasnap"))["collections"]}
+    assert entries["travel_policies"]["pages"] == 3
+
+    restored = chromadb.PersistentClient(path=str(tmp_path / "restored"))
+    assert restore_snapshot(restored, str(tmp_path / "backup.chromasnap"))["records"] == 27
+    policies = restored.get_collection("travel_policies")
+    assert policies.metadata == {"owner": "finance"}
+    assert policies.configuration_json["hnsw"]["space"] == "cosine"
+    assert policies.configuration_json["embedding_function"]["name"] == "test_letters"
+    original = source.get_collection("travel_policies").get(ids=["policy-7"],
+                                                            include=["embeddings"])
+    copied = policies.get(ids=["policy-7"], include=["embeddings", "documents", "metadatas"])
+    np.testing.assert_allclose(copied["embeddings"][0], original["embeddings"][0])
+    assert copied["documents"] == ["hotel policy number 7"]
+    assert copied["metadatas"] == [{"row": 7}]
+    assert restored.get_collection("raw_vectors").count() == 2
+
+
+def test_writer_failure_does_not_leave_readers_blocked(tmp_path, letter_ef, monkeypatch):
+    client = make_client(tmp_path / "source", letter_ef)
+
+    def broken_writestr(self, name, data, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(zipfile.ZipFile, "writestr", broken_writestr)
+    # One-record pages and workers=1 fill the 4-slot queue while the writer fails
+    with pytest.raises(OSError):
+        export_snapshot(client, str(tmp_path / "backup.chromasnap"), page_size=1, workers=1)
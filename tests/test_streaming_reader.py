@@ -0,0 +1,56 @@
+"""CollectionReader paging, projection and resumable cursors."""
+
+import chromadb
+import pytest
+
+from streaming_reader import CollectionReader, ReadCursor, iter_ids
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    def get(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.collection.get(**kwargs)
+
+
+@pytest.fixture
+def collection(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("stream_policies")
+    collection.add(ids=[f"doc-{i:02d}" for i in range(25)],
+                   embeddings=[[float(i), 1.0] for i in range(25)],
+                   documents=[f"policy {i}" for i in range(25)],
+                   metadatas=[{"even": i % 2 == 0} for i in range(25)])
+    return collection
+
+
+def test_pages_and_projection(collection):
+    counting = CountingCollection(collection)
+    records = list(CollectionReader(counting, include=["documents"], page_size=10))
+    assert [record["id"] for record in records] == [f"doc-{i:02d}" for i in range(25)]
+    assert set(records[0]) == {"id", "document"}
+    # Three pages; the short last page ends the scan without an extra empty get()
+    assert [call["offset"] for call in counting.calls] == [0, 10, 20]
+    assert all(call["include"] == ["documents"] for call in counting.calls)
+
+
+def test_cursor_resumes_after_the_last_yielded_record(collection):
+    reader = CollectionReader(collection, page_size=4)
+    iterator = iter(reader)
+    for _ in range(6):
+        next(iterator)
+    saved = reader.cursor.to_json()
+
+    resumed = CollectionReader(collection, page_size=4, cursor=ReadCursor.from_json(saved))
+    assert next(iter(resumed))["id"] == "doc-06"
+
+
+def test_filters_and_ids(collection):
+    reader = CollectionReader(collection, include=["metadatas"], where={"even": True})
+    assert len(list(reader)) == 13
+    assert len(list(iter_ids(collection, page_size=7))) == 25
+    with pytest.raises(ValueError):
+        CollectionReader(collection, include=["distances"])
@@ -0,0 +1,86 @@
+"""Batched writes, field-merging coalescing and isolating a bad write."""
+
+import chromadb
+import pytest
+
+from write_queue import WriteQueue
+
+
+class RecordingCollection:
+    """Records upsert/delete calls; any call containing "bad" raises."""
+
+    def __init__(self):
+        self.calls = []
+
+    def upsert(self, ids, **fields):
+        self.calls.append(("upsert", list(ids), fields))
+        if "bad" in ids:
+            raise ValueError("rejected")
+
+    def delete(self, ids):
+        self.calls.append(("delete", list(ids), {}))
+
+
+class RecordingClient:
+    def __init__(self):
+        self.collection = RecordingCollection()
+
+    def get_max_batch_size(self):
+        return 1000
+
+    def get_or_create_collection(self, name, **kwargs):
+        return self.collection
+
+
+def test_one_bad_write_is_isolated_by_splitting_the_batch():
+    client = RecordingClient()
+    # A long flush interval puts all 64 calls in one batch
+    writer = WriteQueue(client, flush_interval=1.0)
+    acks = [writer.upsert("saved_policies", ids=[f"doc-{i}"], embeddings=[[float(i)]])
+            for i in range(63)]
+    bad = writer.upsert("saved_policies", ids=["bad"], embeddings=[[0.0]])
+    writer.flush()
+    writer.close()
+    assert all(ack.result() == 1 for ack in acks)
+    with pytest.raises(ValueError):
+        bad.result()
+    # The batch plus two halves per level down to the bad call, not 64 single calls
+    assert len(client.collection.calls) <= 1 + 2 * 7
+    written = {doc_id for _, ids, _ in client.collection.calls for doc_id in ids}
+    assert len(written) == 64
+
+
+def test_coalescing_merges_fields():
+    client = RecordingClient()
+    writer = WriteQueue(client, flush_interval=1.0)
+    writer.upsert("saved_policies", ids=["hotel"], documents=["old"], embeddings=[[1.0]])
+    writer.upsert("saved_policies", ids=["hotel"], metadatas=[{"v": 2}])
+    writer.upsert("saved_policies", ids=["meals"], documents=["meals"], embeddings=[[2.0]])
+    writer.upsert("saved_policies", ids=["meals"], documents=["meals v2"])
+    writer.delete("saved_policies", ids=["visa"])
+    writer.upsert("saved_policies", ids=["visa"], metadatas=[{"v": 3}], embeddings=[[3.0]])
+    writer.flush()
+    writer.close()
+    calls = client.collection.calls
+    assert calls[0] == ("delete", ["visa"], {})
+    upserts = {doc_id: {field: values[ids.index(doc_id)] for field, values in fields.items()}
+               for kind, ids, fields in calls if kind == "upsert" for doc_id in ids}
+    assert upserts["hotel"] == {"documents": "old", "embeddings": [1.0], "metadatas": {"v": 2}}
+    # A new document drops the pending embedding so it is embedded again
+    assert upserts["meals"] == {"documents": "meals v2"}
+    assert upserts["visa"] == {"metadatas": {"v": 3}, "embeddings": [3.0]}
+    assert writer.metrics()["coalesced"] == 3
+
+
+def test_writes_reach_a_real_collection(tmp_path, letter_ef):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    writer = WriteQueue(client, embedding_functions={"saved_policies": letter_ef})
+    writer.upsert("saved_policies", ids=["hotel", "meals"], documents=["hotel", "meals"])
+    writer.upsert("saved_policies", ids=["hotel"], metadatas=[{"policy_type": "hotels"}])
+    writer.delete("saved_policies", ids=["meals"])
+    writer.close()
+    stored = client.get_collection("saved_policies").get(include=["documents", "metadatas"])
+    assert stored["ids"] == ["hotel"]
+    assert stored["documents"] == ["hotel"] and stored["metadatas"] == [{"policy_type": "hotels"}]
+    with pytest.raises(RuntimeError):
+        writer.upsert("saved_policies", ids=["late"], documents=["late"])
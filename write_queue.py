@@ -0,0 +1,375 @@
+"""
+Write Queue: Many Producers, One Batched Writer
+
+Steps 3 and 4 write with small add()/upsert() calls. When several workers
+do that against the same ./chroma_db, they contend on the SQLite-backed
+store. This module provides:
+- WriteQueue: producers (threads) enqueue upserts and deletes, and a
+  single writer thread turns them into large batched upsert()/delete()
+  calls per collection
+- Coalescing: several writes to the same id in a batch become one. Fields
+  merge, later values winning, so a metadata-only upsert keeps a pending
+  document; a new document without an embedding drops the pending
+  embedding so it is embedded again, and a delete followed by an upsert
+  still deletes first
+- Acknowledgements: every call returns a Future that resolves once its
+  batch is committed; if a batched call fails, the batch is split in half
+  (and again) until only the failing calls are left, so they alone get
+  the exception and the rest is still written in a few large calls
+- Backpressure: producers block once max_pending calls are queued
+- A flush interval: the writer waits at most this long to fill a batch
+- Metrics: batch sizes, records written per second, coalesced writes
+- ProcessWriter, for producers in other processes, connected through
+  multiprocessing queues
+
+Records without embeddings are embedded by the writer with the
+collection's embedding function (pass embedding_functions= to choose it).
+
+Usage:
+    writer = WriteQueue(client, flush_interval=0.05)
+    ack = writer.upsert("saved_policies", ids=["hotel_policy_01"], documents=["..."])
+    ack.result()            # wait until written
+    writer.delete("saved_policies", ids=["old_policy"])
+    writer.flush()
+    print(writer.metrics())
+    writer.close()
+
+From another process:
+    requests, replies = multiprocessing.Queue(), multiprocessing.Queue()
+    writer.serve_process_queue(requests, {"worker-1": replies})
+    # in the worker process:
+    producer = ProcessWriter(requests, replies, "worker-1")
+    producer.upsert("saved_policies", ids=[...], documents=[...])
+    producer.flush()
+"""
+
+import concurrent.futures
+import itertools
+import queue
+import threading
+import time
+
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_MAX_PENDING = 10_000
+
+_FIELDS = ("documents", "metadatas", "embeddings")
+
+
+class _Operation:
+    def __init__(self, kind, collection, ids, fields=None):
+        self.kind = kind
+        self.collection = collection
+        self.ids = ids
+        self.fields = fields or {}
+        self.future = concurrent.futures.Future()
+
+
+class WriteQueue:
+    """Coalesces queued writes into batched calls from a single thread."""
+
+    def __init__(self, client, flush_interval=DEFAULT_FLUSH_INTERVAL, max_batch_size=None,
+                 max_pending=DEFAULT_MAX_PENDING, embedding_functions=None):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size or client.get_max_batch_size()
+        self.embedding_functions = embedding_functions or {}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._collections = {}
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._bridges = []
+        self.reset_metrics()
+        self._writer = threading.Thread(target=self._run, name="chroma-writer", daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------
+    # Producer API
+    # ------------------------------------------------------------
+
+    def _submit(self, operation, timeout=None):
+        # The lock keeps close() from queueing its stop marker between the
+        # check and the put, which would strand this operation
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("WriteQueue is closed")
+            # Blocks when the queue is full: this is the backpressure
+            self._queue.put(operation, timeout=timeout)
+        with self._metrics_lock:
+            self._calls += 1
+        return operation.future
+
+    def upsert(self, collection, ids, documents=None, metadatas=None, embeddings=None,
+               timeout=None):
+        """Queue an upsert; returns a Future that resolves once it is written."""
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        fields = {}
+        for name, values in zip(_FIELDS, (documents, metadatas, embeddings)):
+            if values is not None:
+                values = list(values)
+                if len(values) != len(ids):
+                    raise ValueError(f"{len(ids)} ids but {len(values)} {name}")
+                fields[name] = values
+        return self._submit(_Operation("upsert", collection, ids, fields), timeout)
+
+    def delete(self, collection, ids, timeout=None):
+        """Queue a delete by id; returns a Future that resolves once it is written."""
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        return self._submit(_Operation("delete", collection, ids), timeout)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written."""
+        self._submit(_Operation("flush", None, [])).result(timeout)
+
+    def close(self, timeout=None):
+        """Write what is queued, then stop the writer."""
+        if self._closed:
+            return
+        for stop in self._bridges:
+            stop.set()
+        self.flush(timeout)
+        with self._close_lock:
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join(timeout)
+
+    # ------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------
+
+    def _next_batch(self):
+        """Collect operations until the batch is full or the flush interval passes."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        records = len(first.ids)
+        deadline = time.monotonic() + self.flush_interval
+        while records < self.max_batch_size and first.kind != "flush":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                operation = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if operation is None:
+                self._queue.put(None)
+                break
+            batch.append(operation)
+            records += len(operation.ids)
+            if operation.kind == "flush":
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._write_isolating(batch)
+
+    def _write_isolating(self, batch):
+        """Write `batch`; if that fails, retry each half in order.
+
+        One bad write costs about log2(len(batch)) extra calls instead of
+        one call per operation, and it does not fail the other producers'
+        writes (or a flush).
+        """
+        try:
+            self._write(batch)
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0].future.set_exception(error)
+                return
+            middle = len(batch) // 2
+            self._write_isolating(batch[:middle])
+            self._write_isolating(batch[middle:])
+            return
+        for operation in batch:
+            if not operation.future.done():
+                operation.future.set_result(len(operation.ids))
+
+    def _collection(self, name):
+        if name not in self._collections:
+            kwargs = {}
+            if name in self.embedding_functions:
+                kwargs["embedding_function"] = self.embedding_functions[name]
+            self._collections[name] = self.client.get_or_create_collection(name=name, **kwargs)
+        return self._collections[name]
+
+    @staticmethod
+    def _coalesce(previous, kind, fields):
+        """(kind, fields, delete_first) for a write on top of a pending one."""
+        if kind == "delete" or previous is None:
+            return kind, fields, False
+        previous_kind, previous_fields, delete_first = previous
+        if previous_kind == "delete":
+            # The delete still has to happen, or stored fields would survive it
+            return kind, fields, True
+        merged = dict(previous_fields)
+        if "documents" in fields and "embeddings" not in fields:
+            # The pending embedding belongs to the old document
+            merged.pop("embeddings", None)
+        merged.update(fields)
+        return kind, merged, delete_first
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        # collection -> id -> (kind, fields, delete_first), coalesced in order
+        latest = {}
+        received = 0
+        for operation in batch:
+            if operation.kind == "flush":
+                continue
+            records = latest.setdefault(operation.collection, {})
+            for i, doc_id in enumerate(operation.ids):
+                fields = {name: values[i] for name, values in operation.fields.items()}
+                # Re-insert so order follows the last write
+                records[doc_id] = self._coalesce(records.pop(doc_id, None), operation.kind,
+                                                 fields)
+                received += 1
+
+        written = 0
+        for name, records in latest.items():
+            collection = self._collection(name)
+            # Deletes go first, which also covers a delete followed by an upsert
+            deletes = [doc_id for doc_id, (kind, _, delete_first) in records.items()
+                       if kind == "delete" or delete_first]
+            # upsert() needs the same fields for every record in one call
+            groups = {}
+            for doc_id, (kind, fields, _) in records.items():
+                if kind == "upsert":
+                    groups.setdefault(tuple(sorted(fields)), []).append((doc_id, fields))
+            for first in range(0, len(deletes), self.max_batch_size):
+                collection.delete(ids=deletes[first:first + self.max_batch_size])
+                self._record_batch(len(deletes[first:first + self.max_batch_size]))
+            for field_names, group in groups.items():
+                for first in range(0, len(group), self.max_batch_size):
+                    chunk = group[first:first + self.max_batch_size]
+                    kwargs = {field: [fields[field] for _, fields in chunk]
+                              for field in field_names}
+                    collection.upsert(ids=[doc_id for doc_id, _ in chunk], **kwargs)
+                    self._record_batch(len(chunk))
+            written += len(records)
+
+        with self._metrics_lock:
+            self._received += received
+            self._written += written
+            self._write_seconds += time.perf_counter() - start
+
+    def _record_batch(self, size):
+        with self._metrics_lock:
+            self._batches += 1
+            self._batch_sizes.append(size)
+            if len(self._batch_sizes) > 10_000:
+                del self._batch_sizes[:5_000]
+
+    # ------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------
+
+    def metrics(self):
+        with self._metrics_lock:
+            elapsed = time.perf_counter() - self._started
+            sizes = sorted(self._batch_sizes)
+            return {
+                "calls": self._calls,
+                "records_received": self._received,
+                "records_written": self._written,
+                "coalesced": self._received - self._written,
+                "batches": self._batches,
+                "mean_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+                "max_batch_size": sizes[-1] if sizes else 0,
+                "writes_per_sec": self._written / elapsed if elapsed else 0.0,
+                "write_seconds": self._write_seconds,
+                "queued": self._queue.qsize(),
+            }
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._started = time.perf_counter()
+            self._calls = 0
+            self._received = 0
+            self._written = 0
+            self._batches = 0
+            self._batch_sizes = []
+            self._write_seconds = 0.0
+
+    # ------------------------------------------------------------
+    # Producers in other processes
+    # ------------------------------------------------------------
+
+    def serve_process_queue(self, requests, replies):
+        """Accept writes from ProcessWriters on a multiprocessing queue.
+
+        `replies` maps each producer id to its reply queue. A thread forwards
+        requests into this WriteQueue (so backpressure applies) and posts
+        an acknowledgement per request when it is written.
+        """
+        stop = threading.Event()
+        self._bridges.append(stop)
+
+        def acknowledge(producer, sequence):
+            def done(future):
+                error = future.exception()
+                replies[producer].put((sequence, None if error is None else repr(error)))
+            return done
+
+        def forward():
+            while not stop.is_set():
+                try:
+                    producer, sequence, kind, collection, ids, fields = requests.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    if kind == "flush":
+                        future = self._submit(_Operation("flush", None, []))
+                    elif kind == "delete":
+                        future = self.delete(collection, ids)
+                    else:
+                        future = self.upsert(collection, ids, **fields)
+                except (RuntimeError, ValueError) as error:
+                    replies[producer].put((sequence, repr(error)))
+                    continue
+                future.add_done_callback(acknowledge(producer, sequence))
+
+        thread = threading.Thread(target=forward, name="chroma-writer-bridge", daemon=True)
+        thread.start()
+        return thread
+
+
+class ProcessWriter:
+    """Producer-side handle for a WriteQueue running in another process."""
+
+    def __init__(self, requests, replies, producer_id):
+        self.requests = requests
+        self.replies = replies
+        self.producer_id = producer_id
+        self._sequence = itertools.count()
+        self._outstanding = set()
+        self.errors = []
+
+    def _send(self, kind, collection, ids, fields):
+        sequence = next(self._sequence)
+        self._outstanding.add(sequence)
+        self.requests.put((self.producer_id, sequence, kind, collection, ids, fields))
+        return sequence
+
+    def upsert(self, collection, ids, documents=None, metadatas=None, embeddings=None):
+        fields = {name: list(values) for name, values
+                  in zip(_FIELDS, (documents, metadatas, embeddings)) if values is not None}
+        return self._send("upsert", collection, list(ids), fields)
+
+    def delete(self, collection, ids):
+        return self._send("delete", collection, list(ids), {})
+
+    def flush(self, timeout=None):
+        """Wait for acknowledgements of everything sent; returns the errors seen."""
+        self._send("flush", None, [], {})
+        while self._outstanding:
+            sequence, error = self.replies.get(timeout=timeout)
+            self._outstanding.discard(sequence)
+            if error is not None:
+                self.errors.append((sequence, error))
+        return self.errors